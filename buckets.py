@@ -0,0 +1,492 @@
+"""
+hand strength buckets for game abstraction (solvers and bots)
+
+a situation is two hole cards and a flop, turn or river, and what it's worth is the whole distribution of its equity
+over the cards still to come, not just the mean: a flush draw and a middle pair can both have 50%, but the draw
+ends up with about 0% or 100% by the river and the pair stays around 50%
+    - situations are made canonical by suit isomorphism (relabelling suits changes nothing), only the canonical
+      ones are computed: about 1.3M on the flop, 14M on the turn and 123M on the river
+    - every one gets a histogram of its equity against a random hand (sampled) on every runout (sampled),
+      computed in a process pool, one task and one shard file in cache/buckets/ per starting hand class
+    - k-means with the earth mover's distance puts the histograms into buckets, trained on a sample of them
+      the EMD of two histograms is the L1 distance of their cumulative histograms, and it is never less than the
+      difference of their mean equities, so the nearest centroid search starts at the closest mean and stops early
+    - the result is one file per street and set of parameters: the sorted indexes of the canonical situations and
+      the bucket of each one, BucketTable maps the file and finds a situation with a binary search
+buckets are numbered from the weakest mean equity to the strongest
+every step writes its files atomically and skips the ones already there, so an interrupted run picks up where it stopped
+pre-flop the 169 hand classes already are the buckets (push_fold.hand_class)
+"""
+import argparse
+import mmap
+import os
+import random
+import time
+from array import array
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from itertools import combinations, permutations
+from math import comb, inf
+
+from outs import HandState
+from push_fold import CACHE_DIR
+
+BUCKET_DIR = os.path.join(CACHE_DIR, "buckets")
+STREETS = {"flop": 3, "turn": 4, "river": 5}
+BUCKETS = 50
+BINS = 50
+RUNOUTS = 64
+OPPONENTS = 64
+SAMPLE = 20000
+ITERATIONS = 30
+
+# every way to relabel the four suits, the identity first
+SUIT_PERMUTATIONS = tuple(permutations(range(4)))
+# _BINOMIAL[n][k] is n choose k, for the colex rank of a set of cards
+_BINOMIAL = tuple(tuple(comb(n, k) for k in range(6)) for n in range(53))
+
+
+def _rank(cards) -> int:
+    """
+    :param cards: sorted card ids
+    :return: colex rank of the set among all sets of that many cards
+    """
+    return sum(_BINOMIAL[card][i + 1] for i, card in enumerate(cards))
+
+
+def _relabel(cards, permutation) -> list[int]:
+    """
+    :param cards: card ids
+    :param permutation: new suit of every suit
+    :return: the cards with their suits relabelled, sorted
+    """
+    return sorted(card & ~3 | permutation[card & 3] for card in cards)
+
+
+def situation_index(hole, board) -> int:
+    """
+    the index of a situation's canonical form, the same for every situation that only differs by the suits
+    :param hole: the two hole card ids
+    :param board: the 3, 4 or 5 board card ids
+    :return: hole rank * (52 choose board size) + board rank, the smallest over all suit relabellings
+    """
+    size = _BINOMIAL[52][len(board)]
+    return min(_rank(_relabel(hole, permutation)) * size + _rank(_relabel(board, permutation))
+               for permutation in SUIT_PERMUTATIONS)
+
+
+def _canonical_hole(hole) -> tuple:
+    return min((tuple(_relabel(hole, permutation)) for permutation in SUIT_PERMUTATIONS), key=_rank)
+
+
+# one canonical pair of hole cards per starting hand class, in order of their rank, so the shards come out sorted
+CANONICAL_HOLES = tuple(sorted({_canonical_hole(hole) for hole in combinations(range(52), 2)}, key=_rank))
+
+
+def _histogram(hole: tuple, board: tuple, bins: int, runouts: int, opponents: int, rng: random.Random) -> list[int]:
+    """
+    :param hole: hole card ids
+    :param board: board card ids
+    :param bins: equity bins
+    :param runouts: most runouts to deal, all of them are used if there aren't more
+    :param opponents: most opponent hands per runout, all of them are used if there aren't more
+    :param rng: random number generator for the samples
+    :return: how many runouts ended up in every equity bin
+    """
+    dead = set(hole) | set(board)
+    rest = [card for card in range(52) if card not in dead]
+    to_come = 5 - len(board)
+    if comb(len(rest), to_come) <= runouts:
+        deals = list(combinations(rest, to_come))
+    else:
+        deals = [rng.sample(rest, to_come) for _ in range(runouts)]
+
+    hero = HandState(hole + board)
+    table = HandState(board)
+    counts = [0] * bins
+    for runout in deals:
+        for card in runout:
+            hero.add(card)
+            table.add(card)
+        hero_key = hero.key()
+        left = [card for card in rest if card not in runout]
+        if comb(len(left), 2) <= opponents:
+            hands = combinations(left, 2)
+        else:
+            hands = (rng.sample(left, 2) for _ in range(opponents))
+
+        # ties count half, in halves so it stays an integer
+        won = 0
+        total = 0
+        for first, second in hands:
+            key = table.key_with(first, second)
+            total += 2
+            if hero_key > key:
+                won += 2
+            elif hero_key == key:
+                won += 1
+        counts[min(won * bins // total, bins - 1)] += 1
+        for card in runout:
+            hero.remove(card)
+            table.remove(card)
+    return counts
+
+
+def _shard_path(directory: str, kind: str, number: int) -> str:
+    return os.path.join(directory, f"{kind}_{number:03d}.bin")
+
+
+def _write(path: str, *arrays: array) -> None:
+    """
+    writes arrays one after the other next to path and renames the file, so a file that exists is complete
+    """
+    with open(path + ".tmp", "wb") as file:
+        for values in arrays:
+            values.tofile(file)
+    os.replace(path + ".tmp", path)
+
+
+def _histogram_task(street: str, number: int, bins: int, runouts: int, opponents: int, seed: int, path: str) -> int:
+    """
+    computes the histograms of every canonical situation with one starting hand class and writes them to a shard:
+    the count, the situation indexes (sorted) and the histograms
+    :param street: flop, turn or river
+    :param number: index in CANONICAL_HOLES
+    :param path: shard file
+    :return: number of situations
+    """
+    hole = CANONICAL_HOLES[number]
+    size = _BINOMIAL[52][STREETS[street]]
+    hole_rank = _rank(hole)
+    # relabellings that leave the hole cards alone, the board has to be the smallest under all of them
+    stabilizer = [permutation for permutation in SUIT_PERMUTATIONS[1:] if tuple(_relabel(hole, permutation)) == hole]
+    rng = random.Random(seed * len(CANONICAL_HOLES) + number)
+
+    found = []
+    for board in combinations([card for card in range(52) if card not in hole], STREETS[street]):
+        board_rank = _rank(board)
+        if any(_rank(_relabel(board, permutation)) < board_rank for permutation in stabilizer):
+            continue
+        found.append((hole_rank * size + board_rank, _histogram(hole, board, bins, runouts, opponents, rng)))
+    found.sort()
+
+    keys = array("I", (key for key, _ in found))
+    histograms = array("H")
+    for _, counts in found:
+        histograms.extend(counts)
+    _write(path, array("I", [len(keys)]), keys, histograms)
+    return len(keys)
+
+
+def _read_shard(path: str, bins: int) -> tuple[array, array]:
+    """
+    :return: situation indexes and histograms (bins values each) of a histogram shard
+    """
+    with open(path, "rb") as file:
+        count = array("I")
+        count.fromfile(file, 1)
+        keys = array("I")
+        keys.fromfile(file, count[0])
+        histograms = array("H")
+        histograms.fromfile(file, count[0] * bins)
+    return keys, histograms
+
+
+def _cdf(histograms: array, i: int, bins: int) -> list[float]:
+    """
+    :return: cumulative histogram number i, scaled so it ends at 1
+    """
+    counts = histograms[i * bins:(i + 1) * bins]
+    total = sum(counts)
+    running = 0
+    cdf = []
+    for count in counts:
+        running += count
+        cdf.append(running / total)
+    return cdf
+
+
+def emd(first: list[float], second: list[float]) -> float:
+    """
+    :param first: cumulative histogram
+    :param second: cumulative histogram with the same bins
+    :return: earth mover's distance, in bins
+    """
+    return sum(abs(a - b) for a, b in zip(first, second))
+
+
+def _strength(cdf: list[float]) -> float:
+    """
+    :return: mean equity in bins (give or take half a bin), EMD is never less than the difference of two of these
+    """
+    return len(cdf) - sum(cdf)
+
+
+def _nearest(cdf: list[float], centroids: list, strengths: list[float]) -> tuple[int, float]:
+    """
+    :param cdf: cumulative histogram
+    :param centroids: cumulative histograms sorted by strength
+    :param strengths: strength of every centroid
+    :return: index of the nearest centroid and its distance
+    """
+    strength = _strength(cdf)
+    right = bisect_left(strengths, strength)
+    left = right - 1
+    best, best_distance = -1, inf
+    while True:
+        left_bound = strength - strengths[left] if left >= 0 else inf
+        right_bound = strengths[right] - strength if right < len(strengths) else inf
+        if min(left_bound, right_bound) >= best_distance:
+            return best, best_distance
+        if left_bound <= right_bound:
+            i = left
+            left -= 1
+        else:
+            i = right
+            right += 1
+        distance = emd(cdf, centroids[i])
+        if distance < best_distance:
+            best, best_distance = i, distance
+
+
+def kmeans(points: list, k: int, iterations: int = ITERATIONS, seed: int = 0) -> list:
+    """
+    clusters cumulative histograms with the earth mover's distance, k-means++ start and Lloyd iterations
+    :param points: cumulative histograms
+    :param k: number of clusters
+    :param iterations: most iterations, it stops sooner once no point changes cluster
+    :param seed: seed for the start
+    :return: k centroids (cumulative histograms), sorted from the weakest to the strongest
+    """
+    rng = random.Random(seed)
+    centroids = [rng.choice(points)]
+    distances = [emd(point, centroids[0]) for point in points]
+    while len(centroids) < k:
+        total = sum(distance * distance for distance in distances)
+        if total == 0:
+            # fewer different points than clusters
+            centroids.append(rng.choice(points))
+            continue
+        target = rng.random() * total
+        for point, distance in zip(points, distances):
+            target -= distance * distance
+            if target <= 0:
+                break
+        centroids.append(point)
+        distances = [min(distance, emd(other, point)) for other, distance in zip(points, distances)]
+
+    bins = len(points[0])
+    assignment = None
+    for _ in range(iterations):
+        centroids.sort(key=_strength)
+        strengths = [_strength(centroid) for centroid in centroids]
+        nearest = [_nearest(point, centroids, strengths) for point in points]
+        new_assignment = [i for i, _ in nearest]
+        if new_assignment == assignment:
+            break
+        assignment = new_assignment
+
+        sums = [[0.0] * bins for _ in range(k)]
+        sizes = [0] * k
+        for point, i in zip(points, assignment):
+            sizes[i] += 1
+            sums[i] = list(map(float.__add__, sums[i], point))
+        # the mean of cumulative histograms is the cumulative histogram of the mean
+        farthest = sorted(range(len(points)), key=lambda j: nearest[j][1], reverse=True)
+        for i in range(k):
+            if sizes[i]:
+                centroids[i] = [value / sizes[i] for value in sums[i]]
+            else:
+                # an empty cluster takes the point worst served by its own
+                centroids[i] = points[farthest.pop(0)]
+    centroids.sort(key=_strength)
+    return centroids
+
+
+def _assign_task(histogram_path: str, bins: int, centroids: list, path: str) -> int:
+    """
+    writes the bucket of every situation of a histogram shard
+    :return: number of situations
+    """
+    _, histograms = _read_shard(histogram_path, bins)
+    strengths = [_strength(centroid) for centroid in centroids]
+    count = len(histograms) // bins
+    buckets = array("H", (_nearest(_cdf(histograms, i, bins), centroids, strengths)[0] for i in range(count)))
+    _write(path, buckets)
+    return count
+
+
+def _run(pool: ProcessPoolExecutor, tasks: dict, name: str, log) -> None:
+    """
+    runs {path: (function, *arguments)} for every path that doesn't exist yet
+    """
+    todo = {path: task for path, task in tasks.items() if not os.path.exists(path)}
+    if len(todo) < len(tasks):
+        log(f"{name}: {len(tasks) - len(todo)} of {len(tasks)} shards already done")
+    start = time.perf_counter()
+    futures = [pool.submit(*task) for task in todo.values()]
+    for done, future in enumerate(as_completed(futures), start=1):
+        count = future.result()
+        log(f"{name}: shard {done}/{len(todo)}, {count} situations, {time.perf_counter() - start:.1f}s")
+
+
+def _sample(paths: list[str], bins: int, size: int, seed: int) -> list:
+    """
+    :return: about size cumulative histograms picked at random from all the shards
+    """
+    total = 0
+    for path in paths:
+        with open(path, "rb") as file:
+            count = array("I")
+            count.fromfile(file, 1)
+            total += count[0]
+    chance = min(1.0, size / total)
+    rng = random.Random(seed)
+    points = []
+    for path in paths:
+        _, histograms = _read_shard(path, bins)
+        points.extend(_cdf(histograms, i, bins) for i in range(len(histograms) // bins) if rng.random() < chance)
+    return points
+
+
+def build_buckets(street: str, buckets: int = BUCKETS, bins: int = BINS, runouts: int = RUNOUTS,
+                  opponents: int = OPPONENTS, sample: int = SAMPLE, workers: int = None, seed: int = 0,
+                  log=print) -> str:
+    """
+    computes the buckets of every canonical situation of a street, picking up whatever an earlier run left
+    :param street: flop, turn or river
+    :param buckets: number of buckets
+    :param bins: equity bins of the histograms
+    :param runouts: most runouts per situation (the turn has 46, the flop 1081)
+    :param opponents: most opponent hands per runout
+    :param sample: histograms k-means is trained on
+    :param workers: number of processes, None for one per cpu
+    :param seed: seed for the samples
+    :param log: function called with progress messages
+    :return: path of the bucket file (see BucketTable)
+    """
+    name = f"{street}_{buckets}_{bins}_{runouts}_{opponents}_{sample}_{seed}"
+    path = os.path.join(BUCKET_DIR, f"{name}.bin")
+    if os.path.exists(path):
+        return path
+    # the histograms don't depend on the clustering, other bucket counts reuse them
+    directory = os.path.join(BUCKET_DIR, f"{street}_{bins}_{runouts}_{opponents}_{seed}")
+    os.makedirs(directory, exist_ok=True)
+
+    numbers = range(len(CANONICAL_HOLES))
+    histogram_paths = [_shard_path(directory, "histograms", number) for number in numbers]
+    bucket_paths = [_shard_path(directory, f"buckets_{buckets}_{sample}", number) for number in numbers]
+    centroid_path = os.path.join(directory, f"centroids_{buckets}_{sample}.bin")
+
+    with ProcessPoolExecutor(workers) as pool:
+        _run(pool, {histogram_path: (_histogram_task, street, number, bins, runouts, opponents, seed, histogram_path)
+                    for number, histogram_path in zip(numbers, histogram_paths)}, f"{street} histograms", log)
+
+        centroids = array("d")
+        if os.path.exists(centroid_path):
+            with open(centroid_path, "rb") as file:
+                centroids.fromfile(file, buckets * bins)
+        else:
+            start = time.perf_counter()
+            points = _sample(histogram_paths, bins, sample, seed)
+            for centroid in kmeans(points, buckets, seed=seed):
+                centroids.extend(centroid)
+            _write(centroid_path, centroids)
+            log(f"{street} k-means: {buckets} buckets from {len(points)} histograms, {time.perf_counter() - start:.1f}s")
+        centroids = [list(centroids[i * bins:(i + 1) * bins]) for i in range(buckets)]
+
+        _run(pool, {bucket_path: (_assign_task, histogram_path, bins, centroids, bucket_path)
+                    for histogram_path, bucket_path in zip(histogram_paths, bucket_paths)}, f"{street} buckets", log)
+
+    # count, every situation index, every bucket
+    total = 0
+    for histogram_path in histogram_paths:
+        with open(histogram_path, "rb") as file:
+            count = array("I")
+            count.fromfile(file, 1)
+            total += count[0]
+    with open(path + ".tmp", "wb") as file:
+        array("I", [total]).tofile(file)
+        for histogram_path in histogram_paths:
+            keys, _ = _read_shard(histogram_path, bins)
+            keys.tofile(file)
+        for bucket_path in bucket_paths:
+            with open(bucket_path, "rb") as shard:
+                file.write(shard.read())
+    os.replace(path + ".tmp", path)
+    return path
+
+
+class BucketTable:
+    """
+    a class that looks up buckets in a file written by build_buckets(), the file is memory mapped, not read
+
+    attributes:
+        street (str): flop, turn or river
+        keys: sorted canonical situation indexes
+        buckets: bucket of every situation
+
+    methods:
+        bucket(hole, board): bucket of a situation (card ids)
+        close(): unmaps the file
+    """
+    def __init__(self, path: str, street: str):
+        """
+        :param path: file written by build_buckets()
+        :param street: the street it was built for
+        """
+        self.street = street
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        count = view[:4].cast("I")[0]
+        self.keys = view[4:4 + 4 * count].cast("I")
+        self.buckets = view[4 + 4 * count:].cast("H")
+
+    def bucket(self, hole, board) -> int:
+        """
+        :param hole: the two hole card ids
+        :param board: the board card ids, as many as the street has
+        :return: bucket number, 0 is the weakest
+        """
+        if len(board) != STREETS[self.street]:
+            raise ValueError(f"a {self.street} board has {STREETS[self.street]} cards, got {len(board)}")
+        return self.buckets[bisect_left(self.keys, situation_index(hole, board))]
+
+    def close(self) -> None:
+        self.keys.release()
+        self.buckets.release()
+        self._map.close()
+
+
+def load_buckets(street: str, buckets: int = BUCKETS, workers: int = None, **options) -> BucketTable:
+    """
+    opens the bucket file of a street, building it first if it isn't in cache/ yet
+    :param street: flop, turn or river
+    :param buckets: number of buckets
+    :param workers: number of processes if it has to be built
+    :param options: the other build_buckets() parameters
+    :return: BucketTable object
+    """
+    return BucketTable(build_buckets(street, buckets, workers=workers, **options), street)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="cluster flop, turn or river situations into hand strength buckets")
+    parser.add_argument("street", choices=list(STREETS))
+    parser.add_argument("--buckets", type=int, default=BUCKETS)
+    parser.add_argument("--bins", type=int, default=BINS, help="equity bins of the histograms")
+    parser.add_argument("--runouts", type=int, default=RUNOUTS, help="most runouts per situation")
+    parser.add_argument("--opponents", type=int, default=OPPONENTS, help="most opponent hands per runout")
+    parser.add_argument("--sample", type=int, default=SAMPLE, help="histograms k-means is trained on")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per cpu)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    path = build_buckets(args.street, args.buckets, args.bins, args.runouts, args.opponents, args.sample,
+                         args.workers, args.seed)
+    print(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -22,6 +22,8 @@ class Card:
         __lt__(other): compares two cards based on their rank and suit
 
     """
+    __slots__ = ("rank", "suit")
+
     rank_values = {'2': 2, '3': 3, '4': 4, '5': 5, '6': 6, '7': 7,
     '8': 8, '9': 9, '10': 10, 'J': 11, 'Q': 12, 'K': 13, 'A': 14
     }
@@ -68,4 +70,30 @@ class Card:
             if Card.rank_values[self.rank] == Card.rank_values[other.rank]:
                 return self.suit < other.suit
             return Card.rank_values[self.rank] < Card.rank_values[other.rank]
-        return False
\ No newline at end of file
+        return False
+
+
+RANKS = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
+SUITS = ['♠', '♥', '♦', '♣']
+
+# integer encoding used by the fast modules (ranges, evaluator, ...), card id = rank index * 4 + suit index
+_rank_index = {rank: i for i, rank in enumerate(RANKS)}
+_suit_index = {suit: i for i, suit in enumerate(SUITS)}
+
+
+def card_to_index(card: Card) -> int:
+    """
+    converts a Card object into its integer id (0-51)
+    :param card: Card object
+    :return: rank index * 4 + suit index, so 2♠ is 0 and A♣ is 51
+    """
+    return _rank_index[card.rank] * 4 + _suit_index[card.suit]
+
+
+def index_to_card(index: int) -> Card:
+    """
+    converts an integer id (0-51) back into a Card object
+    :param index: integer id of the card
+    :return: the matching Card object
+    """
+    return Card(RANKS[index >> 2], SUITS[index & 3])
@@ -0,0 +1,570 @@
+"""
+counterfactual regret minimization for heads-up hold'em
+
+the game is abstracted so it fits in memory:
+    - betting follows the engine (Game.apply_action): blinds, a bet is at least the big blind and at least the
+      call amount and is capped at the player's chips, a street ends when both players have acted since the last
+      raise, heads up the small blind (dealer + 1) acts first on every street like in Game.pre_flop and
+      play_betting_round
+    - bets are fractions of the pot after calling (the same sizes as mcts.legal_actions) or all in, at most
+      max_raises of them per street, and both players start with the same stack, so the betting tree is small
+      and is built once (BettingTree)
+    - cards are buckets: the 169 hand classes pre-flop, after it a buckets.BucketTable when one is given, otherwise
+      the hand category and whether the hole cards make it better than the board alone
+training is monte carlo CFR with external sampling: every iteration deals one hand and, for each player in turn,
+walks every action of that player and one action of the other sampled from their current strategy
+regrets and strategy sums are flat arrays of doubles, a decision node owns (buckets x actions) of them,
+so an information set is an offset and no dictionary is needed
+workers train copies of the tables and send back what they added, the parent adds it up and checkpoints the tables
+to cache/cfr/ (atomically) so training can stop at any point and pick up again
+the average strategy is exported as a policy file that CFRBot plays in a bot seat
+"""
+import json
+import os
+import random
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import add, mul, sub
+
+from buckets import BucketTable
+from card import card_to_index
+from evaluator import CATEGORY_NAMES, category, evaluate
+from push_fold import CACHE_DIR, CLASS_COUNT, hand_class
+
+CFR_DIR = os.path.join(CACHE_DIR, "cfr")
+STACK_BB = 50
+BET_FRACTIONS = (0.5, 1.0)
+MAX_RAISES = 2
+MERGE_EVERY = 2000
+
+STREET_NAMES = ("preflop", "flop", "turn", "river")
+BOARD_SIZES = (0, 3, 4, 5)
+
+
+class CardAbstraction:
+    """
+    a class that puts hole cards and a board into a bucket
+
+    attributes:
+        tables (dict): street name -> (bucket file from buckets.build_buckets(), number of buckets),
+                       streets without one use the hand category and whether the hole cards improve the board
+
+    methods:
+        size(street): number of buckets of a street (0 is pre-flop, 3 the river)
+        bucket(hand, board): bucket of two hole card ids and a board
+    """
+    def __init__(self, tables: dict = None):
+        self.tables = dict(tables or {})
+        self._open = {}
+
+    def __getstate__(self):
+        # the bucket files are memory mapped, every process opens its own
+        return self.tables
+
+    def __setstate__(self, tables):
+        self.tables = tables
+        self._open = {}
+
+    def size(self, street: int) -> int:
+        if street == 0:
+            return CLASS_COUNT
+        name = STREET_NAMES[street]
+        if name in self.tables:
+            return self.tables[name][1]
+        return 2 * len(CATEGORY_NAMES)
+
+    def bucket(self, hand, board) -> int:
+        """
+        :param hand: two card ids
+        :param board: 0, 3, 4 or 5 card ids
+        :return: bucket number
+        """
+        if not board:
+            return hand_class(*hand)
+        name = STREET_NAMES[BOARD_SIZES.index(len(board))]
+        if name in self.tables:
+            if name not in self._open:
+                self._open[name] = BucketTable(self.tables[name][0], name)
+            return self._open[name].bucket(hand, board)
+        made = category(evaluate(hand + board))
+        return 2 * made + (made > category(evaluate(board)))
+
+
+class BettingTree:
+    """
+    a class holding every betting sequence of the abstracted game, node 0 is the start of the hand
+    player 0 is the small blind, player 1 the big blind, chips are the engine's (blinds of 10 and 20 by default)
+
+    attributes (lists with an entry per node):
+        player (list[int]): who acts, -1 when the hand is over
+        street (list[int]): 0 pre-flop ... 3 river
+        actions (list[tuple]): ("fold", 0), ("check", 0), ("call", 0) or ("bet", pot fraction, None for all in)
+        children (list[tuple]): the node after each action
+        total (list[tuple]): chips each player has put in this hand
+        bets (list[tuple]): chips each player has put in this street
+        folder (list[int]): when the hand is over, who folded, -1 for a showdown
+        offset (list[int]): where the node's rows start in the tables
+        size (int): length of the tables
+
+    methods:
+        value(node, winner): chips player 0 wins at the end of a hand
+    """
+    def __init__(self, stack: int, small_blind: int, big_blind: int, fractions: tuple, max_raises: int,
+                 bucket_counts: list[int]):
+        """
+        :param stack: chips both players start with
+        :param small_blind: small blind
+        :param big_blind: big blind
+        :param fractions: bet sizes as fractions of the pot
+        :param max_raises: most bets and raises per street
+        :param bucket_counts: number of buckets of every street
+        """
+        if stack < 2 * big_blind:
+            raise ValueError("the stacks have to be at least two big blinds")
+        self.stack = stack
+        self.big_blind = big_blind
+        self.fractions = fractions
+        self.max_raises = max_raises
+        self.player = []
+        self.street = []
+        self.actions = []
+        self.children = []
+        self.total = []
+        self.bets = []
+        self.folder = []
+        self._node(0, 0, (small_blind, big_blind), (small_blind, big_blind), 0, 0)
+
+        self.offset = []
+        self.size = 0
+        for player, street, actions in zip(self.player, self.street, self.actions):
+            self.offset.append(self.size)
+            if player >= 0:
+                self.size += bucket_counts[street] * len(actions)
+
+    def _new(self, player: int, street: int, total: tuple, bets: tuple, folder: int = -1) -> int:
+        self.player.append(player)
+        self.street.append(street)
+        self.actions.append(())
+        self.children.append(())
+        self.total.append(total)
+        self.bets.append(bets)
+        self.folder.append(folder)
+        return len(self.player) - 1
+
+    def _node(self, street: int, player: int, total: tuple, bets: tuple, acted: int, raises: int) -> int:
+        """
+        adds a decision node and everything after it
+        :param acted: players who acted since the last raise (the big blind counts as one pre-flop)
+        :param raises: bets and raises so far this street
+        :return: the node
+        """
+        node = self._new(player, street, total, bets)
+        other = 1 - player
+        call = bets[other] - bets[player]
+        chips = self.stack - total[player]
+        actions = []
+        children = []
+        if call > 0:
+            actions.append(("fold", 0))
+            children.append(self._new(-1, street, total, bets, folder=player))
+            actions.append(("call", 0))
+            children.append(self._after(street, player, total, bets, acted, raises, min(call, chips), False))
+        else:
+            actions.append(("check", 0))
+            children.append(self._after(street, player, total, bets, acted, raises, 0, False))
+
+        if chips > call and raises < self.max_raises and total[other] < self.stack:
+            # same sizes as mcts.legal_actions, sizes that come out the same are only added once
+            pot = total[0] + total[1]
+            sizes = {}
+            for fraction in self.fractions:
+                sizes.setdefault(min(call + max(self.big_blind, int((pot + call) * fraction)), chips), fraction)
+            sizes.setdefault(chips, None)
+            for amount, fraction in sorted(sizes.items()):
+                actions.append(("bet", fraction))
+                children.append(self._after(street, player, total, bets, acted, raises, amount, True))
+
+        self.actions[node] = tuple(actions)
+        self.children[node] = tuple(children)
+        return node
+
+    def _after(self, street: int, player: int, total: tuple, bets: tuple, acted: int, raises: int, amount: int,
+               raised: bool) -> int:
+        """
+        :return: the node after player puts amount in (0 for a check)
+        """
+        total = tuple(chips + amount * (seat == player) for seat, chips in enumerate(total))
+        bets = tuple(chips + amount * (seat == player) for seat, chips in enumerate(bets))
+        if raised:
+            return self._node(street, 1 - player, total, bets, 1, raises + 1)
+        if self.stack in total:
+            # someone is all in and the bets are called, nothing left to decide
+            return self._new(-1, street, total, bets)
+        if acted + 1 < 2:
+            return self._node(street, 1 - player, total, bets, acted + 1, raises)
+        if street == 3:
+            return self._new(-1, street, total, bets)
+        return self._node(street + 1, 0, total, (0, 0), 0, 0)
+
+    def value(self, node: int, winner: int) -> int:
+        """
+        :param node: a node where the hand is over
+        :param winner: who has the better hand, -1 for a tie
+        :return: chips player 0 wins (negative if they lose)
+        """
+        total = self.total[node]
+        folder = self.folder[node]
+        if folder == 0:
+            return -total[0]
+        if folder == 1:
+            return total[1]
+        # chips that weren't called go back
+        matched = min(total)
+        return 0 if winner < 0 else matched if winner == 0 else -matched
+
+
+def _regret_matching(regrets: array, base: int, count: int) -> list[float]:
+    """
+    :return: the current strategy of an information set, in proportion to its positive regrets
+    """
+    positive = [max(regret, 0.0) for regret in regrets[base:base + count]]
+    total = sum(positive)
+    if total > 0:
+        return [regret / total for regret in positive]
+    return [1.0 / count] * count
+
+
+def _traverse(tree: BettingTree, node: int, traverser: int, buckets: list, winner: int, regrets: array,
+              strategy: array, rng: random.Random) -> float:
+    """
+    external sampling: every action of the traverser, one sampled action of the other player
+    :param buckets: buckets[player][street]
+    :param winner: who wins a showdown, -1 for a tie
+    :return: value of the node for the traverser, in chips
+    """
+    player = tree.player[node]
+    if player < 0:
+        value = tree.value(node, winner)
+        return value if traverser == 0 else -value
+
+    children = tree.children[node]
+    count = len(children)
+    base = tree.offset[node] + buckets[player][tree.street[node]] * count
+    current = _regret_matching(regrets, base, count)
+    if player == traverser:
+        values = [_traverse(tree, child, traverser, buckets, winner, regrets, strategy, rng) for child in children]
+        value = sum(map(mul, current, values))
+        for i in range(count):
+            regrets[base + i] += values[i] - value
+        return value
+
+    for i in range(count):
+        strategy[base + i] += current[i]
+    choice = rng.choices(children, current)[0]
+    return _traverse(tree, choice, traverser, buckets, winner, regrets, strategy, rng)
+
+
+def _iterate(tree: BettingTree, abstraction: CardAbstraction, regrets: array, strategy: array,
+             rng: random.Random) -> None:
+    """
+    deals a hand and runs one traversal for each player
+    """
+    cards = rng.sample(range(52), 9)
+    hands = (cards[:2], cards[2:4])
+    board = cards[4:]
+    buckets = [[abstraction.bucket(hand, board[:size]) for size in BOARD_SIZES] for hand in hands]
+    keys = [evaluate(hand + board) for hand in hands]
+    winner = 0 if keys[0] > keys[1] else 1 if keys[1] > keys[0] else -1
+    for traverser in (0, 1):
+        _traverse(tree, 0, traverser, buckets, winner, regrets, strategy, rng)
+
+
+# trees built by this process, by config, so workers don't build them again for every merge
+_trees = {}
+
+
+def _setup(config: dict) -> tuple[BettingTree, CardAbstraction]:
+    """
+    :return: the betting tree and card abstraction of a config (see Trainer)
+    """
+    key = json.dumps(config, sort_keys=True)
+    if key not in _trees:
+        abstraction = CardAbstraction({street: tuple(table) for street, table in config["buckets"].items()})
+        tree = BettingTree(config["stack_bb"] * config["big_blind"], config["small_blind"], config["big_blind"],
+                           tuple(config["fractions"]), config["max_raises"],
+                           [abstraction.size(street) for street in range(4)])
+        _trees[key] = tree, abstraction
+    return _trees[key]
+
+
+def _train_task(config: dict, regrets: array, strategy: array, iterations: int, seed: int) -> tuple[array, array]:
+    """
+    trains a copy of the tables
+    :return: what was added to the regrets and to the strategy sums
+    """
+    tree, abstraction = _setup(config)
+    rng = random.Random(seed)
+    start_regrets = array("d", regrets)
+    start_strategy = array("d", strategy)
+    for _ in range(iterations):
+        _iterate(tree, abstraction, regrets, strategy, rng)
+    return array("d", map(sub, regrets, start_regrets)), array("d", map(sub, strategy, start_strategy))
+
+
+def _write(path: str, *arrays: array) -> None:
+    """
+    writes arrays one after the other next to path and renames the file, so the file is never half written
+    """
+    with open(path + ".tmp", "wb") as file:
+        for values in arrays:
+            values.tofile(file)
+    os.replace(path + ".tmp", path)
+
+
+def _read_config(directory: str):
+    path = os.path.join(directory, "config.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
+
+
+class Trainer:
+    """
+    a class that trains the abstracted game and keeps its tables in a directory (cache/cfr/... by default),
+    a trainer made with the same settings picks up from the last checkpoint
+
+    attributes:
+        config (dict): the settings, see __init__
+        directory (str): where the config, checkpoint and policy are written
+        tree (BettingTree): the betting tree
+        abstraction (CardAbstraction): the card buckets
+        regrets (array): cumulative regret of every action of every information set
+        strategy (array): cumulative strategy of every action of every information set
+        iterations (int): iterations trained so far
+
+    methods:
+        run(iterations, workers, merge_every, seed): trains, merging and checkpointing every merge_every iterations
+        checkpoint(): writes the tables
+        export_policy(): writes the average strategy for CFRBot, returns the directory
+    """
+    def __init__(self, stack_bb: int = STACK_BB, small_blind: int = 10, big_blind: int = 20,
+                 fractions: tuple = BET_FRACTIONS, max_raises: int = MAX_RAISES, buckets: dict = None,
+                 directory: str = None):
+        """
+        :param stack_bb: starting stacks in big blinds
+        :param small_blind: small blind (the engine's default)
+        :param big_blind: big blind (the engine's default)
+        :param fractions: bet sizes as fractions of the pot, all in is always there
+        :param max_raises: most bets and raises per street
+        :param buckets: street name -> (bucket file, number of buckets), see CardAbstraction
+        :param directory: where to keep the tables, by default a directory in cache/cfr/ named after the settings
+        """
+        self.config = {"stack_bb": stack_bb, "small_blind": small_blind, "big_blind": big_blind,
+                       "fractions": list(fractions), "max_raises": max_raises,
+                       "buckets": {street: list(table) for street, table in (buckets or {}).items()}}
+        if directory is None:
+            name = f"hu_{stack_bb}bb_{'_'.join(str(fraction) for fraction in fractions)}_{max_raises}r"
+            if buckets:
+                name += "_" + "_".join(f"{street}{count}" for street, (_, count) in sorted(buckets.items()))
+            directory = os.path.join(CFR_DIR, name)
+        self.directory = directory
+        self.tree, self.abstraction = _setup(self.config)
+
+        saved = _read_config(directory)
+        if saved is not None and saved != self.config:
+            raise ValueError(f"{directory} holds tables trained with other settings")
+        self.iterations = 0
+        self.regrets = array("d", bytes(8 * self.tree.size))
+        self.strategy = array("d", bytes(8 * self.tree.size))
+        path = os.path.join(directory, "tables.bin")
+        if os.path.exists(path):
+            with open(path, "rb") as file:
+                iterations = array("q")
+                iterations.fromfile(file, 1)
+                self.iterations = iterations[0]
+                self.regrets = array("d")
+                self.regrets.fromfile(file, self.tree.size)
+                self.strategy = array("d")
+                self.strategy.fromfile(file, self.tree.size)
+        elif saved is None:
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, "config.json.tmp"), "w") as file:
+                json.dump(self.config, file)
+            os.replace(os.path.join(directory, "config.json.tmp"), os.path.join(directory, "config.json"))
+
+    def run(self, iterations: int, workers: int = 1, merge_every: int = MERGE_EVERY, seed: int = 0,
+            log=print) -> None:
+        """
+        trains for some iterations
+        every merge_every iterations (split between the workers) the workers' additions are merged and checkpointed,
+        the seeds depend on how many iterations were already done, so stopping and resuming deals the same hands
+        :param iterations: number of iterations (each is one deal and a traversal for both players)
+        :param workers: number of processes, 1 trains in this process
+        :param merge_every: iterations between merges and checkpoints
+        :param seed: seed for the deals
+        :param log: function called with progress messages
+        :return: None
+        """
+        pool = ProcessPoolExecutor(workers) if workers > 1 else None
+        try:
+            done = 0
+            while done < iterations:
+                start = time.perf_counter()
+                batch = min(merge_every, iterations - done)
+                shares = [batch // workers + (i < batch % workers) for i in range(workers)]
+                seeds = [(seed * 1_000_003 + self.iterations) * 64 + i for i in range(workers)]
+                if pool is None:
+                    _train_task(self.config, self.regrets, self.strategy, batch, seeds[0])
+                else:
+                    futures = [pool.submit(_train_task, self.config, self.regrets, self.strategy, share, worker_seed)
+                               for share, worker_seed in zip(shares, seeds) if share]
+                    for future in futures:
+                        regrets, strategy = future.result()
+                        self.regrets = array("d", map(add, self.regrets, regrets))
+                        self.strategy = array("d", map(add, self.strategy, strategy))
+                self.iterations += batch
+                done += batch
+                self.checkpoint()
+                log(f"{self.iterations} iterations, {batch / (time.perf_counter() - start):.0f} per second")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+    def checkpoint(self) -> None:
+        """
+        writes the iteration count and the tables
+        :return: None
+        """
+        _write(os.path.join(self.directory, "tables.bin"), array("q", [self.iterations]), self.regrets, self.strategy)
+
+    def export_policy(self) -> str:
+        """
+        writes the average strategy (what converges to the equilibrium) as probabilities
+        :return: the directory, for Policy and CFRBot
+        """
+        tree = self.tree
+        policy = array("f", bytes(4 * tree.size))
+        for node, player in enumerate(tree.player):
+            if player < 0:
+                continue
+            count = len(tree.actions[node])
+            for row in range(self.abstraction.size(tree.street[node])):
+                base = tree.offset[node] + row * count
+                sums = self.strategy[base:base + count]
+                total = sum(sums)
+                for i in range(count):
+                    policy[base + i] = sums[i] / total if total > 0 else 1.0 / count
+        _write(os.path.join(self.directory, "policy.bin"), policy)
+        return self.directory
+
+
+class Policy:
+    """
+    a class holding an exported average strategy
+
+    attributes:
+        config (dict): the settings it was trained with
+        tree (BettingTree): the betting tree
+        abstraction (CardAbstraction): the card buckets
+        probabilities (array): probability of every action of every information set
+
+    methods:
+        nearest_node(street, player, total, bets): the decision node closest to a real betting situation
+        strategy(node, bucket): probabilities of the node's actions
+    """
+    def __init__(self, directory: str):
+        """
+        :param directory: directory of a Trainer that exported its policy
+        """
+        self.config = _read_config(directory)
+        if self.config is None:
+            raise FileNotFoundError(f"no config.json in {directory}")
+        self.tree, self.abstraction = _setup(self.config)
+        self.probabilities = array("f")
+        with open(os.path.join(directory, "policy.bin"), "rb") as file:
+            self.probabilities.fromfile(file, self.tree.size)
+        # (street, player, facing a bet) -> decision nodes
+        self._nodes = {}
+        for node, player in enumerate(self.tree.player):
+            if player >= 0:
+                bets = self.tree.bets[node]
+                self._nodes.setdefault((self.tree.street[node], player, bets[1 - player] > bets[player]), []).append(node)
+
+    def nearest_node(self, street: int, player: int, total: tuple, bets: tuple) -> int:
+        """
+        real bets don't have to be the abstraction's sizes, so the node whose chips are closest is used
+        :param street: 0 pre-flop ... 3 river
+        :param player: 0 small blind, 1 big blind
+        :param total: chips each player has put in this hand, in the policy's chips
+        :param bets: chips each player has put in this street, in the policy's chips
+        :return: the node
+        """
+        nodes = self._nodes[(street, player, bets[1 - player] > bets[player])]
+        tree = self.tree
+        return min(nodes, key=lambda node: sum(abs(a - b) for a, b in zip(tree.total[node] + tree.bets[node],
+                                                                         total + bets)))
+
+    def strategy(self, node: int, bucket: int) -> list[float]:
+        count = len(self.tree.actions[node])
+        base = self.tree.offset[node] + bucket * count
+        return list(self.probabilities[base:base + count])
+
+
+class CFRBot:
+    """
+    a class representing a bot that plays an exported CFR policy heads up
+
+    attributes:
+        policy (Policy): the policy
+        fallback: bot used when more than two players are dealt in (ex. mcts.MCTSBot), None to check or fold
+        rng (random.Random): random number generator for the mixed strategies
+
+    methods:
+        decide(game, player): returns the (action, amount) to play, used by Game.handle_player_action
+    """
+    def __init__(self, policy, fallback=None, seed=None):
+        """
+        :param policy: Policy object or the directory of one
+        :param fallback: bot for games that aren't heads up
+        :param seed: seed for the random number generator
+        """
+        self.policy = policy if isinstance(policy, Policy) else Policy(policy)
+        self.fallback = fallback
+        self.rng = random.Random(seed)
+
+    def decide(self, game, player) -> tuple[str, int]:
+        """
+        picks an action for a player
+        :param game: Game object
+        :param player: the player the bot is playing for
+        :return: (action, amount), action is "fold", "check", "call" or "bet"
+        """
+        if len(game.players) != 2:
+            if self.fallback is not None:
+                return self.fallback.decide(game, player)
+            return "check", 0
+
+        # heads up the small blind is the player after the dealer
+        small = game.players[(game.dealer_index + 1) % 2]
+        seats = (small, game.players[game.dealer_index % 2])
+        me = seats.index(player)
+        # real chips to the policy's chips
+        scale = self.policy.config["big_blind"] / game.big_blind
+        total = tuple(round(p.total_bet * scale) for p in seats)
+        bets = tuple(round(p.current_bet * scale) for p in seats)
+        street = STREET_NAMES.index(game.stage)
+
+        node = self.policy.nearest_node(street, me, total, bets)
+        hand = [card_to_index(card) for card in player.hand]
+        board = [card_to_index(card) for card in game.community_cards]
+        probabilities = self.policy.strategy(node, self.policy.abstraction.bucket(hand, board))
+        action, fraction = self.rng.choices(self.policy.tree.actions[node], probabilities)[0]
+        if action != "bet":
+            return action, 0
+
+        call_amount = max(0, game.minimum_bet - player.current_bet)
+        if fraction is None:
+            return "bet", player.chips
+        return "bet", min(call_amount + max(game.big_blind, int((game.pot + call_amount) * fraction)), player.chips)
@@ -0,0 +1,115 @@
+"""
+checkpoints of a running Game, so a long simulation can go on after a crash instead of starting over
+
+a checkpoint is a small JSON file with everything the next hands depend on:
+    - the players still seated (name and chips, in seat order) and the ones eliminated
+    - dealer_index and the blinds
+    - the state of the generator the decks shuffle with, and of every bot that has an rng attribute
+    - the stats so far (a StatsAggregator summary) and whatever else the caller adds (ex. hands played)
+it is taken between hands, when nothing else is in flight, and written to a .tmp file that replaces the old one,
+so a crash while writing leaves the previous checkpoint as it was
+
+restoring it and playing on gives exactly the hands an uninterrupted run would have played, as long as the bots
+only use their rng (a time budget isn't repeatable, see shared_results.mcts_bot)
+shared_results.simulate_games() checkpoints every worker this way
+"""
+import json
+import os
+import random
+
+from deck import thread_rng
+from stats import StatsAggregator
+
+
+def rng_state(rng: random.Random) -> list:
+    """
+    :param rng: generator
+    :return: its state as JSON friendly lists
+    """
+    version, internal, gauss_next = rng.getstate()
+    return [version, list(internal), gauss_next]
+
+
+def set_rng_state(rng: random.Random, state: list) -> None:
+    """
+    :param rng: generator
+    :param state: made by rng_state()
+    :return: None
+    """
+    version, internal, gauss_next = state
+    rng.setstate((version, tuple(internal), gauss_next))
+
+
+def game_state(game, stats: StatsAggregator = None, **extra) -> dict:
+    """
+    takes the state of a game between two hands
+    :param game: Game object
+    :param stats: aggregator listening to the game, None if there isn't one
+    :param extra: anything else to keep (numbers, strings, lists, dictionaries)
+    :return: dictionary for save_checkpoint() and restore_game()
+    """
+    state = {
+        "players": [[player.name, player.chips] for player in game.players],
+        "eliminated": list(game.eliminated),
+        "dealer_index": game.dealer_index,
+        "small_blind": game.small_blind,
+        "big_blind": game.big_blind,
+        # without a generator of its own the game shuffles with the thread's
+        "rng": rng_state(game.rng or thread_rng()),
+        "bots": {name: rng_state(bot.rng) for name, bot in game.bots.items()
+                 if isinstance(getattr(bot, "rng", None), random.Random)},
+        "stats": stats.summary() if stats is not None else None,
+    }
+    state.update(extra)
+    return state
+
+
+def restore_game(game, state: dict, stats: StatsAggregator = None) -> None:
+    """
+    puts a game back where game_state() found it, the game has to have the same players and bots
+    :param game: Game object
+    :param state: made by game_state() (or read by load_checkpoint())
+    :param stats: empty aggregator to fill with the saved stats, None to skip them
+    :return: None
+    """
+    # a fresh game still seats the players eliminated before the checkpoint, they are dropped here
+    players = {player.name: player for player in game.players}
+    missing = [name for name, _ in state["players"] if name not in players]
+    if missing:
+        raise ValueError(f"the checkpoint has players this game doesn't: {', '.join(missing)}")
+
+    game.players = [players[name] for name, _ in state["players"]]
+    for player, (_, chips) in zip(game.players, state["players"]):
+        player.chips = chips
+    game.eliminated = list(state["eliminated"])
+    game.dealer_index = state["dealer_index"]
+    game.small_blind = state["small_blind"]
+    game.big_blind = state["big_blind"]
+    set_rng_state(game.rng or thread_rng(), state["rng"])
+    for name, bot_state in state["bots"].items():
+        set_rng_state(game.bots[name].rng, bot_state)
+    if stats is not None and state["stats"] is not None:
+        stats.merge(state["stats"])
+
+
+def save_checkpoint(path: str, state: dict) -> None:
+    """
+    writes a checkpoint, replacing the old one only once the new one is complete
+    :param path: file path
+    :param state: made by game_state()
+    :return: None
+    """
+    with open(path + ".tmp", "w") as file:
+        json.dump(state, file)
+    os.replace(path + ".tmp", path)
+
+
+def load_checkpoint(path: str) -> dict | None:
+    """
+    :param path: file path
+    :return: the saved state, None if there is no checkpoint yet
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        return json.load(file)
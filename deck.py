@@ -1,14 +1,39 @@
 import random
+import threading
 from typing import Any
 
 from card import Card
 
+# every thread shuffles with its own generator, threads never share one (see parallel.py)
+_local = threading.local()
+
+
+def thread_rng() -> random.Random:
+    """
+    :return: the calling thread's random number generator, made the first time the thread asks for it
+    """
+    rng = getattr(_local, "rng", None)
+    if rng is None:
+        rng = _local.rng = random.Random()
+    return rng
+
+
+def seed_thread(seed) -> None:
+    """
+    gives the calling thread a new generator with a seed, so its shuffles can be repeated
+    :param seed: seed for random.Random
+    :return: None
+    """
+    _local.rng = random.Random(seed)
+
+
 class Deck:
     """
     a class representing a standard deck of 52 playing cards
 
     attributes:
         cards (list): a list of Card objects representing the deck of cards
+        rng (random.Random): generator used to shuffle, None for the thread's own (thread_rng())
 
     methods:
         __init__(): initializes a standard deck of 52 playing cards and shuffles them (constructor)
@@ -16,13 +41,15 @@ class Deck:
         deal(): deals a single card from the top of the deck
         reset_deck(): resets the deck to a standard deck of 52 playing cards and shuffles them
     """
-    def __init__(self):
+    def __init__(self, rng: random.Random = None):
         """
         initializes a standard deck of 52 playing cards and shuffles them
+        :param rng: generator used to shuffle, None for the thread's own
 
         the deck consists of 4 suits (spades, hearts, diamonds, clubs) in symbol form and 13 ranks (2-10, J, Q, K, A)
         each card is represented by a Card object
         """
+        self.rng = rng
         self.cards: list[Card] = []
         suits = ['♠', '♥', '♦', '♣']
         ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
@@ -35,10 +62,10 @@ class Deck:
 
     def shuffle(self) -> None:
         """
-        shuffles the deck of cards in place using the random.shuffle() method
+        shuffles the deck of cards in place with the deck's generator (or the thread's)
         :return: None
         """
-        random.shuffle(self.cards)
+        (self.rng or thread_rng()).shuffle(self.cards)
 
     def deal(self) -> Any | None:
         """
@@ -56,4 +83,4 @@ class Deck:
         resets the deck to a standard deck of 52 playing cards and shuffles them
         :return: None
         """
-        self.__init__() 
+        self.__init__(self.rng)
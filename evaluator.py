@@ -0,0 +1,176 @@
+"""
+fast hand evaluator that works on integer card ids instead of Card objects
+
+cards are encoded with card.card_to_index (rank index * 4 + suit index) and a hand of 5 to 7 cards
+is turned into a single integer key, a bigger key is a better hand, equal keys are a split pot
+
+key layout:
+    bits 20+ : the category, using the same numbers as game.hand_strength (0 = high card ... 9 = royal flush)
+    bits 0-19: up to five rank indexes (0 = 2 ... 12 = A), 4 bits each, most important first
+
+all the lookup tables are built once at import time and are tuples, so they can be shared between threads
+"""
+from card import Card, card_to_index
+
+HIGH_CARD = 0
+PAIR = 1
+TWO_PAIR = 2
+THREE_OF_A_KIND = 3
+STRAIGHT = 4
+FLUSH = 5
+FULL_HOUSE = 6
+FOUR_OF_A_KIND = 7
+STRAIGHT_FLUSH = 8
+ROYAL_FLUSH = 9
+
+# same names (and order) as the hand_strength dictionary in game.py
+CATEGORY_NAMES = ("high card", "pair", "two pair", "three of a kind", "straight",
+                  "flush", "full house", "four of a kind", "straight flush", "royal flush")
+
+
+def _straight_high(mask: int) -> int:
+    """
+    finds the highest straight in a 13 bit rank mask
+    :param mask: bit i is set if rank index i is present
+    :return: rank index of the top card of the best straight, or -1 if there is none
+    """
+    for high in range(12, 3, -1):
+        needed = 0b11111 << (high - 4)
+        if mask & needed == needed:
+            return high
+    # the wheel (A, 2, 3, 4, 5) is a 5 high straight
+    wheel = (1 << 12) | 0b1111
+    if mask & wheel == wheel:
+        return 3
+    return -1
+
+
+def _top_ranks(mask: int) -> tuple:
+    """
+    :param mask: 13 bit rank mask
+    :return: the rank indexes present in the mask, highest first
+    """
+    return tuple(rank for rank in range(12, -1, -1) if mask >> rank & 1)
+
+
+STRAIGHT_HIGH = tuple(_straight_high(mask) for mask in range(1 << 13))
+TOP_RANKS = tuple(_top_ranks(mask) for mask in range(1 << 13))
+BIT_COUNT = tuple(len(ranks) for ranks in TOP_RANKS)
+
+
+def _pack(category: int, ranks) -> int:
+    """
+    packs a category and up to five ranks into a single key
+    :param category: hand category (0-9)
+    :param ranks: rank indexes, most important first
+    :return: integer hand key
+    """
+    key = category
+    count = 0
+    for rank in ranks:
+        key = (key << 4) | rank
+        count += 1
+    return key << (4 * (5 - count))
+
+
+def evaluate_state(rank_counts, suit_masks) -> int:
+    """
+    evaluates a hand that has already been split into rank counts and suit masks
+    this is what evaluate() uses internally, it is public so callers that keep a running state
+    (adding one card at a time) don't have to rebuild it for every card
+    :param rank_counts: list of 13 counts, how many cards of each rank are in the hand
+    :param suit_masks: list of 4 rank masks, one for each suit
+    :return: integer hand key
+    """
+    rank_mask = suit_masks[0] | suit_masks[1] | suit_masks[2] | suit_masks[3]
+
+    flush_mask = 0
+    for mask in suit_masks:
+        if BIT_COUNT[mask] >= 5:
+            flush_mask = mask
+            high = STRAIGHT_HIGH[mask]
+            if high == 12:
+                return _pack(ROYAL_FLUSH, (12,))
+            if high >= 0:
+                return _pack(STRAIGHT_FLUSH, (high,))
+
+    quads = -1
+    trips = []
+    pairs = []
+    for rank in range(12, -1, -1):
+        count = rank_counts[rank]
+        if count == 4:
+            quads = rank
+        elif count == 3:
+            trips.append(rank)
+        elif count == 2:
+            pairs.append(rank)
+
+    if quads >= 0:
+        return _pack(FOUR_OF_A_KIND, (quads,) + TOP_RANKS[rank_mask & ~(1 << quads)][:1])
+
+    if trips and (len(trips) > 1 or pairs):
+        # with 7 cards the "pair" of a full house can also come from a second set of trips
+        second = trips[1] if len(trips) > 1 else -1
+        if pairs and pairs[0] > second:
+            second = pairs[0]
+        return _pack(FULL_HOUSE, (trips[0], second))
+
+    if flush_mask:
+        return _pack(FLUSH, TOP_RANKS[flush_mask][:5])
+
+    high = STRAIGHT_HIGH[rank_mask]
+    if high >= 0:
+        return _pack(STRAIGHT, (high,))
+
+    if trips:
+        return _pack(THREE_OF_A_KIND, (trips[0],) + TOP_RANKS[rank_mask & ~(1 << trips[0])][:2])
+
+    if len(pairs) >= 2:
+        used = (1 << pairs[0]) | (1 << pairs[1])
+        return _pack(TWO_PAIR, (pairs[0], pairs[1]) + TOP_RANKS[rank_mask & ~used][:1])
+
+    if pairs:
+        return _pack(PAIR, (pairs[0],) + TOP_RANKS[rank_mask & ~(1 << pairs[0])][:3])
+
+    return _pack(HIGH_CARD, TOP_RANKS[rank_mask][:5])
+
+
+def evaluate(cards) -> int:
+    """
+    evaluates 5 to 7 cards given as integer ids
+    :param cards: iterable of card ids (0-51)
+    :return: integer hand key, bigger is better
+    """
+    rank_counts = [0] * 13
+    suit_masks = [0, 0, 0, 0]
+    for card in cards:
+        rank = card >> 2
+        rank_counts[rank] += 1
+        suit_masks[card & 3] |= 1 << rank
+    return evaluate_state(rank_counts, suit_masks)
+
+
+def evaluate_cards(cards: list[Card]) -> int:
+    """
+    evaluates 5 to 7 Card objects (ex. player.hand + community_cards)
+    :param cards: list of Card objects
+    :return: integer hand key, bigger is better
+    """
+    return evaluate(card_to_index(card) for card in cards)
+
+
+def category(key: int) -> int:
+    """
+    :param key: integer hand key
+    :return: the category of the hand (same numbers as game.hand_strength)
+    """
+    return key >> 20
+
+
+def category_name(key: int) -> str:
+    """
+    :param key: integer hand key
+    :return: the name of the category (ex. "full house")
+    """
+    return CATEGORY_NAMES[key >> 20]
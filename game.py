@@ -2,7 +2,11 @@ import os
 import time
 from collections import Counter
 from itertools import combinations
+from card import card_to_index
 from deck import Deck
+from evaluator import category_name, evaluate_cards
+from outs import OutsAnalyzer
+from settlement import settle_game
 
 hand_strength = {
     "high card": 0,
@@ -176,6 +180,37 @@ def is_royal_flush(five_card_hand) -> bool:
     return False
 
 
+def rank_hand(all_cards: list) -> tuple[str, list]:
+    """
+    finds the best hand a player can make, trying the hand types from best to worst
+    this is the reference every faster evaluator is checked against (see verify_evaluator.py)
+    := combines assignment and comparison of a value to a variable (called a walrus operator)
+    :param all_cards: list of Card objects (player's hand + community cards)
+    :return: the name of the hand type (a key of hand_strength) and the best five cards, highest rank first
+    """
+    if best_hand := get_best_hand(all_cards, is_royal_flush):
+        return "royal flush", best_hand
+    elif best_hand := get_best_hand(all_cards, is_straight_flush):
+        return "straight flush", best_hand
+    elif best_hand := get_best_hand(all_cards, is_four_of_a_kind):
+        return "four of a kind", best_hand
+    elif best_hand := get_best_hand(all_cards, is_full_house):
+        return "full house", best_hand
+    elif best_hand := get_best_hand(all_cards, is_flush):
+        return "flush", best_hand
+    elif best_hand := get_best_hand(all_cards, is_straight):
+        return "straight", best_hand
+    elif best_hand := get_best_hand(all_cards, is_three_of_a_kind):
+        return "three of a kind", best_hand
+    elif best_hand := get_best_hand(all_cards, is_two_pair):
+        return "two pair", best_hand
+    elif best_hand := get_best_hand(all_cards, is_pair):
+        return "pair", best_hand
+    else:
+        best_hand = get_best_hand(all_cards, is_high_card)
+        return "high card", best_hand
+
+
 class Game:
     """
     a class representing a poker game
@@ -191,6 +226,12 @@ class Game:
         small_blind (int): the small blind amount
         big_blind (int): the big blind amount
         stage (str): the current stage of the game (preflop, flop, turn, river)
+        event_listeners (list): functions called with every game event (ex. stats.StatsAggregator.consume)
+        eliminated (list[str]): names of the players knocked out, in the order they went out
+        bots (dict): player name -> bot that plays that seat instead of asking for input (ex. mcts.MCTSBot)
+        rng (random.Random): generator the decks are shuffled with, None for the thread's own (deck.thread_rng)
+        headless (bool): True to skip the printing, pauses and screen clearing, for simulations where every seat is a bot
+        outs (outs.OutsAnalyzer): outs and draws of the players still in, for the prompt and for bots
 
     methods:
         this would take too long, so I will not write it, you got this Mr. Perry :)
@@ -206,6 +247,7 @@ class Game:
         """
 
         self.players = players
+        self.rng = None
         self.deck = Deck()
         self.pot = 0
         self.community_cards = []
@@ -215,14 +257,71 @@ class Game:
         self.small_blind = 10
         self.big_blind = 20
         self.stage = "preflop"
+        self.event_listeners = []
+        self.bots = {}
+        self.eliminated = []
+        self.outs = OutsAnalyzer(self)
+        self.headless = False
+
+    def pause(self, seconds: float) -> None:
+        """
+        waits so people can read the screen, unless the game is headless
+        :param seconds: how long to wait
+        :return: None
+        """
+        if not self.headless:
+            time.sleep(seconds)
+
+    def clear(self) -> None:
+        """
+        clears the screen, unless the game is headless
+        :return: None
+        """
+        if not self.headless:
+            clear_screen()
+
+    def say(self, *values) -> None:
+        """
+        prints the table's messages, unless the game is headless (nobody is reading them)
+        :param values: what to print, same as print()
+        :return: None
+        """
+        if not self.headless:
+            print(*values)
+
+    def emit(self, event_type: str, **data) -> None:
+        """
+        sends an event to every listener, events are plain dictionaries with a "type" key
+        types: hand_start, blind, action, showdown, win, hand_end
+        :param event_type: the type of the event
+        :param data: the rest of the event
+        :return: None
+        """
+        if not self.event_listeners:
+            return
+        event = {"type": event_type, **data}
+        for listener in self.event_listeners:
+            listener(event)
+
+    def emit_hand_end(self) -> None:
+        """
+        sends the hand_end event: final chips, and what a hand history needs to replay the result
+        (hole cards and board as card ids, who folded, what everyone put in)
+        :return: None
+        """
+        if not self.event_listeners:
+            return
+        self.emit("hand_end", players=[p.name for p in self.players], chips=[p.chips for p in self.players],
+                  hands=[[card_to_index(card) for card in p.hand] for p in self.players],
+                  board=[card_to_index(card) for card in self.community_cards],
+                  folded=[p.folded for p in self.players], contributions=[p.total_bet for p in self.players])
 
     def reset_round(self) -> None:
         """
         resets the game state for a new round
         :return: None
         """
-        self.deck = Deck()
-        self.deck.shuffle()
+        self.deck = Deck(self.rng)
         self.community_cards = []
         self.pot = 0
         self.minimum_bet = self.big_blind
@@ -261,87 +360,117 @@ class Game:
         main game loop
         this method handles game flow, which includes dealing cards,
         betting rounds, and determining the winners
+        after every hand, also one everybody folded to, busted players are eliminated and the dealer moves one seat
         :return: None
         """
         while True:
-            self.reset_round()
-            self.deal_cards()
-            print("Dealing cards, a new round is starting")
-            time.sleep(2)
-            clear_screen()
-            self.pre_flop()
-            if self.only_one_player_remaining():
-                self.give_chips()
-                continue
+            self.play_hand()
 
-            print("Flop starting...")
-            time.sleep(2)
+            eliminated_players = [player for player in self.players if player.chips <= 0]
+            for player in eliminated_players:
+                self.say(f"{player.name} is eliminated, nice try")
+                self.players.remove(player)
+                self.eliminated.append(player.name)
 
-            self.flop()
-            if self.only_one_player_remaining():
-                self.give_chips()
-                time.sleep(2)
-                continue
+            self.pause(2)
 
-            print("Turn starting...")
-            time.sleep(2)
+            if len(self.players) == 1:
+                self.say(f"{self.players[0].name} is the winner of the game!")
+                break
 
-            self.turn()
-            if self.only_one_player_remaining():
-                self.give_chips()
-                time.sleep(2)
-                continue
+            self.dealer_index = (self.dealer_index + 1) % len(self.players)
+            self.clear()
 
-            print("River starting...")
-            time.sleep(2)
+        self.say("Game over!")
+        self.say("Thanks for playing!")
+        
+    def play_hand(self) -> None:
+        """
+        plays a single hand, from dealing to paying the winners (nobody is eliminated and the dealer doesn't move)
+        :return: None
+        """
+        self.reset_round()
+        self.deal_cards()
+        self.emit("hand_start", players=[p.name for p in self.players], chips=[p.chips for p in self.players],
+                  dealer_index=self.dealer_index)
+        self.say("Dealing cards, a new round is starting")
+        self.pause(2)
+        self.clear()
+        self.pre_flop()
+        if self.only_one_player_remaining():
+            self.give_chips()
+            self.emit_hand_end()
+            return
 
-            self.river()
-            if self.only_one_player_remaining():
-                self.give_chips()
-                time.sleep(2)
-                continue
+        self.say("Flop starting...")
+        self.pause(2)
 
-            hand_rankings = self.evaluate_hand()
-            top_rank = hand_rankings[0][1]
-            top_hand = hand_rankings[0][2]
-            winners = [entry[0] for entry in hand_rankings if entry[1] == top_rank and entry[2] == top_hand]
-            print("Calculating winners...")
-            time.sleep(2)
-            if len(winners) == 1:
-                print(f"{winners[0].name} wins with a {top_rank}: {', '.join(str(card) for card in top_hand)}")
-                winners[0].chips += self.pot
-                print(f"{winners[0].name} now has {winners[0].chips} chips")
-            else:
-                print(f"It's a tie between: {', '.join(player.name for player in winners)} with a {top_rank}: {', '.join(str(card) for card in top_hand)}")
-                split = self.pot // len(winners)
-                for w in winners:
-                    w.chips += split
-                    print(f"{w.name} now has {w.chips} chips")
+        self.flop()
+        if self.only_one_player_remaining():
+            self.give_chips()
+            self.emit_hand_end()
+            self.pause(2)
+            return
 
-            for player in self.players:
-                if player not in winners:
-                    print(f"{player.name}'s hand: {player.show_hand()}")
+        self.say("Turn starting...")
+        self.pause(2)
 
-            self.pot = 0
-            time.sleep(2)
+        self.turn()
+        if self.only_one_player_remaining():
+            self.give_chips()
+            self.emit_hand_end()
+            self.pause(2)
+            return
 
-            eliminated_players = [player for player in self.players if player.chips <= 0]
-            for player in eliminated_players:
-                print(f"{player.name} is eliminated, nice try")
-                self.players.remove(player)
+        self.say("River starting...")
+        self.pause(2)
 
-            time.sleep(2)
+        self.river()
+        if self.only_one_player_remaining():
+            self.give_chips()
+            self.emit_hand_end()
+            self.pause(2)
+            return
 
-            if len(self.players) == 1:
-                print(f"{self.players[0].name} is the winner of the game!")
-                break
+        keys = [None if player.folded else evaluate_cards(player.hand + self.community_cards)
+                for player in self.players]
+        best = max(key for key in keys if key is not None)
+        self.say("Calculating winners...")
+        self.pause(2)
+        winnings, pots = settle_game(self, keys)
+        winners = [player for player, won in zip(self.players, winnings) if won > 0]
+        # an uncalled bet that comes back isn't a win at showdown
+        showdown_winners = {player.name for _, eligible, pot_winners in pots if len(eligible) > 1
+                            for player in pot_winners}
+        ranked = sorted((entry for entry in zip(self.players, keys) if entry[1] is not None),
+                        key=lambda entry: entry[1], reverse=True)
+        self.emit("showdown", players=[player.name for player, _ in ranked],
+                  winners=[player.name for player, _ in ranked if player.name in showdown_winners],
+                  hand=category_name(best))
+
+        for i, (amount, eligible, pot_winners) in enumerate(pots):
+            pot_name = "the main pot" if i == 0 else f"side pot {i}"
+            hand = category_name(keys[self.players.index(pot_winners[0])])
+            if len(eligible) == 1:
+                self.say(f"{pot_winners[0].name} gets back {amount} nobody called")
+            elif len(pot_winners) == 1:
+                self.say(f"{pot_winners[0].name} wins {pot_name} of {amount} with a {hand}: {pot_winners[0].show_hand()}")
+            else:
+                self.say(f"It's a tie between: {', '.join(player.name for player in pot_winners)} for {pot_name} of {amount} with a {hand}")
 
-            self.dealer_index = (self.dealer_index + 1) % len(self.players)
-            clear_screen()
+        for player, won in zip(self.players, winnings):
+            if won > 0:
+                self.emit("win", player=player.name, amount=won)
+                self.say(f"{player.name} now has {player.chips} chips")
+
+        for player in self.players:
+            if player not in winners:
+                self.say(f"{player.name}'s hand: {player.show_hand()}")
+
+        self.pot = 0
+        self.emit_hand_end()
+        self.pause(2)
 
-        print("Game over!")
-        print("Thanks for playing!")
-        
     def not_folded_index(self) -> int:
         """
         returns the index of the first player who has not folded
@@ -363,19 +492,19 @@ class Game:
         :return: None
         """
         if not self.only_one_player_remaining():
-            time.sleep(2)
+            self.pause(2)
             return
         
         winner_idx  = self.not_folded_index()
-        print(f"{self.players[winner_idx].name} wins the pot of {self.pot}")
-        time.sleep(2)
-        self.players[winner_idx].chips += self.pot
-        print(f"{self.players[winner_idx].name} now has {self.players[winner_idx].chips} chips")
+        self.say(f"{self.players[winner_idx].name} wins the pot of {self.pot}")
+        self.pause(2)
+        # everyone else folded, so every pot (side pots too) is theirs
+        winnings, _ = settle_game(self)
+        self.emit("win", player=self.players[winner_idx].name, amount=winnings[winner_idx])
+        self.say(f"{self.players[winner_idx].name} now has {self.players[winner_idx].chips} chips")
         for player in self.players:
             if player != self.players[winner_idx]:
-                print(f"{player.name} has {player.chips} chips")
-
-        self.pot = 0
+                self.say(f"{player.name} has {player.chips} chips")
 
         for player in self.players:
             player.current_bet = 0
@@ -417,7 +546,6 @@ class Game:
     def evaluate_hand(self) -> list[tuple]:
         """
         evaluates the hands of all players and determines the best hand
-        := combines assignment and comparison of a value to a variable (called a walrus operator)
         :return: sorted list of tuples containing player and their hand ranking
         """
         hand_rankings = []
@@ -425,28 +553,8 @@ class Game:
             if player.folded:
                 continue
             
-            all_cards = player.hand + self.community_cards
-            if best_hand := get_best_hand(all_cards, is_royal_flush):
-                hand_rankings.append((player, "royal flush", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_straight_flush):
-                hand_rankings.append((player, "straight flush", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_four_of_a_kind):
-                hand_rankings.append((player, "four of a kind", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_full_house):
-                hand_rankings.append((player, "full house", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_flush):
-                hand_rankings.append((player, "flush", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_straight):
-                hand_rankings.append((player, "straight", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_three_of_a_kind):
-                hand_rankings.append((player, "three of a kind", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_two_pair):
-                hand_rankings.append((player, "two pair", best_hand))
-            elif best_hand := get_best_hand(all_cards, is_pair):
-                hand_rankings.append((player, "pair", best_hand))
-            else:
-                best_hand = get_best_hand(all_cards, is_high_card)
-                hand_rankings.append((player, "high card", best_hand))
+            name, best_hand = rank_hand(player.hand + self.community_cards)
+            hand_rankings.append((player, name, best_hand))
 
         sorted_hand_rankings = sorted(hand_rankings, key=lambda x: (hand_strength[x[1]], x[2]), reverse=True)
         return sorted_hand_rankings
@@ -458,20 +566,31 @@ class Game:
         :param player:
         :return: None
         """
+        bot = self.bots.get(player.name)
+        if bot is not None:
+            action, amount = bot.decide(self, player)
+            self.apply_action(player, action, amount)
+            return
+
         call_amount = max(0, self.minimum_bet - player.current_bet)
         print(f"Current pot:\n{self.pot}\n")
         print(f"{player}{player.show_hand()}")
+        if self.stage in ("flop", "turn"):
+            # only what this player can see, the full report knows the other hands
+            print(self.outs.report(player, visible_only=True))
         print(f"\nCurrent bet to call: {self.minimum_bet}\nYou have bet: {player.current_bet}\n")
         action = input("bet/fold/check/call\n").strip().lower()
         if action == "fold":
             player.fold()
+            self.emit("action", player=player.name, stage=self.stage, action="fold", amount=0)
         elif action == "call":
             actual_call = min(call_amount, player.chips)
             player.bet(actual_call)
             self.pot += actual_call
+            self.emit("action", player=player.name, stage=self.stage, action="call", amount=actual_call)
             if actual_call < call_amount:
                 print(f"You are all in, you have bet {actual_call}")
-                time.sleep(1)
+                self.pause(1)
         elif action == "check" or action == "":
             if player.current_bet < self.minimum_bet != 0:
                 print("You must call")
@@ -479,21 +598,25 @@ class Game:
                 call_or_fold = input("call/fold\n").strip().lower()
                 if call_or_fold == "fold":
                     player.fold()
+                    self.emit("action", player=player.name, stage=self.stage, action="fold", amount=0)
                 elif call_or_fold == "call":
                     actual_call = min(call_amount, player.chips)
                     player.bet(actual_call)
                     self.pot += actual_call
+                    self.emit("action", player=player.name, stage=self.stage, action="call", amount=actual_call)
 
                     if actual_call < call_amount:
                         print(f"You are all in, you have bet {actual_call}")
-                        time.sleep(1)
+                        self.pause(1)
                 else:
                     print("You mistyped, so you automatically folded")
                     player.fold()
+                    self.emit("action", player=player.name, stage=self.stage, action="fold", amount=0)
 
             else:
                 print("You checked")
-                time.sleep(0.5)
+                self.emit("action", player=player.name, stage=self.stage, action="check", amount=0)
+                self.pause(0.5)
         elif action == "bet":
             while True:
                 try:
@@ -508,9 +631,10 @@ class Game:
                         self.pot += actual_bet
                         self.minimum_bet = player.current_bet
                         self.last_raiser_index = self.players.index(player)
+                        self.emit("action", player=player.name, stage=self.stage, action="bet", amount=actual_bet)
                         if actual_bet < bet_amount:
                             print(f"You are all in, you have bet {actual_bet}")
-                            time.sleep(1)
+                            self.pause(1)
                         break
                     else:
                         print(f"Too low, you must bet at least {self.minimum_bet}")
@@ -518,9 +642,44 @@ class Game:
                     print("Please try again. That was not a valid number.")
         else:
             print("That was not a valid command. Please try again.")
-            time.sleep(1)
+            self.pause(1)
             self.handle_player_action(player)
 
+    def apply_action(self, player, action: str, amount: int = 0) -> None:
+        """
+        applies an action without asking for input, used for bot seats
+        follows the same rules as handle_player_action: checking when there is a bet to call is a fold,
+        a bet has to be at least the big blind and at least the call amount, and is capped at the player's chips
+        :param player: the player acting
+        :param action: "fold", "check", "call" or "bet"
+        :param amount: number of chips to bet (only used for "bet")
+        :return: None
+        """
+        call_amount = max(0, self.minimum_bet - player.current_bet)
+        if action == "check" and call_amount > 0:
+            action = "fold"
+
+        if action == "fold":
+            player.fold()
+            amount = 0
+        elif action == "call":
+            amount = min(call_amount, player.chips)
+            player.bet(amount)
+            self.pot += amount
+        elif action == "bet":
+            amount = min(max(amount, self.big_blind, call_amount), player.chips)
+            player.bet(amount)
+            self.pot += amount
+            if player.current_bet > self.minimum_bet:
+                self.minimum_bet = player.current_bet
+                self.last_raiser_index = self.players.index(player)
+        else:
+            action = "check"
+            amount = 0
+
+        self.say(f"{player.name} {action}s{f' {amount}' if amount else ''}")
+        self.emit("action", player=player.name, stage=self.stage, action=action, amount=amount)
+
     def flop(self) -> None:
         """
         deals the flop (three community cards) and starts the betting round
@@ -549,8 +708,9 @@ class Game:
         :param phase_name: name of the phase (flop, turn, river)
         :return: None
         """
-        clear_screen()
+        self.clear()
         self.minimum_bet = 0
+        self.stage = phase_name.lower()
         deal_phase_func()
         self.clear_bets()
 
@@ -564,24 +724,24 @@ class Game:
                 player.bet(call_amount)
                 self.pot += call_amount
 
-            print(f"\n{player.name} auto-checks and all other players are all in")
-            time.sleep(1)
+            self.say(f"\n{player.name} auto-checks and all other players are all in")
+            self.pause(1)
 
-            print(f"community cards: {', '.join(str(card) for card in self.community_cards)}\n")
+            self.say(f"community cards: {', '.join(str(card) for card in self.community_cards)}\n")
             for p in not_folded:
-                print(f"{p.name}: {p.show_hand()}")
+                self.say(f"{p.name}: {p.show_hand()}")
 
-            time.sleep(2)
+            self.pause(2)
             return
 
 
         if all(player.is_all_in() or player.folded for player in self.players):
-            print("All players are all in or folded.")
-            print(f"community cards: {', '.join(str(card) for card in self.community_cards)}\n")
+            self.say("All players are all in or folded.")
+            self.say(f"community cards: {', '.join(str(card) for card in self.community_cards)}\n")
             for p in self.players:
-                print(f"{p.name}'s hand: {p.show_hand()}")
+                self.say(f"{p.name}'s hand: {p.show_hand()}")
 
-            time.sleep(1)
+            self.pause(1)
             return
 
         players_acted_since_last_raise = 0
@@ -589,9 +749,9 @@ class Game:
         index = (self.dealer_index + 1) % len(self.players)
         self.last_raiser_index = 0
         while True:
-            print(f"{phase_name} community cards:\n{', '.join(str(card) for card in self.community_cards)}\n")
+            self.say(f"{phase_name} community cards:\n{', '.join(str(card) for card in self.community_cards)}\n")
             if self.only_one_player_remaining():
-                print("Only one player remaining")
+                self.say("Only one player remaining")
                 break
 
             player = self.players[index]
@@ -608,11 +768,11 @@ class Game:
                     else:
                         players_acted_since_last_raise += 1
             elif not player.folded and player.is_all_in():
-                print(f"{player.name} is all in")
+                self.say(f"{player.name} is all in")
                 #print(f"{player.name}'s hand is {player.show_hand()}")
                 players_acted_since_last_raise += 1
 
-            clear_screen()
+            self.clear()
 
             """
             print(f"index: {index}")
@@ -626,8 +786,8 @@ class Game:
 
             # this line right here was absolute torture to figure out, what should have been a simple if statement took probably 3 days of trial and error
             if (index == self.last_raiser_index or players_acted_since_last_raise >= len([p for p in self.players if not p.folded])) and self.all_bets_equal():
-                clear_screen()
-                print(f"{phase_name} over")
+                self.clear()
+                self.say(f"{phase_name} over")
                 break
 
             index = (index + 1) % len(self.players)
@@ -635,23 +795,29 @@ class Game:
             if not self.players[index].folded and not self.players[index].is_all_in():
                 print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
                 input(f"{self.players[index].name}, press enter to continue\n")
-                clear_screen()
+                self.clear()
                 pass
             elif self.players[index].is_all_in() and not self.players[index].folded:
                 print(f"{self.players[index].name} is all in")
-                time.sleep(2)
+                self.pause(2)
                 index = (index + 1) % len(self.players)
                 
             """
+            if all(p.folded or p.is_all_in() for p in self.players):
+                # nobody can act anymore, without this the loop below never finds a player
+                self.say("All players are all in or folded.")
+                break
+
             while self.players[index].folded or self.players[index].is_all_in():
                 if self.players[index].is_all_in():
-                    print(f"{self.players[index].name} is all in")
-                    time.sleep(1.5)
+                    self.say(f"{self.players[index].name} is all in")
+                    self.pause(1.5)
                 index = (index + 1) % len(self.players)
 
-            print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
-            input(f"{self.players[index].name}, press enter to continue\n")
-            clear_screen()
+            if self.players[index].name not in self.bots:
+                print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
+                input(f"{self.players[index].name}, press enter to continue\n")
+            self.clear()
 
 
     def pre_flop(self) -> None:
@@ -660,7 +826,7 @@ class Game:
         has to be different from the rest because of the blinds
         :return: None
         """
-        clear_screen()
+        self.clear()
         small = (self.dealer_index + 1) % len(self.players)
         big = (self.dealer_index + 2) % len(self.players)
         index = (self.dealer_index + 3) % len(self.players)
@@ -671,15 +837,17 @@ class Game:
         self.pot += self.small_blind + self.big_blind
         self.last_raiser_index = big
         self.minimum_bet = self.big_blind
-        print(f"small blind is {self.players[small].name} and has bet {self.small_blind}")
-        print(f"big blind is {self.players[big].name} and has bet {self.big_blind}\n")
+        self.emit("blind", player=self.players[small].name, amount=self.small_blind)
+        self.emit("blind", player=self.players[big].name, amount=self.big_blind)
+        self.say(f"small blind is {self.players[small].name} and has bet {self.small_blind}")
+        self.say(f"big blind is {self.players[big].name} and has bet {self.big_blind}\n")
 
-        print(f"{self.players[index].name} is up")
-        time.sleep(3)
+        self.say(f"{self.players[index].name} is up")
+        self.pause(3)
 
         while True:
             if self.only_one_player_remaining():
-                print('Only one player remaining')
+                self.say('Only one player remaining')
                 break
 
             player = self.players[index] 
@@ -694,21 +862,21 @@ class Game:
                     else:
                         players_acted_since_last_raise += 1
 
-            clear_screen()
+            self.clear()
 
-            print(f"index: {index}")
-            print(f"last_raiser_index: {self.last_raiser_index}")
-            print(f"{index == self.last_raiser_index}")
-            print(f"players_acted_since_last_raise: {players_acted_since_last_raise}")
-            print(f"players: {len([p for p in self.players if not p.folded])}")
-            print(f"{players_acted_since_last_raise >= len([p for p in self.players if not p.folded])}")
-            print(f"all_bets_equal: {self.all_bets_equal()}")
+            self.say(f"index: {index}")
+            self.say(f"last_raiser_index: {self.last_raiser_index}")
+            self.say(f"{index == self.last_raiser_index}")
+            self.say(f"players_acted_since_last_raise: {players_acted_since_last_raise}")
+            self.say(f"players: {len([p for p in self.players if not p.folded])}")
+            self.say(f"{players_acted_since_last_raise >= len([p for p in self.players if not p.folded])}")
+            self.say(f"all_bets_equal: {self.all_bets_equal()}")
 
 
             # same thing with this line since they're the same
             if (index == self.last_raiser_index or players_acted_since_last_raise >= len([p for p in self.players if not p.folded])) and self.all_bets_equal():
-                clear_screen()
-                print("Preflop over")
+                self.clear()
+                self.say("Preflop over")
                 break
 
             index = (index + 1) % len(self.players)
@@ -722,16 +890,22 @@ class Game:
                 else:
                     print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
                     input(f"{self.players[index].name}, press enter to continue\n")
-                    clear_screen()
+                    self.clear()
                     pass
             """
 
+            if all(p.folded or p.is_all_in() for p in self.players):
+                # nobody can act anymore, without this the loop below never finds a player
+                self.say("All players are all in or folded.")
+                break
+
             while self.players[index].folded or self.players[index].is_all_in():
                 if self.players[index].is_all_in():
-                    print(f"{self.players[index].name} is all in")
-                    time.sleep(1.5)
+                    self.say(f"{self.players[index].name} is all in")
+                    self.pause(1.5)
                 index = (index + 1) % len(self.players)
 
-            print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
-            input(f"{self.players[index].name}, press enter to continue\n")
-            clear_screen()
+            if self.players[index].name not in self.bots:
+                print(f"Switching to {self.players[index].name}'s turn, please give the laptop to them")
+                input(f"{self.players[index].name}, press enter to continue\n")
+            self.clear()
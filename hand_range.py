@@ -0,0 +1,402 @@
+"""
+hand ranges, the set of starting hands a player could be holding
+
+a range is stored as a 1326 bit integer, one bit for every two card combo, so union, intersection
+and removing blocked combos are single big integer operations instead of loops over lists of hands
+weighted ranges keep one weight per combo for ranges like "call with AKs half the time"
+
+range syntax (comma separated, the same as most poker tools):
+    AA, AKs, AKo, AK          a pair, suited, offsuit or all combos of two ranks
+    QQ+, A5o+                 the hand and everything above it (pairs go up to AA, the kicker goes up to one below)
+    22-55, A2s-A5s, T9s-76s   everything between the two hands
+    AsKh                      a single exact combo
+    AKs:0.5                   a weight (only used by WeightedRange)
+"""
+import random
+
+from card import Card, card_to_index
+from evaluator import evaluate
+
+RANK_CHARS = "23456789TJQKA"
+SUIT_CHARS = "shdc"  # same order as card.SUITS (♠, ♥, ♦, ♣)
+
+# every two card combo as a pair of card ids (low id first), the position in this list is the combo id
+COMBOS = tuple((a, b) for a in range(52) for b in range(a + 1, 52))
+COMBO_COUNT = len(COMBOS)  # 1326
+COMBO_INDEX = {combo: i for i, combo in enumerate(COMBOS)}
+
+ALL_COMBOS = (1 << COMBO_COUNT) - 1
+
+# CARD_MASKS[card] has a bit set for every combo that contains that card
+CARD_MASKS = tuple(
+    sum(1 << i for i, (a, b) in enumerate(COMBOS) if card in (a, b)) for card in range(52)
+)
+
+
+def combo_id(first: int, second: int) -> int:
+    """
+    :param first: card id of one of the cards
+    :param second: card id of the other card
+    :return: the combo id (0-1325) of the two cards, in any order
+    """
+    if first > second:
+        first, second = second, first
+    return COMBO_INDEX[(first, second)]
+
+
+def blocker_mask(cards) -> int:
+    """
+    builds a mask of every combo that uses one of the given cards
+    :param cards: Card objects or card ids (ex. community_cards)
+    :return: combo mask
+    """
+    mask = 0
+    for card in cards:
+        mask |= CARD_MASKS[_to_index(card)]
+    return mask
+
+
+def _to_index(card) -> int:
+    """
+    :param card: a Card object or a card id
+    :return: the card id
+    """
+    return card_to_index(card) if isinstance(card, Card) else card
+
+
+def _class_mask(high: int, low: int, kind: str) -> int:
+    """
+    builds the combo mask of a hand class like AKs, AKo, AK or QQ
+    :param high: rank index of the first rank
+    :param low: rank index of the second rank
+    :param kind: "s" for suited, "o" for offsuit, "" for both
+    :return: combo mask
+    """
+    mask = 0
+    for first_suit in range(4):
+        for second_suit in range(4):
+            if high == low and first_suit >= second_suit:
+                continue
+            if kind == "s" and first_suit != second_suit:
+                continue
+            if kind == "o" and first_suit == second_suit:
+                continue
+            mask |= 1 << combo_id(high * 4 + first_suit, low * 4 + second_suit)
+    return mask
+
+
+def _parse_hand(text: str) -> tuple:
+    """
+    splits a hand class like "AKs" into its ranks and kind
+    :param text: hand class
+    :return: (high rank index, low rank index, kind)
+    """
+    if len(text) not in (2, 3) or text[0] not in RANK_CHARS or text[1] not in RANK_CHARS:
+        raise ValueError(f"invalid hand: {text}")
+    kind = text[2] if len(text) == 3 else ""
+    if kind not in ("", "s", "o"):
+        raise ValueError(f"invalid hand: {text}")
+    high, low = RANK_CHARS.index(text[0]), RANK_CHARS.index(text[1])
+    if high < low:
+        high, low = low, high
+    if high == low and kind:
+        raise ValueError(f"pairs can't be suited or offsuit: {text}")
+    return high, low, kind
+
+
+def _parse_token(token: str) -> int:
+    """
+    parses a single range token (without a weight) into a combo mask
+    :param token: ex. "QQ+", "T9s-76s", "AsKh"
+    :return: combo mask
+    """
+    token = token.replace("10", "T")
+
+    if len(token) == 4 and token[1] in SUIT_CHARS and token[3] in SUIT_CHARS:
+        if token[0] not in RANK_CHARS or token[2] not in RANK_CHARS or token[:2] == token[2:]:
+            raise ValueError(f"invalid combo: {token}")
+        first = RANK_CHARS.index(token[0]) * 4 + SUIT_CHARS.index(token[1])
+        second = RANK_CHARS.index(token[2]) * 4 + SUIT_CHARS.index(token[3])
+        return 1 << combo_id(first, second)
+
+    if "-" in token:
+        top, bottom = token.split("-")
+        high, low, kind = _parse_hand(top)
+        bottom_high, bottom_low, bottom_kind = _parse_hand(bottom)
+        if kind != bottom_kind:
+            raise ValueError(f"both ends of a range must be the same kind: {token}")
+        if high == low and bottom_high == bottom_low:
+            # pairs, ex. 22-55
+            ranks = range(min(high, bottom_high), max(high, bottom_high) + 1)
+            return _or_all(_class_mask(rank, rank, "") for rank in ranks)
+        if high == bottom_high:
+            # same first rank, ex. A2s-A5s
+            ranks = range(min(low, bottom_low), max(low, bottom_low) + 1)
+            return _or_all(_class_mask(high, rank, kind) for rank in ranks)
+        if high - low == bottom_high - bottom_low:
+            # same gap, ex. T9s-76s
+            steps = range(abs(high - bottom_high) + 1)
+            start = min(high, bottom_high)
+            return _or_all(_class_mask(start + step, start + step - (high - low), kind) for step in steps)
+        raise ValueError(f"invalid range: {token}")
+
+    if token.endswith("+"):
+        high, low, kind = _parse_hand(token[:-1])
+        if high == low:
+            return _or_all(_class_mask(rank, rank, "") for rank in range(low, 13))
+        return _or_all(_class_mask(high, rank, kind) for rank in range(low, high))
+
+    high, low, kind = _parse_hand(token)
+    return _class_mask(high, low, kind)
+
+
+def _or_all(masks) -> int:
+    """
+    :param masks: iterable of combo masks
+    :return: the union of all of them
+    """
+    result = 0
+    for mask in masks:
+        result |= mask
+    return result
+
+
+def _parse(text: str) -> list[tuple]:
+    """
+    parses a full range string
+    :param text: comma separated range tokens, optionally with ":weight"
+    :return: list of (combo mask, weight) tuples in the order they were written
+    """
+    parsed = []
+    for token in text.split(","):
+        token = token.strip()
+        if not token:
+            continue
+        weight = 1.0
+        if ":" in token:
+            token, weight_text = token.split(":")
+            weight = float(weight_text)
+        parsed.append((_parse_token(token.strip()), weight))
+    return parsed
+
+
+class Range:
+    """
+    a class representing a set of two card combos
+
+    attributes:
+        bits (int): a 1326 bit integer, bit i is set if combo i (see COMBOS) is in the range
+
+    methods:
+        parse(text): builds a range from range syntax
+        remove_blockers(cards): returns the range without combos that use any of the cards
+        combos(): returns the combo ids in the range
+        |, &, -: union, intersection and difference of two ranges
+    """
+    def __init__(self, bits: int = 0):
+        """
+        initializes a range from a combo mask
+        :param bits: combo mask, empty by default
+        """
+        self.bits = bits
+
+    @classmethod
+    def parse(cls, text: str) -> "Range":
+        """
+        builds a range from range syntax, weights are ignored
+        :param text: ex. "AKs, QQ+, T9s-76s, A5o+"
+        :return: Range object
+        """
+        return cls(_or_all(mask for mask, weight in _parse(text) if weight > 0))
+
+    @classmethod
+    def from_hand(cls, hand: list[Card]) -> "Range":
+        """
+        builds a range holding exactly one hand (ex. a player's hand)
+        :param hand: two Card objects
+        :return: Range object
+        """
+        return cls(1 << combo_id(card_to_index(hand[0]), card_to_index(hand[1])))
+
+    def remove_blockers(self, cards) -> "Range":
+        """
+        removes every combo that uses one of the given cards
+        :param cards: Card objects or card ids (ex. community_cards)
+        :return: a new Range object
+        """
+        return Range(self.bits & ~blocker_mask(cards))
+
+    def combos(self) -> list[int]:
+        """
+        :return: list of the combo ids in the range
+        """
+        bits = self.bits
+        result = []
+        while bits:
+            low_bit = bits & -bits
+            result.append(low_bit.bit_length() - 1)
+            bits ^= low_bit
+        return result
+
+    def __or__(self, other: "Range") -> "Range":
+        return Range(self.bits | other.bits)
+
+    def __and__(self, other: "Range") -> "Range":
+        return Range(self.bits & other.bits)
+
+    def __sub__(self, other: "Range") -> "Range":
+        return Range(self.bits & ~other.bits)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Range):
+            return self.bits == other.bits
+        return False
+
+    def __hash__(self) -> int:
+        return hash(self.bits)
+
+    def __len__(self) -> int:
+        return self.bits.bit_count()
+
+    def __contains__(self, combo: int) -> bool:
+        return bool(self.bits >> combo & 1)
+
+    def __repr__(self) -> str:
+        return f"Range({len(self)} combos)"
+
+
+class WeightedRange:
+    """
+    a class representing a range where every combo has a weight between 0 and 1
+
+    attributes:
+        weights (list[float]): one weight for every combo id
+
+    methods:
+        parse(text): builds a weighted range from range syntax, later tokens overwrite earlier ones
+        from_range(hand_range): gives every combo of a Range the weight 1
+        remove_blockers(cards): sets the weight of blocked combos to 0
+        to_range(): returns a Range of every combo with a weight above 0
+        |, &, *: element wise max, element wise min and scaling
+    """
+    def __init__(self, weights: list[float] = None):
+        """
+        initializes a weighted range
+        :param weights: list of 1326 weights, all 0 by default
+        """
+        self.weights = weights if weights is not None else [0.0] * COMBO_COUNT
+
+    @classmethod
+    def parse(cls, text: str) -> "WeightedRange":
+        """
+        builds a weighted range from range syntax
+        :param text: ex. "QQ+, AKs:0.5"
+        :return: WeightedRange object
+        """
+        weights = [0.0] * COMBO_COUNT
+        for mask, weight in _parse(text):
+            for combo in Range(mask).combos():
+                weights[combo] = weight
+        return cls(weights)
+
+    @classmethod
+    def from_range(cls, hand_range: Range) -> "WeightedRange":
+        """
+        :param hand_range: Range object
+        :return: WeightedRange with weight 1 on every combo of the range
+        """
+        bits = hand_range.bits
+        return cls([float(bits >> combo & 1) for combo in range(COMBO_COUNT)])
+
+    def remove_blockers(self, cards) -> "WeightedRange":
+        """
+        sets the weight of every combo that uses one of the given cards to 0
+        :param cards: Card objects or card ids (ex. community_cards)
+        :return: a new WeightedRange object
+        """
+        blocked = blocker_mask(cards)
+        return WeightedRange([0.0 if blocked >> combo & 1 else weight for combo, weight in enumerate(self.weights)])
+
+    def to_range(self) -> Range:
+        """
+        :return: Range of every combo with a weight above 0
+        """
+        return Range(_or_all(1 << combo for combo, weight in enumerate(self.weights) if weight > 0))
+
+    def total(self) -> float:
+        """
+        :return: the sum of all weights (the "number of combos" of the range)
+        """
+        return sum(self.weights)
+
+    def __or__(self, other: "WeightedRange") -> "WeightedRange":
+        return WeightedRange(list(map(max, self.weights, other.weights)))
+
+    def __and__(self, other: "WeightedRange") -> "WeightedRange":
+        return WeightedRange(list(map(min, self.weights, other.weights)))
+
+    def __mul__(self, factor: float) -> "WeightedRange":
+        return WeightedRange([weight * factor for weight in self.weights])
+
+    def __repr__(self) -> str:
+        return f"WeightedRange({self.total():.2f} combos)"
+
+
+def _weighted_combos(hand_range, board_mask: int) -> tuple:
+    """
+    lists the combos of a range that aren't blocked by the board, with their weights
+    :param hand_range: Range or WeightedRange
+    :param board_mask: blocker mask of the board
+    :return: (list of (card, card) tuples, list of weights)
+    """
+    if isinstance(hand_range, Range):
+        hand_range = WeightedRange.from_range(hand_range)
+    combos, weights = [], []
+    for combo, weight in enumerate(hand_range.weights):
+        if weight > 0 and not board_mask >> combo & 1:
+            combos.append(COMBOS[combo])
+            weights.append(weight)
+    return combos, weights
+
+
+def range_equity(hero, villain, board=(), iterations: int = 20000, rng: random.Random = None) -> float:
+    """
+    estimates the equity of one range against another with monte carlo sampling
+    each iteration picks a combo from each range (by weight), skips it if the two combos share a card,
+    and deals out the rest of the board
+    :param hero: Range or WeightedRange of the first player
+    :param villain: Range or WeightedRange of the second player
+    :param board: community cards already dealt (Card objects or card ids)
+    :param iterations: number of samples to take
+    :param rng: random.Random to sample with, a new unseeded one by default
+    :return: share of the pot the hero wins on average (ties count as half)
+    """
+    rng = rng or random.Random()
+    board = [_to_index(card) for card in board]
+    board_mask = blocker_mask(board)
+    hero_combos, hero_weights = _weighted_combos(hero, board_mask)
+    villain_combos, villain_weights = _weighted_combos(villain, board_mask)
+    if not hero_combos or not villain_combos:
+        raise ValueError("a range is empty after removing the board cards")
+
+    deck = [card for card in range(52) if card not in board]
+    missing = 5 - len(board)
+    won = 0.0
+    samples = 0
+    for hero_combo, villain_combo in zip(rng.choices(hero_combos, hero_weights, k=iterations),
+                                         rng.choices(villain_combos, villain_weights, k=iterations)):
+        if hero_combo[0] in villain_combo or hero_combo[1] in villain_combo:
+            continue
+        used = hero_combo + villain_combo
+        runout = board + rng.sample([card for card in deck if card not in used], missing)
+        hero_key = evaluate(runout + list(hero_combo))
+        villain_key = evaluate(runout + list(villain_combo))
+        if hero_key > villain_key:
+            won += 1
+        elif hero_key == villain_key:
+            won += 0.5
+        samples += 1
+
+    if samples == 0:
+        raise ValueError("the two ranges never fit together on this board")
+    return won / samples
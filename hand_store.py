@@ -0,0 +1,376 @@
+"""
+columnar hand history store
+
+every field is its own file of fixed size values (the array module's typecodes), so a reader memory maps only
+the columns a query needs, and nothing is parsed
+    - a row per player per hand: hand number, player id, position (0 is the dealer, like stats.py), hole card combo
+      (hand_range.combo_id), category of their final hand (evaluator.category, -1 if they folded) and net chips
+    - a row per hand: the board (5 card ids, 255 for cards that weren't dealt), the pot and the first row of the hand
+    - player names are in players.json, a row holds the index of the name
+    - count.bin holds how many hands and rows are complete, it is replaced (atomically) after the columns are
+      appended, so a writer that stops halfway leaves a store that ends at the last complete flush
+secondary indexes are posting lists of row numbers built by close() with a counting sort:
+    by_player sorts the rows by (player, category, row), so "Alice with a full house" is one slice of it
+    by_category sorts them by (category, row)
+HandStoreWriter reads game events (Game.event_listeners or a saved hand history) and HandStore answers queries
+"""
+import json
+import mmap
+import os
+from array import array
+
+from evaluator import CATEGORY_NAMES, category, evaluate
+from hand_range import combo_id
+
+ROW_COLUMNS = {"hand": "I", "player": "H", "position": "B", "combo": "H", "category": "b", "net": "i"}
+HAND_COLUMNS = {"board": "B", "pot": "I", "first_row": "Q"}
+# values per hand of the hand columns
+HAND_WIDTH = {"board": 5, "pot": 1, "first_row": 1}
+NO_CARD = 255
+# category + 1, so folded rows (-1) get slot 0
+CATEGORY_SLOTS = len(CATEGORY_NAMES) + 1
+FLUSH_ROWS = 1 << 16
+
+
+def _category_number(value) -> int:
+    """
+    :param value: category number or name (ex. "full house"), "folded" or -1 for folded rows
+    :return: category number
+    """
+    if isinstance(value, str):
+        return -1 if value == "folded" else CATEGORY_NAMES.index(value)
+    return value
+
+
+def _read_count(directory: str) -> tuple[int, int]:
+    path = os.path.join(directory, "count.bin")
+    if not os.path.exists(path):
+        return 0, 0
+    counts = array("Q")
+    with open(path, "rb") as file:
+        counts.fromfile(file, 2)
+    return counts[0], counts[1]
+
+
+def _write_atomic(path: str, values: array) -> None:
+    with open(path + ".tmp", "wb") as file:
+        values.tofile(file)
+    os.replace(path + ".tmp", path)
+
+
+class HandStoreWriter:
+    """
+    a class that appends hands to a store, an existing store is added to
+
+    attributes:
+        directory (str): where the files are
+        players (list[str]): player names, a row's player is an index in this list
+        hands (int): hands in the store
+        rows (int): rows in the store
+
+    methods:
+        consume(event): reads a single event (can be added to Game.event_listeners)
+        consume_all(events): reads an iterable of events
+        add_hand(...): adds one hand directly
+        flush(): writes what is buffered
+        close(): flushes and builds the indexes
+    """
+    def __init__(self, directory: str, flush_rows: int = FLUSH_ROWS):
+        """
+        :param directory: directory of the store, made if it doesn't exist
+        :param flush_rows: rows buffered in memory before they are written
+        """
+        self.directory = directory
+        self.flush_rows = flush_rows
+        os.makedirs(directory, exist_ok=True)
+        players_path = os.path.join(directory, "players.json")
+        self.players = []
+        if os.path.exists(players_path):
+            with open(players_path) as file:
+                self.players = json.load(file)
+        self._player_ids = {name: i for i, name in enumerate(self.players)}
+
+        # anything after the last complete flush is dropped
+        self.hands, self.rows = _read_count(directory)
+        for name, typecode in ROW_COLUMNS.items():
+            self._truncate(name, self.rows * array(typecode).itemsize)
+        for name, typecode in HAND_COLUMNS.items():
+            self._truncate(name, self.hands * HAND_WIDTH[name] * array(typecode).itemsize)
+
+        self._rows = {name: array(typecode) for name, typecode in ROW_COLUMNS.items()}
+        self._hands = {name: array(typecode) for name, typecode in HAND_COLUMNS.items()}
+        self._start = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _truncate(self, name: str, size: int) -> None:
+        with open(self._path(name), "ab") as file:
+            file.truncate(size)
+
+    def _player_id(self, name: str) -> int:
+        player_id = self._player_ids.get(name)
+        if player_id is None:
+            player_id = self._player_ids[name] = len(self.players)
+            self.players.append(name)
+        return player_id
+
+    def consume(self, event: dict) -> None:
+        """
+        reads a single event, a hand is added when its hand_end arrives
+        :param event: dictionary with a "type" key (see Game.emit)
+        :return: None
+        """
+        if event["type"] == "hand_start":
+            self._start = event
+        elif event["type"] == "hand_end" and self._start is not None:
+            start = self._start
+            self._start = None
+            self.add_hand(start["players"], start["dealer_index"], start["chips"], event["chips"], event["hands"],
+                          event["board"], event["folded"], event["contributions"])
+
+    def consume_all(self, events) -> None:
+        """
+        reads every event from an iterable (ex. a hand history file)
+        :param events: iterable of event dictionaries
+        :return: None
+        """
+        for event in events:
+            self.consume(event)
+
+    def add_hand(self, players: list[str], dealer_index: int, start_chips: list[int], end_chips: list[int],
+                 hands: list, board: list[int], folded: list[bool], contributions: list[int]) -> None:
+        """
+        adds one hand, every list has an entry per seat
+        :param players: player names
+        :param dealer_index: seat of the dealer
+        :param start_chips: chips at the start of the hand
+        :param end_chips: chips at the end of the hand
+        :param hands: hole card ids of every seat
+        :param board: community card ids
+        :param folded: True for every seat that folded
+        :param contributions: chips every seat put in
+        :return: None
+        """
+        rows = self._rows
+        hand_number = self.hands + len(self._hands["pot"])
+        self._hands["board"].extend(board + [NO_CARD] * (5 - len(board)))
+        self._hands["pot"].append(sum(contributions))
+        self._hands["first_row"].append(self.rows + len(rows["hand"]))
+        for seat, name in enumerate(players):
+            rows["hand"].append(hand_number)
+            rows["player"].append(self._player_id(name))
+            rows["position"].append((seat - dealer_index) % len(players))
+            rows["combo"].append(combo_id(*hands[seat]))
+            rows["category"].append(-1 if folded[seat] else category(evaluate(hands[seat] + board)))
+            rows["net"].append(end_chips[seat] - start_chips[seat])
+        if len(rows["hand"]) >= self.flush_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+        appends the buffered hands and rows to the column files, then updates count.bin
+        :return: None
+        """
+        if not self._hands["pot"]:
+            return
+        for columns in (self._hands, self._rows):
+            for name, values in columns.items():
+                with open(self._path(name), "ab") as file:
+                    values.tofile(file)
+        self.hands += len(self._hands["pot"])
+        self.rows += len(self._rows["hand"])
+        self._rows = {name: array(typecode) for name, typecode in ROW_COLUMNS.items()}
+        self._hands = {name: array(typecode) for name, typecode in HAND_COLUMNS.items()}
+        players_path = os.path.join(self.directory, "players.json")
+        with open(players_path + ".tmp", "w") as file:
+            json.dump(self.players, file)
+        os.replace(players_path + ".tmp", players_path)
+        _write_atomic(os.path.join(self.directory, "count.bin"), array("Q", [self.hands, self.rows]))
+
+    def close(self) -> None:
+        """
+        flushes and (re)builds the indexes
+        :return: None
+        """
+        self.flush()
+        build_indexes(self.directory)
+
+
+def _posting_lists(slots: int, keys, path: str) -> None:
+    """
+    writes the row numbers grouped by key (counting sort, rows stay in order inside a group)
+    and the offset of every group, offsets[k]:offsets[k + 1] are the rows with key k
+    :param slots: number of different keys
+    :param keys: key of every row
+    :param path: file name without the extension
+    """
+    counts = [0] * (slots + 1)
+    for key in keys:
+        counts[key + 1] += 1
+    for slot in range(slots):
+        counts[slot + 1] += counts[slot]
+    offsets = array("Q", counts)
+    rows = array("I", bytes(4 * counts[-1]))
+    position = counts[:-1]
+    for row, key in enumerate(keys):
+        rows[position[key]] = row
+        position[key] += 1
+    _write_atomic(path + "_offsets.bin", offsets)
+    _write_atomic(path + ".bin", rows)
+
+
+def build_indexes(directory: str) -> None:
+    """
+    builds the by_player and by_category indexes of a store
+    :param directory: directory of the store
+    :return: None
+    """
+    store = HandStore(directory, indexes=False)
+    players = store.column("player")
+    categories = store.column("category")
+    _posting_lists(len(store.players) * CATEGORY_SLOTS,
+                   array("I", (player * CATEGORY_SLOTS + slot + 1 for player, slot in zip(players, categories))),
+                   os.path.join(directory, "by_player"))
+    _posting_lists(CATEGORY_SLOTS, array("B", (slot + 1 for slot in categories)), os.path.join(directory, "by_category"))
+    store.close()
+
+
+class HandStore:
+    """
+    a class that reads a store, every column is memory mapped when it is first used
+
+    attributes:
+        directory (str): where the files are
+        players (list[str]): player names
+        hands (int): number of hands
+        rows (int): number of rows (a row per player per hand)
+
+    methods:
+        column(name): a row or hand column, as a memoryview
+        query(player, category, won, position): row numbers matching everything given
+        row(i): a row as a dictionary, with the hand's board and pot
+        close(): unmaps the files
+    """
+    def __init__(self, directory: str, indexes: bool = True):
+        """
+        :param directory: directory of the store
+        :param indexes: False to ignore the indexes (they are only used when they cover every row)
+        """
+        self.directory = directory
+        self.hands, self.rows = _read_count(directory)
+        with open(os.path.join(directory, "players.json")) as file:
+            self.players = json.load(file)
+        self._player_ids = {name: i for i, name in enumerate(self.players)}
+        self._maps = []
+        self._columns = {}
+        self._indexes = {}
+        if indexes:
+            for name, slots in (("by_player", len(self.players) * CATEGORY_SLOTS), ("by_category", CATEGORY_SLOTS)):
+                offsets_path = os.path.join(directory, f"{name}_offsets.bin")
+                if not os.path.exists(offsets_path):
+                    continue
+                offsets = self._map(offsets_path, "Q", slots + 1)
+                if len(offsets) == slots + 1 and offsets[-1] == self.rows:
+                    self._indexes[name] = (offsets, self._map(os.path.join(directory, f"{name}.bin"), "I", self.rows))
+
+    def _map(self, path: str, typecode: str, count: int) -> memoryview:
+        """
+        :return: the first count values of a file, memory mapped
+        """
+        if count == 0 or os.path.getsize(path) == 0:
+            return memoryview(array(typecode))
+        with open(path, "rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._maps.append(mapped)
+        # a value written halfway by a writer that stopped is past count, the cast only sees whole values
+        return memoryview(mapped)[:count * array(typecode).itemsize].cast(typecode)
+
+    def column(self, name: str) -> memoryview:
+        """
+        :param name: one of ROW_COLUMNS or HAND_COLUMNS
+        :return: the column, "board" has 5 values per hand
+        """
+        if name not in self._columns:
+            if name in ROW_COLUMNS:
+                count, typecode = self.rows, ROW_COLUMNS[name]
+            else:
+                count, typecode = self.hands * HAND_WIDTH[name], HAND_COLUMNS[name]
+            self._columns[name] = self._map(os.path.join(self.directory, f"{name}.bin"), typecode, count)
+        return self._columns[name]
+
+    def _candidates(self, player, category_number):
+        """
+        :return: the rows an index gives for the player and category (either can be None), None if no index fits
+        """
+        if player is not None and "by_player" in self._indexes:
+            offsets, rows = self._indexes["by_player"]
+            first = self._player_ids[player] * CATEGORY_SLOTS
+            if category_number is not None:
+                first += category_number + 1
+                return rows[offsets[first]:offsets[first + 1]]
+            # one group per category, back in row order
+            return sorted(rows[offsets[first]:offsets[first + CATEGORY_SLOTS]])
+        if category_number is not None and "by_category" in self._indexes:
+            offsets, rows = self._indexes["by_category"]
+            return rows[offsets[category_number + 1]:offsets[category_number + 2]]
+        return None
+
+    def query(self, player: str = None, category=None, won: bool = None, position: int = None) -> list[int]:
+        """
+        finds rows, ex. query("Alice", "full house", won=False) for every hand Alice lost with a full house
+        :param player: player name
+        :param category: category number or name, "folded" for the rows of players who folded
+        :param won: True for rows that won chips, False for rows that lost chips
+        :param position: position relative to the dealer
+        :return: row numbers in order
+        """
+        if player is not None and player not in self._player_ids:
+            return []
+        category_number = None if category is None else _category_number(category)
+        candidates = self._candidates(player, category_number)
+        filters = []
+        if candidates is None:
+            candidates = range(self.rows)
+            if player is not None:
+                filters.append((self.column("player"), self._player_ids[player].__eq__))
+            if category_number is not None:
+                filters.append((self.column("category"), category_number.__eq__))
+        elif player is not None and category_number is not None and "by_player" not in self._indexes:
+            filters.append((self.column("player"), self._player_ids[player].__eq__))
+        if won is not None:
+            filters.append((self.column("net"), (lambda net: net > 0) if won else (lambda net: net < 0)))
+        if position is not None:
+            filters.append((self.column("position"), position.__eq__))
+
+        if not filters:
+            return list(candidates)
+        return [row for row in candidates if all(test(column[row]) for column, test in filters)]
+
+    def row(self, i: int) -> dict:
+        """
+        :param i: row number
+        :return: the row's fields, the player's name, and the hand's board (card ids) and pot
+        """
+        hand = self.column("hand")[i]
+        board = [card for card in self.column("board")[hand * 5:hand * 5 + 5] if card != NO_CARD]
+        return {"hand": hand, "player": self.players[self.column("player")[i]],
+                "position": self.column("position")[i], "combo": self.column("combo")[i],
+                "category": self.column("category")[i], "net": self.column("net")[i],
+                "board": board, "pot": self.column("pot")[hand]}
+
+    def close(self) -> None:
+        """
+        unmaps the files
+        :return: None
+        """
+        for view in self._columns.values():
+            view.release()
+        for offsets, rows in self._indexes.values():
+            offsets.release()
+            rows.release()
+        self._columns = {}
+        self._indexes = {}
+        for mapped in self._maps:
+            mapped.close()
+        self._maps = []
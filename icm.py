@@ -0,0 +1,134 @@
+"""
+independent chip model (ICM)
+
+in a tournament a player's chips aren't worth their face value, what matters is how much prize money
+they can expect, ICM estimates that by assuming each player's chance of finishing first is their share of
+the chips, and that the same is true for the remaining places among the players left
+
+icm_equity() is exact, it goes through the sets of players that could take the top places
+(each set once, memoized per place in a dictionary keyed by a bitmask) instead of every finishing order,
+so it costs about 2^n steps instead of n!, which is fine for a full table and up to ~20 players
+icm_equity_monte_carlo() samples finishing orders instead, for bigger fields
+"""
+import math
+import random
+
+
+# above this many steps icm_equity() takes more than about a second, equity_for_game() samples instead
+EXACT_STEP_LIMIT = 2_000_000
+
+
+def subset_steps(players: int, places: int) -> int:
+    """
+    counts the steps icm_equity() takes, every set of players that can fill the top places
+    times the number of players who can take the next place
+    :param players: number of players
+    :param places: number of paid places
+    :return: number of steps
+    """
+    return sum(math.comb(players, taken) * (players - taken) for taken in range(min(places, players)))
+
+
+def icm_equity(stacks: list[int], payouts: list[float]) -> list[float]:
+    """
+    computes the exact ICM equity of every player
+    :param stacks: chips of every player
+    :param payouts: prize for 1st, 2nd, ... place (places past the end of the list pay nothing)
+    :return: expected prize of every player, in the same order as stacks
+    """
+    players = len(stacks)
+    total = sum(stacks)
+    equities = [0.0] * players
+    if players == 0 or total <= 0:
+        return equities
+
+    # only the places that pay matter, and the last place is whoever is left
+    places = min(len(payouts), players)
+    # keyed by a bitmask of players: the probability that exactly those players took the top places
+    # (in any order), and how many chips they hold, each set is computed once and reused for the next place,
+    # only the sets of one place are kept, so memory follows the number of sets and not 2^players
+    top = {0: 1.0}
+    chips_in = {0: 0}
+    alive = sum(1 << player for player in range(players) if stacks[player] > 0)
+    for place in range(places):
+        payout = payouts[place]
+        next_top = {}
+        next_chips = {}
+        for mask, probability in top.items():
+            remaining = total - chips_in[mask]
+            if remaining <= 0:
+                # everyone with chips has a place already, the places left go to players who are out
+                continue
+            share = probability / remaining
+            free = alive & ~mask
+            while free:
+                low = free & -free
+                free ^= low
+                player = low.bit_length() - 1
+                chance = share * stacks[player]
+                equities[player] += chance * payout
+                bigger = mask | low
+                if bigger not in next_top:
+                    next_top[bigger] = 0.0
+                    next_chips[bigger] = chips_in[mask] + stacks[player]
+                next_top[bigger] += chance
+        top = next_top
+        chips_in = next_chips
+
+    return equities
+
+
+def icm_equity_monte_carlo(stacks: list[int], payouts: list[float], iterations: int = 100000,
+                           rng: random.Random = None) -> list[float]:
+    """
+    estimates ICM equity by sampling finishing orders, for fields too big for icm_equity()
+    each player gets a random exponential "finish time" divided by their chips, sorting by it gives a
+    finishing order with exactly the ICM probabilities
+    :param stacks: chips of every player
+    :param payouts: prize for 1st, 2nd, ... place
+    :param iterations: number of finishing orders to sample
+    :param rng: random.Random to sample with, a new unseeded one by default
+    :return: estimated expected prize of every player
+    """
+    rng = rng or random.Random()
+    alive = [player for player, chips in enumerate(stacks) if chips > 0]
+    places = min(len(payouts), len(alive))
+    totals = [0.0] * len(stacks)
+    for _ in range(iterations):
+        order = sorted(alive, key=lambda player: -math.log(1.0 - rng.random()) / stacks[player])
+        for place in range(places):
+            totals[order[place]] += payouts[place]
+    return [total / iterations for total in totals]
+
+
+def equity_for_game(game, payouts: list[float]) -> dict[str, float]:
+    """
+    ICM equity of every player still in a game, ex. for a bot deciding whether to risk its stack
+    :param game: Game object
+    :param payouts: prize for the places that are still left, 1st first
+    :return: player name -> expected prize
+    """
+    stacks = [player.chips for player in game.players]
+    if subset_steps(len(stacks), len(payouts)) <= EXACT_STEP_LIMIT:
+        equities = icm_equity(stacks, payouts)
+    else:
+        equities = icm_equity_monte_carlo(stacks, payouts)
+    return dict(zip((player.name for player in game.players), equities))
+
+
+def standings(game, payouts: list[float]) -> list[tuple]:
+    """
+    tournament standings: players still in are ranked by ICM equity,
+    eliminated players (Game.eliminated, first out first) get the prize of the place they finished in
+    :param game: Game object
+    :param payouts: prize for 1st, 2nd, ... place of the whole tournament
+    :return: list of (name, chips, equity) tuples, best first
+    """
+    remaining = len(game.players)
+    equities = equity_for_game(game, payouts[:remaining])
+    table = sorted(((player.name, player.chips, equities[player.name]) for player in game.players),
+                   key=lambda row: row[2], reverse=True)
+    # the last player eliminated finished right below the players still in
+    for place, name in enumerate(reversed(game.eliminated), start=remaining):
+        table.append((name, 0, payouts[place] if place < len(payouts) else 0.0))
+    return table
@@ -0,0 +1,274 @@
+"""
+monte carlo tree search bot
+
+the bot plays a seat through Game.bots instead of handle_player_action asking for input
+every decision it:
+    1. takes a snapshot of what its player can see (own hand, community cards, pot, stacks, bets)
+    2. keeps sampling the opponents' hole cards and the rest of the board from the cards it can't see
+    3. for each sample walks a small tree: its own action (fold, check/call, a few bet sizes), then each
+       opponent's answer to a bet (fold or call, chosen with UCB from the opponent's point of view and
+       split by how strong the opponent's sampled hand is), then a showdown with the fast evaluator
+    4. stops when the time budget runs out and plays the action it tried the most
+
+with workers > 1 the search runs in several processes (root parallel) and their root statistics are added up
+later streets are not searched, after a call or check everyone is assumed to check down to the showdown
+"""
+import math
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from card import card_to_index
+from evaluator import evaluate, category
+
+BET_FRACTIONS = (0.5, 1.0)
+
+
+class Situation:
+    """
+    a class holding everything the bot's player can see when it has to act (picklable, so it can be
+    sent to worker processes)
+
+    attributes:
+        hand (list[int]): the bot's two card ids
+        board (list[int]): community card ids
+        pot (int): chips in the pot
+        call_amount (int): chips needed to call
+        chips (int): the bot's chips
+        current_bet (int): what the bot has bet this round
+        big_blind (int): the big blind amount
+        opponents (list[tuple]): (chips, current_bet) of every opponent who hasn't folded
+    """
+    __slots__ = ("hand", "board", "pot", "call_amount", "chips", "current_bet", "big_blind", "opponents")
+
+    def __init__(self, hand, board, pot, call_amount, chips, current_bet, big_blind, opponents):
+        self.hand = hand
+        self.board = board
+        self.pot = pot
+        self.call_amount = call_amount
+        self.chips = chips
+        self.current_bet = current_bet
+        self.big_blind = big_blind
+        self.opponents = opponents
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+
+def situation_from_game(game, player) -> Situation:
+    """
+    takes a snapshot of a game from the point of view of one player
+    :param game: Game object (or a table_store.GameView)
+    :param player: the player who has to act
+    :return: Situation object
+    """
+    return Situation(
+        hand=[card_to_index(card) for card in player.hand],
+        board=[card_to_index(card) for card in game.community_cards],
+        pot=game.pot,
+        call_amount=max(0, game.minimum_bet - player.current_bet),
+        chips=player.chips,
+        current_bet=player.current_bet,
+        big_blind=game.big_blind,
+        opponents=[(p.chips, p.current_bet) for p in game.players if p != player and not p.folded],
+    )
+
+
+def legal_actions(situation: Situation) -> list[tuple]:
+    """
+    lists the actions the bot considers
+    bets follow handle_player_action: at least the big blind, at least the call amount, at most all the chips
+    :param situation: Situation object
+    :return: list of (action, amount) tuples
+    """
+    call_amount = min(situation.call_amount, situation.chips)
+    actions = []
+    if call_amount > 0:
+        actions.append(("fold", 0))
+        actions.append(("call", call_amount))
+    else:
+        actions.append(("check", 0))
+
+    if situation.chips > call_amount:
+        sizes = set()
+        for fraction in BET_FRACTIONS:
+            raise_size = max(situation.big_blind, int((situation.pot + call_amount) * fraction))
+            sizes.add(min(call_amount + raise_size, situation.chips))
+        sizes.add(situation.chips)  # all in
+        actions.extend(("bet", size) for size in sorted(sizes))
+    return actions
+
+
+def _strength_bucket(hand, board) -> int:
+    """
+    a rough measure of how strong a hand looks right now, used to split an opponent's decisions
+    :param hand: two card ids
+    :param board: community card ids (0, 3, 4 or 5 of them)
+    :return: bucket number
+    """
+    if len(board) >= 3:
+        return min(category(evaluate(hand + board)), 4)
+    first, second = hand[0] >> 2, hand[1] >> 2
+    if first == second:
+        return 2
+    # both cards ten or higher
+    return 1 if min(first, second) >= 8 else 0
+
+
+def _ucb(stats: list, exploration: float) -> int:
+    """
+    picks a child with UCB1
+    :param stats: list of [visits, total reward] for every child
+    :param exploration: exploration constant
+    :return: index of the chosen child
+    """
+    total = sum(visits for visits, _ in stats)
+    best, best_score = 0, -math.inf
+    for i, (visits, reward) in enumerate(stats):
+        if visits == 0:
+            return i
+        score = reward / visits + exploration * math.sqrt(math.log(total) / visits)
+        if score > best_score:
+            best, best_score = i, score
+    return best
+
+
+def search(situation: Situation, budget_ms: float, exploration: float = 1.4, seed=None,
+           min_iterations: int = 50) -> list[list]:
+    """
+    runs the search until the time budget is used up
+    :param situation: Situation object
+    :param budget_ms: time budget in milliseconds
+    :param exploration: UCB exploration constant
+    :param seed: seed for the random number generator
+    :param min_iterations: number of playouts to run even if the budget is used up
+    :return: [visits, total reward] for every action of legal_actions(situation)
+    """
+    rng = random.Random(seed)
+    actions = legal_actions(situation)
+    root = [[0, 0.0] for _ in actions]
+    # (action index, opponent, strength bucket) -> [[visits, reward] for fold, [visits, reward] for call]
+    responses = {}
+
+    seen = set(situation.hand) | set(situation.board)
+    unseen = [card for card in range(52) if card not in seen]
+    opponents = situation.opponents
+    missing = 5 - len(situation.board)
+    # rewards are in chips, dividing by the most that can be won keeps them near the 0-1 range UCB expects
+    scale = max(1, situation.pot + situation.chips + sum(chips for chips, _ in opponents))
+
+    deadline = time.perf_counter() + budget_ms / 1000
+    iterations = 0
+    while iterations < min_iterations or time.perf_counter() < deadline:
+        iterations += 1
+        sample = rng.sample(unseen, 2 * len(opponents) + missing)
+        hands = [sample[2 * i:2 * i + 2] for i in range(len(opponents))]
+        final_board = situation.board + sample[2 * len(opponents):]
+
+        index = _ucb(root, exploration)
+        action, amount = actions[index]
+        if action == "fold":
+            root[index][0] += 1
+            continue
+
+        pot = situation.pot + amount
+        target = situation.current_bet + amount
+        live = []
+        calls = []
+        for opponent, (chips, current_bet) in enumerate(opponents):
+            need = min(max(0, target - current_bet), chips)
+            if action == "bet" and need > 0:
+                key = (index, opponent, _strength_bucket(hands[opponent], situation.board))
+                node = responses.setdefault(key, [[0, 0.0], [0, 0.0]])
+                if _ucb(node, exploration) == 0:
+                    node[0][0] += 1
+                    continue
+                pot += need
+                calls.append((opponent, node, need))
+            live.append(opponent)
+
+        hero_key = evaluate(situation.hand + final_board)
+        keys = {opponent: evaluate(hands[opponent] + final_board) for opponent in live}
+        best = max([hero_key, *keys.values()])
+        winners = (hero_key == best) + sum(1 for key in keys.values() if key == best)
+        share = pot / winners
+
+        root[index][0] += 1
+        root[index][1] += ((share if hero_key == best else 0) - amount) / scale
+        for opponent, node, need in calls:
+            node[1][0] += 1
+            node[1][1] += ((share if keys[opponent] == best else 0) - need) / scale
+
+    return root
+
+
+class MCTSBot:
+    """
+    a class representing a bot that picks its actions with monte carlo tree search
+
+    attributes:
+        budget_ms (float): thinking time per decision in milliseconds
+        workers (int): number of processes to search with, 1 searches in this process
+        exploration (float): UCB exploration constant
+        seed: seed for the random number generator, None for a random one
+
+    methods:
+        decide(game, player): returns the (action, amount) to play, used by Game.handle_player_action
+        close(): shuts down the worker processes
+    """
+    def __init__(self, budget_ms: float = 200, workers: int = 1, exploration: float = 1.4, seed=None):
+        """
+        initializes the bot
+        :param budget_ms: thinking time per decision in milliseconds
+        :param workers: number of processes to search with
+        :param exploration: UCB exploration constant
+        :param seed: seed for the random number generator
+        """
+        self.budget_ms = budget_ms
+        self.workers = workers
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self._pool = None
+
+    def decide(self, game, player) -> tuple[str, int]:
+        """
+        picks an action for a player
+        :param game: Game object
+        :param player: the player the bot is playing for
+        :return: (action, amount), action is "fold", "check", "call" or "bet"
+        """
+        situation = situation_from_game(game, player)
+        actions = legal_actions(situation)
+        if len(actions) == 1:
+            return actions[0]
+
+        if self.workers > 1:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(self.workers)
+            seeds = [self.rng.getrandbits(64) for _ in range(self.workers)]
+            results = self._pool.map(search, [situation] * self.workers, [self.budget_ms] * self.workers,
+                                     [self.exploration] * self.workers, seeds)
+            root = [[0, 0.0] for _ in actions]
+            for result in results:
+                for total, (visits, reward) in zip(root, result):
+                    total[0] += visits
+                    total[1] += reward
+        else:
+            root = search(situation, self.budget_ms, self.exploration, self.rng.getrandbits(64))
+
+        # the most visited action is less noisy than the one with the best average
+        best = max(range(len(actions)), key=lambda i: root[i][0])
+        return actions[best]
+
+    def close(self) -> None:
+        """
+        shuts down the worker processes (if any)
+        :return: None
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
@@ -0,0 +1,203 @@
+"""
+outs and draws on the flop and turn
+
+every player gets a HandState (rank counts and suit masks of their hole cards and the board, the same state
+evaluator.evaluate_state works on) and so does the board on its own, when a community card is dealt it is added to
+every state once, and trying one of the unseen cards is adding it, evaluating and taking it back out
+instead of building a new seven card hand for each of them
+
+a card is an out when it gives the player a better hand category than they have now, and a better one
+than the board itself would show with that card (a card that pairs the board helps everyone, it isn't an out)
+an out is clean when the player's hand with it beats every other hand still in
+that needs the other players' hole cards, so a report shown to a person only uses what they can see
+(report(player, visible_only=True): unseen cards are everything but their own and the board, and no clean outs)
+"""
+from card import card_to_index, index_to_card
+from evaluator import CATEGORY_NAMES, category, evaluate_state
+
+
+class HandState:
+    """
+    a class holding a hand as rank counts and suit masks so cards can be added and removed one at a time
+
+    attributes:
+        rank_counts (list[int]): how many cards of each rank are in the hand
+        suit_masks (list[int]): a rank mask for each suit
+
+    methods:
+        add(card), remove(card): adds or takes out a card id
+        key(): the evaluator key of the hand
+        key_with(*cards): the key with some extra cards, the state is left as it was
+    """
+    __slots__ = ("rank_counts", "suit_masks")
+
+    def __init__(self, cards=()):
+        """
+        :param cards: card ids to start with
+        """
+        self.rank_counts = [0] * 13
+        self.suit_masks = [0, 0, 0, 0]
+        for card in cards:
+            self.add(card)
+
+    def add(self, card: int) -> None:
+        self.rank_counts[card >> 2] += 1
+        self.suit_masks[card & 3] |= 1 << (card >> 2)
+
+    def remove(self, card: int) -> None:
+        self.rank_counts[card >> 2] -= 1
+        self.suit_masks[card & 3] &= ~(1 << (card >> 2))
+
+    def key(self) -> int:
+        return evaluate_state(self.rank_counts, self.suit_masks)
+
+    def key_with(self, *cards: int) -> int:
+        for card in cards:
+            self.add(card)
+        key = evaluate_state(self.rank_counts, self.suit_masks)
+        for card in cards:
+            self.remove(card)
+        return key
+
+
+class DrawReport:
+    """
+    a class holding what the analyzer found for one player
+
+    attributes:
+        name (str): the player's name
+        category (str): the category of the player's hand now
+        outs (list[tuple]): (Card, category name it makes) for every out
+        clean_outs (list[Card] | None): the outs that make the best hand still in, None if the others weren't looked at
+        improve_chance (float): chance of having a better category by the river
+    """
+    def __init__(self, name: str, category_now: str, outs: list[tuple], clean_outs: list | None,
+                 improve_chance: float):
+        self.name = name
+        self.category = category_now
+        self.outs = outs
+        self.clean_outs = clean_outs
+        self.improve_chance = improve_chance
+
+    def __str__(self) -> str:
+        clean = f" ({len(self.clean_outs)} clean)" if self.clean_outs is not None else ""
+        return (f"{self.name}: {self.category}, {len(self.outs)} outs{clean}, "
+                f"{self.improve_chance:.1%} to improve by the river")
+
+
+class OutsAnalyzer:
+    """
+    a class that keeps a HandState for every player of a game and reports their outs
+
+    attributes:
+        game: the Game (or table_store.GameView) being watched
+        states (dict): player name -> HandState of their hole cards and the board
+        board (HandState): the board on its own
+
+    methods:
+        update(): adds the community cards dealt since the last update (starts over on a new hand)
+        report(player, visible_only): DrawReport for one player
+        report_all(): DrawReport for every player still in
+    """
+    def __init__(self, game):
+        self.game = game
+        self.states = {}
+        self.board = HandState()
+        self._board_cards = []
+        self._hole_cards = {}
+
+    def update(self) -> None:
+        """
+        brings the states up to date with the game, only the new community cards are added
+        :return: None
+        """
+        board = [card_to_index(card) for card in self.game.community_cards]
+        hole_cards = {player.name: [card_to_index(card) for card in player.hand]
+                      for player in self.game.players if not player.folded}
+        new_hand = (board[:len(self._board_cards)] != self._board_cards
+                    or any(self._hole_cards.get(name) != cards for name, cards in hole_cards.items()))
+        if new_hand:
+            self.states = {name: HandState(cards) for name, cards in hole_cards.items()}
+            self.board = HandState()
+            self._board_cards = []
+            self._hole_cards = hole_cards
+
+        for card in board[len(self._board_cards):]:
+            self.board.add(card)
+            for state in self.states.values():
+                state.add(card)
+        self._board_cards = board
+        # players who folded since the last update
+        for name in list(self.states):
+            if name not in hole_cards:
+                del self.states[name]
+
+    def _unseen(self, names) -> list[int]:
+        """
+        :param names: players whose hole cards are known
+        :return: card ids that aren't on the board or in the hand of one of those players
+        """
+        seen = set(self._board_cards)
+        for name in names:
+            seen.update(self._hole_cards[name])
+        return [card for card in range(52) if card not in seen]
+
+    def _improves(self, state: HandState, now: int, cards: tuple) -> bool:
+        """
+        :param state: the player's state
+        :param now: the category the player has now
+        :param cards: the cards to add
+        :return: True if the cards give the player a better category, and better than the board with them
+        """
+        new = category(state.key_with(*cards))
+        return new > now and new > category(self.board.key_with(*cards))
+
+    def report(self, player, visible_only: bool = False) -> DrawReport:
+        """
+        finds the outs of one player (the flop or the turn has to be out)
+        :param player: Player object or name of a player still in
+        :param visible_only: True to only use the player's own cards and the board (for showing it to them),
+                             the other hands still in count as unseen and there are no clean outs
+        :return: DrawReport object
+        """
+        self.update()
+        name = player if isinstance(player, str) else player.name
+        state = self.states[name]
+        if visible_only:
+            others = None
+            unseen = self._unseen([name])
+        else:
+            others = [other for other_name, other in self.states.items() if other_name != name]
+            unseen = self._unseen(self.states)
+        now = category(state.key())
+
+        outs = []
+        clean_outs = [] if others is not None else None
+        for card in unseen:
+            if not self._improves(state, now, (card,)):
+                continue
+            key = state.key_with(card)
+            outs.append((index_to_card(card), CATEGORY_NAMES[category(key)]))
+            if others is not None and all(key > other.key_with(card) for other in others):
+                clean_outs.append(index_to_card(card))
+
+        if len(self._board_cards) == 3:
+            # two cards to come, every turn and river pair
+            improving = 0
+            runouts = 0
+            for i, turn in enumerate(unseen):
+                for river in unseen[i + 1:]:
+                    runouts += 1
+                    improving += self._improves(state, now, (turn, river))
+            chance = improving / runouts if runouts else 0.0
+        else:
+            chance = len(outs) / len(unseen) if unseen else 0.0
+
+        return DrawReport(name, CATEGORY_NAMES[now], outs, clean_outs, chance)
+
+    def report_all(self) -> list[DrawReport]:
+        """
+        :return: DrawReport for every player still in, in seat order
+        """
+        self.update()
+        return [self.report(name) for name in list(self.states)]
@@ -0,0 +1,74 @@
+"""
+threads or processes
+
+on a free-threaded CPython (3.13t and later, the build without the GIL) threads run python code on every core at once,
+which saves starting processes and pickling every task and result, on a normal build only processes do
+make_executor() picks the pool that runs in parallel on this interpreter, and the jobs built on it take either:
+    evaluate_batch()                          evaluator keys of a lot of hands
+    shared_results.run_equity()               monte carlo equity
+    shared_results.simulate_games()           headless games
+    push_fold.compute_equity_matrix()         the pre-flop equity table
+sharing between threads is safe because the evaluator's tables are tuples built at import (nothing is filled in
+later) and decks shuffle with a generator per thread (deck.thread_rng) instead of the random module's shared one
+"""
+import os
+import sys
+import sysconfig
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from evaluator import evaluate
+
+CHUNK_SIZE = 10_000
+
+
+def free_threaded() -> bool:
+    """
+    :return: True if this interpreter runs threads without the GIL
+    """
+    if not sysconfig.get_config_var("Py_GIL_DISABLED"):
+        return False
+    # a free-threaded build can still turn the GIL back on (PYTHON_GIL=1, or an extension module that needs it)
+    return not sys._is_gil_enabled()
+
+
+def use_threads(threads: bool = None) -> bool:
+    """
+    :param threads: True or False to choose, None to use threads only when they run in parallel
+    :return: True if a job should run on threads
+    """
+    return free_threaded() if threads is None else threads
+
+
+def make_executor(workers: int = None, threads: bool = None, initializer=None, initargs: tuple = ()) -> Executor:
+    """
+    :param workers: number of threads or processes, None for one per cpu
+    :param threads: see use_threads()
+    :param initializer: function every worker runs first (processes only, threads share this process)
+    :param initargs: its arguments
+    :return: ThreadPoolExecutor or ProcessPoolExecutor
+    """
+    workers = workers or os.cpu_count()
+    if use_threads(threads):
+        return ThreadPoolExecutor(workers)
+    return ProcessPoolExecutor(workers, initializer=initializer, initargs=initargs)
+
+
+def _evaluate_chunk(hands: list) -> list[int]:
+    return [evaluate(hand) for hand in hands]
+
+
+def evaluate_batch(hands: list, workers: int = None, threads: bool = None, chunk_size: int = CHUNK_SIZE) -> list[int]:
+    """
+    evaluates a lot of hands at once
+    :param hands: list of 5 to 7 card ids each
+    :param workers: number of threads or processes, None for one per cpu
+    :param threads: see use_threads()
+    :param chunk_size: hands per task
+    :return: evaluator key of every hand, in order
+    """
+    chunks = [hands[i:i + chunk_size] for i in range(0, len(hands), chunk_size)]
+    keys = []
+    with make_executor(workers, threads) as pool:
+        for chunk_keys in pool.map(_evaluate_chunk, chunks):
+            keys.extend(chunk_keys)
+    return keys
@@ -8,6 +8,7 @@ class Player:
         folded (bool): whether the player has folded their hand
         hand (list): list of Card objects representing the player's hand
         current_bet (int): the amount the player has bet in the current round
+        total_bet (int): the amount the player has put in the pot this hand, blinds included (see settlement.py)
 
     methods:
         __init__(name, chips): initializes a player with a name and number of chips
@@ -18,6 +19,9 @@ class Player:
         fold(): sets the player's folded state to True
         is_all_in(): checks if the player is all-in (has no chips left)
     """
+    # no per object __dict__, a server can hold a lot of players (see table_store.py)
+    __slots__ = ("name", "chips", "folded", "hand", "current_bet", "total_bet")
+
     def __init__(self, name: str, chips: int):
         """
         initializes a player with a name and number of chips
@@ -32,6 +36,7 @@ class Player:
         self.folded = False
         self.hand = []
         self.current_bet = 0
+        self.total_bet = 0
 
     def reset_round(self) -> None:
         """
@@ -41,6 +46,7 @@ class Player:
         self.folded = False
         self.hand = []
         self.current_bet = 0
+        self.total_bet = 0
 
     def __str__(self) -> str:
         """
@@ -61,6 +67,7 @@ class Player:
         :return: None
         """
         self.current_bet += bet
+        self.total_bet += bet
         self.chips -= bet
 
     def fold(self) -> None:
@@ -0,0 +1,579 @@
+"""
+push/fold equilibrium for short stacks
+
+below about 15 big blinds the only pre-flop plays worth considering are going all in or folding,
+so the game becomes small enough to solve: every player picks which of the 169 starting hand classes
+(AA, AKs, AKo, ...) to shove when it's folded to them, and which to call a shove with
+
+the solver works in big blinds and in acting order (first to act first, small blind second to last, big blind last)
+    - equities come from a 169x169 table of all in equities (hand class against hand class), computed once with
+      the fast evaluator in a process pool and kept in a file in cache/
+    - card removal comes from a second 169x169 table, how many combos of two classes don't share a card
+    - a shove gets at most one caller, once someone calls everyone behind folds
+    - every decision is learned with regret matching+ (shove and fold regrets per hand class, floored at zero)
+      and the strategies are averaged with later iterations weighted more, the average is what converges,
+      it stops once no player can win more than `tolerance` big blinds against it by changing a decision
+payoffs are chips, or ICM equity (icm.icm_equity) when the payouts are given
+
+charts are cached per stack bucket (stacks rounded to whole big blinds) and PushFoldBot plays them in a bot seat
+"""
+import os
+import random
+from array import array
+from operator import add, mul, truediv
+
+from card import card_to_index
+from evaluator import evaluate
+from hand_range import COMBOS, RANK_CHARS, Range
+from icm import icm_equity
+from parallel import make_executor
+
+PUSH_FOLD_BB = 15
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache")
+EQUITY_SAMPLES = 1000
+
+# the 169 hand classes, pairs, suited and offsuit, as (high rank index, low rank index, kind)
+HAND_CLASSES = tuple(
+    (high, low, kind)
+    for high in range(12, -1, -1)
+    for low in range(high, -1, -1)
+    for kind in (("",) if high == low else ("s", "o"))
+)
+CLASS_COUNT = len(HAND_CLASSES)  # 169
+CLASS_NAMES = tuple(RANK_CHARS[high] + RANK_CHARS[low] + kind for high, low, kind in HAND_CLASSES)
+_class_index = {hand_class: i for i, hand_class in enumerate(HAND_CLASSES)}
+
+
+def hand_class(first: int, second: int) -> int:
+    """
+    :param first: card id of one of the cards
+    :param second: card id of the other card
+    :return: index of the hand class (see HAND_CLASSES)
+    """
+    high, low = max(first >> 2, second >> 2), min(first >> 2, second >> 2)
+    if high == low:
+        return _class_index[(high, low, "")]
+    return _class_index[(high, low, "s" if first & 3 == second & 3 else "o")]
+
+
+# CLASS_COMBOS[c] lists the combos (pairs of card ids) of hand class c: 6 for a pair, 4 suited, 12 offsuit
+CLASS_COMBOS = tuple([] for _ in range(CLASS_COUNT))
+for _combo in COMBOS:
+    CLASS_COMBOS[hand_class(*_combo)].append(_combo)
+CLASS_COMBOS = tuple(tuple(combos) for combos in CLASS_COMBOS)
+
+
+def _disjoint_counts() -> array:
+    """
+    counts the combo pairs of every two classes that don't share a card
+    :return: flat 169x169 array, [h * 169 + k] is the count for classes h and k
+    """
+    # containing[k][card]: how many combos of class k use that card
+    containing = [[0] * 52 for _ in range(CLASS_COUNT)]
+    for k, combos in enumerate(CLASS_COMBOS):
+        for a, b in combos:
+            containing[k][a] += 1
+            containing[k][b] += 1
+
+    counts = array("d", bytes(8 * CLASS_COUNT * CLASS_COUNT))
+    for h, combos in enumerate(CLASS_COMBOS):
+        for a, b in combos:
+            for k in range(CLASS_COUNT):
+                # a combo with both cards is counted twice, that can only be (a, b) itself
+                overlap = containing[k][a] + containing[k][b] - (k == h)
+                counts[h * CLASS_COUNT + k] += len(CLASS_COMBOS[k]) - overlap
+    return counts
+
+
+def _equity_row(hero: int, samples: int, seed: int) -> list[float]:
+    """
+    estimates the all in equity of one hand class against every class after it
+    :param hero: hand class index
+    :param samples: random (combo, combo, board) deals per class pair
+    :param seed: seed for the random number generator
+    :return: equities against classes hero + 1 ... 168
+    """
+    rng = random.Random(seed)
+    deck = range(52)
+    row = []
+    for villain in range(hero + 1, CLASS_COUNT):
+        pairs = [(a, b) for a in CLASS_COMBOS[hero] for b in CLASS_COMBOS[villain] if not set(a) & set(b)]
+        won = 0.0
+        for _ in range(samples):
+            a, b = rng.choice(pairs)
+            board = []
+            while len(board) < 5:
+                card = rng.choice(deck)
+                if card not in a and card not in b and card not in board:
+                    board.append(card)
+            hero_key = evaluate(list(a) + board)
+            villain_key = evaluate(list(b) + board)
+            if hero_key > villain_key:
+                won += 1
+            elif hero_key == villain_key:
+                won += 0.5
+        row.append(won / samples)
+    return row
+
+
+def compute_equity_matrix(samples: int = EQUITY_SAMPLES, workers: int = None, seed: int = 0) -> array:
+    """
+    computes the all in equity of every hand class against every other with monte carlo sampling
+    :param samples: deals per class pair, the standard error is about 0.5 / sqrt(samples)
+    :param workers: number of processes (threads on a free-threaded build), None for one per cpu
+    :param seed: seed for the random deals
+    :return: flat 169x169 array, [h * 169 + k] is the equity of class h against class k (ties count half)
+    """
+    matrix = array("d", [0.5]) * (CLASS_COUNT * CLASS_COUNT)
+    heroes = range(CLASS_COUNT)
+    with make_executor(workers) as pool:
+        rows = pool.map(_equity_row, heroes, [samples] * CLASS_COUNT, [seed * CLASS_COUNT + h for h in heroes])
+        for hero, row in zip(heroes, rows):
+            for villain, equity in enumerate(row, start=hero + 1):
+                matrix[hero * CLASS_COUNT + villain] = equity
+                matrix[villain * CLASS_COUNT + hero] = 1.0 - equity
+    return matrix
+
+
+def load_equity_matrix(samples: int = EQUITY_SAMPLES, workers: int = None) -> array:
+    """
+    reads the equity matrix from cache/, computing and saving it the first time
+    :param samples: deals per class pair (part of the file name, a different number is a different file)
+    :param workers: number of processes if it has to be computed
+    :return: flat 169x169 array, see compute_equity_matrix()
+    """
+    path = os.path.join(CACHE_DIR, f"preflop_equity_{samples}.bin")
+    if os.path.exists(path):
+        matrix = array("d")
+        with open(path, "rb") as file:
+            matrix.fromfile(file, CLASS_COUNT * CLASS_COUNT)
+        return matrix
+
+    matrix = compute_equity_matrix(samples, workers)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # written next to the real file and renamed, so an interrupted run never leaves half a matrix behind
+    with open(path + ".tmp", "wb") as file:
+        matrix.tofile(file)
+    os.replace(path + ".tmp", path)
+    return matrix
+
+
+class Chart:
+    """
+    a class representing a solved push/fold game
+
+    attributes:
+        stacks (tuple): stacks in big blinds, in acting order (the big blind is last)
+        push (list[list[float]]): push[p][h] is how often player p shoves hand class h when it's folded to them
+        call (dict): call[(q, p)][h] is how often player q calls a shove from player p with hand class h
+        iterations (int): iterations the solver needed
+        gap (float): the most a player could still win by changing a decision, in big blinds
+
+    methods:
+        should_push(position, first, second): True if the hand shoves when it's folded to that position
+        should_call(position, shover, first, second): True if the hand calls a shove from shover
+        push_range(position), call_range(position, shover): the hands as a hand_range.Range
+    """
+    def __init__(self, stacks: tuple, push: list, call: dict, iterations: int, gap: float):
+        self.stacks = stacks
+        self.push = push
+        self.call = call
+        self.iterations = iterations
+        self.gap = gap
+
+    def should_push(self, position: int, first: int, second: int) -> bool:
+        """
+        :param position: acting position (0 is first to act)
+        :param first: card id
+        :param second: card id
+        :return: True if the hand shoves
+        """
+        return self.push[position][hand_class(first, second)] >= 0.5
+
+    def should_call(self, position: int, shover: int, first: int, second: int) -> bool:
+        """
+        :param position: acting position of the player facing the shove
+        :param shover: acting position of the player who shoved
+        :param first: card id
+        :param second: card id
+        :return: True if the hand calls
+        """
+        return self.call[(position, shover)][hand_class(first, second)] >= 0.5
+
+    def push_range(self, position: int) -> Range:
+        return Range.parse(_range_text(self.push[position]))
+
+    def call_range(self, position: int, shover: int) -> Range:
+        return Range.parse(_range_text(self.call[(position, shover)]))
+
+    def __repr__(self) -> str:
+        lines = [f"Chart({', '.join(f'{stack:g}' for stack in self.stacks)} bb)"]
+        for position in range(len(self.push)):
+            lines.append(f"  {position} push: {_range_text(self.push[position])}")
+        for (position, shover), strategy in sorted(self.call.items()):
+            lines.append(f"  {position} call {shover}: {_range_text(strategy)}")
+        return "\n".join(lines)
+
+
+def _range_text(strategy: list[float]) -> str:
+    """
+    :param strategy: one probability for every hand class
+    :return: the classes played at least half the time, in range syntax
+    """
+    return ", ".join(name for name, probability in zip(CLASS_NAMES, strategy) if probability >= 0.5)
+
+
+class _Tables:
+    """
+    the per class numbers the solver needs, built once per equity matrix
+    """
+    def __init__(self, equity: array):
+        counts = _disjoint_counts()
+        size = CLASS_COUNT
+        self.prior = [len(combos) / len(COMBOS) for combos in CLASS_COMBOS]
+        # columns of the count matrix and of count * equity (both are multiplied by strategy vectors),
+        # the count matrix is symmetric so its columns are its rows
+        self.count_columns = [counts[k * size:(k + 1) * size].tolist() for k in range(size)]
+        self.win_columns = [[counts[h * size + k] * equity[h * size + k] for h in range(size)] for k in range(size)]
+        # combos of h times the 1225 combos left for the other player
+        self.totals = [sum(column) for column in self.count_columns]
+
+
+# id of an equity matrix -> (the matrix, its _Tables), the matrix is kept so its id can't be reused
+_tables = {}
+
+
+def _get_tables(equity: array) -> _Tables:
+    key = id(equity)
+    if key not in _tables:
+        _tables[key] = (equity, _Tables(equity))
+    return _tables[key][1]
+
+
+def _mat_vec(columns: list, vector: list[float]) -> list[float]:
+    """
+    multiplies a 169x169 matrix (given as columns) by a vector, skipping the zeros of the vector
+    the solver's strategies are mostly 0 or 1 for a hand, so this is usually a handful of column additions
+    """
+    result = [0.0] * CLASS_COUNT
+    for column, value in zip(columns, vector):
+        if value == 1.0:
+            result = list(map(add, result, column))
+        elif value:
+            result = [r + value * c for r, c in zip(result, column)]
+    return result
+
+
+def _outcome_values(stacks: list[float], small_blind: float, payouts) -> tuple:
+    """
+    the value of every way a hand can end, for every player
+    :return: (walk, steals, showdowns) where steals[p] is the values after p shoves and everyone folds
+             and showdowns[(p, q)] is (values if p wins, values if q wins)
+    """
+    players = len(stacks)
+    posted = [0.0] * players
+    posted[-2] = min(small_blind, stacks[-2])
+    posted[-1] = min(1.0, stacks[-1])
+
+    def values(final: list[float]) -> list[float]:
+        if payouts is None:
+            return final
+        alive = [i for i in range(players) if final[i] > 0]
+        equities = icm_equity([final[i] for i in alive], payouts[:len(alive)])
+        result = [payouts[len(alive)] if len(alive) < len(payouts) else 0.0] * players
+        for i, equity in zip(alive, equities):
+            result[i] = equity
+        return result
+
+    after_blinds = [stack - blind for stack, blind in zip(stacks, posted)]
+
+    walk = after_blinds[:]
+    walk[-1] += posted[-2] + posted[-1]
+
+    steals = []
+    for p in range(players - 1):
+        final = after_blinds[:]
+        final[p] = stacks[p] + sum(posted) - posted[p]
+        steals.append(values(final))
+
+    showdowns = {}
+    for p in range(players - 1):
+        for q in range(p + 1, players):
+            all_in = min(stacks[p], stacks[q])
+            dead = sum(posted) - posted[p] - posted[q]
+            results = []
+            for winner, loser in ((p, q), (q, p)):
+                final = after_blinds[:]
+                final[winner] = stacks[winner] + all_in + dead
+                final[loser] = stacks[loser] - all_in
+                results.append(values(final))
+            showdowns[(p, q)] = tuple(results)
+    return values(walk), steals, showdowns
+
+
+def _gains(tables: _Tables, push: list, call: dict, outcomes: tuple) -> dict:
+    """
+    how much better shoving / calling is than folding, for every decision and hand class
+    :param tables: _Tables object
+    :param push: push strategies, push[p][h]
+    :param call: call strategies, call[(q, p)][h]
+    :param outcomes: what _outcome_values() returns
+    :return: {("push", p) or ("call", q, p): (gains, weights)}, weights is how often each hand gets to the decision
+    """
+    walk, steals, showdowns = outcomes
+    players = len(walk)
+    prior = tables.prior
+    totals = tables.totals
+    gains = {}
+
+    # chance that everyone before p folds
+    folded = [1.0]
+    for strategy in push:
+        folded.append(folded[-1] * (1 - sum(map(mul, strategy, prior))))
+
+    # values for everyone once it's folded to p, worked out from the big blind back
+    folded_to = walk
+    for p in range(players - 2, -1, -1):
+        # after p shoves: the chance each player behind calls and the part of it p wins, for every hand of p
+        called = {}
+        won = {}
+        for q in range(p + 1, players):
+            strategy = call[(q, p)]
+            called[q] = list(map(truediv, _mat_vec(tables.count_columns, strategy), totals))
+            won[q] = list(map(truediv, _mat_vec(tables.win_columns, strategy), totals))
+
+        # tails[q][h]: values for everyone once the action is on q after p shoved h
+        tail = [steals[p]] * CLASS_COUNT
+        tails = {players: tail}
+        for q in range(players - 1, p, -1):
+            p_wins, q_wins = showdowns[(p, q)]
+            tail = [[w * a + (c - w) * b + (1 - c) * t for a, b, t in zip(p_wins, q_wins, rest)]
+                    for c, w, rest in zip(called[q], won[q], tail)]
+            tails[q] = tail
+
+        # the hands of p that get to q are the ones p shoves that everyone in between folds to
+        reach = push[p]
+        for q in range(p + 1, players):
+            p_wins, q_wins = showdowns[(p, q)]
+            weights = list(map(mul, reach, prior))
+            total = sum(weights)
+            fold_value = sum(weight * rest[q] for weight, rest in zip(weights, tails[q + 1])) / total if total else 0.0
+            reached = _mat_vec(tables.count_columns, reach)
+            q_won = _mat_vec(tables.win_columns, reach)
+            call_gains = [(w * q_wins[q] + (r - w) * p_wins[q]) / r - fold_value if r else 0.0
+                          for r, w in zip(reached, q_won)]
+            gains[("call", q, p)] = (call_gains, [folded[p] * r / t for r, t in zip(reached, totals)])
+            reach = [r * (1 - c) for r, c in zip(reach, called[q])]
+
+        shove_values = tails[p + 1]
+        gains[("push", p)] = ([values[p] - folded_to[p] for values in shove_values], [folded[p] * x for x in prior])
+
+        chance = sum(map(mul, push[p], prior))
+        shoved = [sum(s * x * values[i] for s, x, values in zip(push[p], prior, shove_values)) for i in range(players)]
+        folded_to = [value + (1 - chance) * rest for value, rest in zip(shoved, folded_to)]
+
+    return gains
+
+
+def _gap(gains: dict, strategies: dict) -> float:
+    """
+    :return: the most any decision could be improved by, per time it comes up
+    """
+    gap = 0.0
+    for key, (gain, weights) in gains.items():
+        total = sum(weights)
+        if total > 0:
+            improvement = sum(w * (max(g, 0.0) - s * g) for w, g, s in zip(weights, gain, strategies[key]))
+            gap = max(gap, improvement / total)
+    return gap
+
+
+def solve(stacks, small_blind: float = 0.5, payouts: list[float] = None, equity: array = None,
+          tolerance: float = 0.01, max_iterations: int = 2000) -> Chart:
+    """
+    solves the push/fold game for one set of stacks
+    :param stacks: stacks in big blinds in acting order (2-8 players, the big blind last, the small blind before it)
+    :param small_blind: the small blind in big blinds
+    :param payouts: prize for 1st, 2nd, ... place to play for ICM equity, None to play for chips
+    :param equity: equity matrix (see load_equity_matrix()), loaded from the cache by default
+    :param tolerance: stop once no decision can be improved by more than this many big blinds
+    :param max_iterations: stop after this many iterations anyway
+    :return: Chart object
+    """
+    players = len(stacks)
+    if not 2 <= players <= 8:
+        raise ValueError("push/fold charts are for 2 to 8 players")
+    if max_iterations < 1:
+        raise ValueError("the solver needs at least one iteration")
+    stacks = [float(stack) for stack in stacks]
+    tables = _get_tables(equity if equity is not None else load_equity_matrix())
+    outcomes = _outcome_values(stacks, small_blind, payouts)
+    # the tolerance is in big blinds, with ICM the values are prize money so it is scaled to what a big blind is worth
+    scale = 1.0 if payouts is None else sum(payouts[:players]) / sum(stacks)
+
+    push = [[0.5] * CLASS_COUNT for _ in range(players - 1)]
+    call = {(q, p): [0.5] * CLASS_COUNT for p in range(players - 1) for q in range(p + 1, players)}
+    strategies = {("push", p): push[p] for p in range(players - 1)}
+    strategies.update({("call", q, p): strategy for (q, p), strategy in call.items()})
+    # regret matching+: positive regrets for shoving/calling and for folding, and the strategies summed up by iteration
+    regrets = {key: ([0.0] * CLASS_COUNT, [0.0] * CLASS_COUNT) for key in strategies}
+    sums = {key: [0.0] * CLASS_COUNT for key in strategies}
+    weight = 0
+
+    gap = float("inf")
+    iteration = 0
+    while iteration < max_iterations:
+        iteration += 1
+        for key, (gain, weights) in _gains(tables, push, call, outcomes).items():
+            strategy = strategies[key]
+            act, fold = regrets[key]
+            total = sums[key]
+            for h in range(CLASS_COUNT):
+                s = strategy[h]
+                total[h] += iteration * s
+                regret = weights[h] * gain[h]
+                act[h] = max(0.0, act[h] + (1 - s) * regret)
+                fold[h] = max(0.0, fold[h] - s * regret)
+                positive = act[h] + fold[h]
+                strategy[h] = act[h] / positive if positive > 0 else 0.5
+        weight += iteration
+
+        # the average strategy is the one that converges, check it every few iterations
+        if iteration % 10 == 0 or iteration == max_iterations:
+            average = {key: [x / weight for x in total] for key, total in sums.items()}
+            average_push = [average[("push", p)] for p in range(players - 1)]
+            average_call = {(q, p): average[("call", q, p)] for q, p in call}
+            gap = _gap(_gains(tables, average_push, average_call, outcomes), average)
+            if gap <= tolerance * scale:
+                break
+
+    return Chart(tuple(stacks), average_push, average_call, iteration, gap / scale)
+
+
+_charts = {}
+
+
+def stack_bucket(stack_bb: float) -> int:
+    """
+    :param stack_bb: stack in big blinds
+    :return: the bucket the chart cache uses, whole big blinds up to 2 * PUSH_FOLD_BB, steps of 5 above that
+    """
+    if stack_bb <= 2 * PUSH_FOLD_BB:
+        return max(1, round(stack_bb))
+    return 5 * round(stack_bb / 5)
+
+
+def chart_key(stacks_bb, small_blind: float = 0.5, payouts: list[float] = None) -> tuple:
+    """
+    :param stacks_bb: stacks in big blinds in acting order
+    :param small_blind: the small blind in big blinds
+    :param payouts: prize for 1st, 2nd, ... place, None to play for chips
+    :return: the key charts are cached under, the stacks are their buckets
+    """
+    return tuple(stack_bucket(stack) for stack in stacks_bb), small_blind, tuple(payouts) if payouts else None
+
+
+def chart_for(stacks_bb, small_blind: float = 0.5, payouts: list[float] = None, equity: array = None,
+              charts: dict = None) -> Chart:
+    """
+    the chart for a set of stacks, solved once per stack bucket and kept in memory
+    :param stacks_bb: stacks in big blinds in acting order
+    :param small_blind: the small blind in big blinds
+    :param payouts: prize for 1st, 2nd, ... place, None to play for chips
+    :param equity: equity matrix, loaded from the cache by default
+    :param charts: dictionary to keep the charts in (chart_key() -> Chart), the module's own by default
+    :return: Chart object
+    """
+    charts = _charts if charts is None else charts
+    key = chart_key(stacks_bb, small_blind, payouts)
+    if key not in charts:
+        charts[key] = solve(key[0], small_blind, payouts, equity)
+    return charts[key]
+
+
+def acting_order(game) -> list:
+    """
+    :param game: Game object
+    :return: the players in the order they act pre-flop (same as Game.pre_flop), the big blind last
+    """
+    count = len(game.players)
+    return [game.players[(game.dealer_index + 3 + i) % count] for i in range(count)]
+
+
+class PushFoldBot:
+    """
+    a class representing a bot that plays push/fold charts pre-flop when its stack is short
+
+    the equity matrix is loaded when the bot is made, not in the middle of a hand: reading it from cache/ is
+    instant, but with no cache yet it is computed first (minutes, see compute_equity_matrix(), once per machine)
+    a chart the bot hasn't seen is solved the first time its stacks come up, a fraction of a second heads up
+    and a few seconds at a full table, pass charts solved before (ex. another bot's charts) to skip that
+
+    attributes:
+        max_bb (float): the bot only uses the charts with an effective stack of at most this many big blinds
+        payouts (list[float]): prizes to play for ICM equity, None to play for chips
+        fallback: bot used for every other decision (ex. mcts.MCTSBot), None to check or fold
+        equity (array): the equity matrix the charts are solved with
+        charts (dict): chart_key() -> Chart, every chart the bot has solved or was given
+
+    methods:
+        decide(game, player): returns the (action, amount) to play, used by Game.handle_player_action
+    """
+    def __init__(self, max_bb: float = PUSH_FOLD_BB, payouts: list[float] = None, fallback=None,
+                 equity: array = None, charts: dict = None):
+        """
+        :param max_bb: see the attributes
+        :param payouts: see the attributes
+        :param fallback: see the attributes
+        :param equity: equity matrix (see load_equity_matrix()), None to load it from cache/ (computed if missing)
+        :param charts: charts solved before, chart_key() -> Chart (shared, not copied), None for the module's cache
+        """
+        self.max_bb = max_bb
+        self.payouts = payouts
+        self.fallback = fallback
+        self.equity = equity if equity is not None else load_equity_matrix()
+        self.charts = _charts if charts is None else charts
+
+    def decide(self, game, player) -> tuple[str, int]:
+        """
+        picks an action for a player
+        :param game: Game object
+        :param player: the player the bot is playing for
+        :return: (action, amount), action is "fold", "check", "call" or "bet"
+        """
+        decision = self._chart_decision(game, player)
+        if decision is not None:
+            return decision
+        if self.fallback is not None:
+            return self.fallback.decide(game, player)
+        return "check", 0
+
+    def _chart_decision(self, game, player):
+        """
+        :return: the chart's (action, amount), or None if the spot isn't a push/fold spot
+        """
+        if game.stage != "preflop":
+            return None
+        order = acting_order(game)
+        position = order.index(player)
+        # chips at the start of the hand, blinds included
+        stacks = [(p.chips + p.current_bet) / game.big_blind for p in order]
+        if min(stacks[position], max(s for i, s in enumerate(stacks) if i != position)) > self.max_bb:
+            return None
+
+        in_before = [i for i in range(position) if not order[i].folded]
+        first, second = (card_to_index(card) for card in player.hand)
+        chart = chart_for(stacks, game.small_blind / game.big_blind, self.payouts, self.equity, self.charts)
+
+        if not in_before and game.minimum_bet <= game.big_blind:
+            if position == len(order) - 1:
+                return "check", 0
+            if chart.should_push(position, first, second):
+                return "bet", player.chips
+            return "fold", 0
+
+        if len(in_before) == 1 and order[in_before[0]].is_all_in():
+            if chart.should_call(position, in_before[0], first, second):
+                return "call", 0
+            return "fold", 0
+        return None
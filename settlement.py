@@ -0,0 +1,95 @@
+"""
+side pot settlement
+
+every player's chips for the whole hand (Player.total_bet) are split into a main pot and side pots:
+sorted by how much they put in, each new amount is a layer that everyone who put in at least that much
+pays into, and the players who haven't folded among them can win it
+each pot goes to the best hand key (evaluator.evaluate) of the players who can win it, split evenly,
+the chips that don't split evenly go one at a time to the winners closest to the left of the dealer
+
+everything is integers and done once per hand, so settling stays cheap in simulations with a lot of all ins
+"""
+from evaluator import evaluate_cards
+
+
+def build_pots(contributions: list[int], live: list[bool]) -> list[tuple[int, list[int]]]:
+    """
+    splits what every seat put in into pots, in one pass over the seats sorted by contribution
+    :param contributions: chips each seat put in this hand (folded seats too, their chips stay in the pots)
+    :param live: True for every seat that hasn't folded
+    :return: list of (amount, seats that can win it), the main pot first
+    """
+    pots = []
+    order = sorted(range(len(contributions)), key=contributions.__getitem__)
+    previous = 0
+    for i, seat in enumerate(order):
+        level = contributions[seat]
+        if level <= previous:
+            continue
+        # everyone from here on put in at least this much
+        amount = (level - previous) * (len(order) - i)
+        eligible = sorted(s for s in order[i:] if live[s])
+        previous = level
+        if pots and (not eligible or pots[-1][1] == eligible):
+            # same players as the last pot (a folded player's layer), or nobody left to win it
+            pots[-1] = (pots[-1][0] + amount, pots[-1][1])
+        else:
+            pots.append((amount, eligible))
+    return pots
+
+
+def award_pots(pots: list[tuple[int, list[int]]], keys: list, first_seat: int = 0) -> tuple[list[int], list]:
+    """
+    gives every pot to the best hand that can win it
+    :param pots: what build_pots() returns
+    :param keys: hand key of every seat (bigger is better), None for folded seats
+    :param first_seat: the seat left of the dealer, odd chips go to the winners closest after it
+    :return: chips won by every seat, and (amount, seats that could win it, winning seats) for every pot
+    """
+    seats = len(keys)
+    winnings = [0] * seats
+    results = []
+    for amount, eligible in pots:
+        best = max(keys[seat] for seat in eligible)
+        winners = sorted((seat for seat in eligible if keys[seat] == best), key=lambda seat: (seat - first_seat) % seats)
+        share, odd = divmod(amount, len(winners))
+        for i, seat in enumerate(winners):
+            winnings[seat] += share + (1 if i < odd else 0)
+        results.append((amount, eligible, winners))
+    return winnings, results
+
+
+def settle(contributions: list[int], keys: list, first_seat: int = 0) -> tuple[list[int], list]:
+    """
+    builds and awards every pot of a hand
+    :param contributions: chips each seat put in this hand
+    :param keys: hand key of every seat, None for folded seats
+    :param first_seat: the seat left of the dealer
+    :return: chips won by every seat, and (amount, seats that could win it, winning seats) for every pot
+    """
+    pots = build_pots(contributions, [key is not None for key in keys])
+    return award_pots(pots, keys, first_seat)
+
+
+def settle_game(game, keys: list = None) -> tuple[list[int], list]:
+    """
+    settles the pot of a Game (or table_store.GameView) and pays the winners
+    :param game: Game object at the end of a hand
+    :param keys: hand key of every player (None for folded players), evaluated here if not given
+    :return: chips won by every player (same order as game.players),
+             and (amount, players who could win it, winning players) for every pot
+    """
+    players = game.players
+    if keys is None:
+        if sum(not player.folded for player in players) > 1:
+            keys = [None if player.folded else evaluate_cards(player.hand + game.community_cards) for player in players]
+        else:
+            # nobody to beat, no need to look at the cards
+            keys = [None if player.folded else 0 for player in players]
+    winnings, pots = settle([player.total_bet for player in players], keys, (game.dealer_index + 1) % len(players))
+
+    for player, won in zip(players, winnings):
+        player.chips += won
+    game.pot = 0
+    return winnings, [(amount, [players[seat] for seat in eligible], [players[seat] for seat in winners])
+                      for amount, eligible, winners in pots]
@@ -0,0 +1,407 @@
+"""
+shared memory result aggregation for simulations that run in several processes
+
+sending a result back for every hand (pickled through a queue) costs more than playing the hand, so every worker
+gets its own slab, a multiprocessing.shared_memory block that only that worker writes to:
+    - a header: sequence number and number of updates
+    - per seat: hands, chip delta sum and sum of squares, a histogram of chip deltas in big blinds,
+      showdowns and showdowns won by hand category, equity sum and a histogram of equities
+the parent reads the slabs whenever it wants (at checkpoints, or once the workers are done) and adds them up
+there are no locks: the worker makes the sequence number odd before an update and even after it,
+and a read that sees an odd or changed number is simply tried again (a seqlock)
+
+simulate_games() plays headless Games (every seat a bot) and run_equity() deals equity trials with it
+simulate_games() can also checkpoint every worker (see checkpoint.py), a run started again with the same arguments
+picks up where the workers were and ends with exactly the results of a run that never stopped
+on a free-threaded build the workers are threads instead (see parallel.py), the slabs work the same in one process
+"""
+import os
+import random
+from array import array
+from concurrent.futures import FIRST_EXCEPTION, wait
+from multiprocessing import shared_memory
+
+from checkpoint import game_state, load_checkpoint, restore_game, save_checkpoint
+from evaluator import CATEGORY_NAMES, category, evaluate, evaluate_cards
+from game import Game
+from mcts import MCTSBot
+from parallel import make_executor
+from player import Player
+from stats import MAX_POSITIONS
+
+SEATS = MAX_POSITIONS
+# -20 to +20 big blinds, the first and last bins hold everything past that
+DELTA_BINS = 41
+EQUITY_BINS = 20
+# hands a simulate_games() worker plays between checkpoints
+CHECKPOINT_HANDS = 10_000
+CATEGORIES = len(CATEGORY_NAMES)
+
+# header counters
+_SEQUENCE = 0
+_UPDATES = 1
+_HEADER = 2
+# int64 counters of a seat, from the start of the seat's block
+_HANDS = 0
+_DELTA = 1
+_DELTA_HISTOGRAM = 2
+_SHOWDOWNS = _DELTA_HISTOGRAM + DELTA_BINS
+_SHOWDOWN_WINS = _SHOWDOWNS + CATEGORIES
+_EQUITY_COUNT = _SHOWDOWN_WINS + CATEGORIES
+_EQUITY_HISTOGRAM = _EQUITY_COUNT + 1
+SEAT_COUNTERS = _EQUITY_HISTOGRAM + EQUITY_BINS
+# float64 sums of a seat
+_DELTA_SQUARES = 0
+_EQUITY_SUM = 1
+SEAT_SUMS = 2
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    opens a block made by another process, only the process that made it unlinks it
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # before python 3.13 there is no track argument, workers share the parent's resource tracker
+        # (fork and spawn both hand it down), so registering the block again there changes nothing
+        return shared_memory.SharedMemory(name=name)
+
+
+class ResultSlab:
+    """
+    a class holding one worker's counters in shared memory
+
+    attributes:
+        name (str): name of the shared memory block, a worker opens it with ResultSlab(name, seats)
+        seats (int): number of seats
+        counters: int64 values (header, then SEAT_COUNTERS per seat)
+        sums: float64 values (SEAT_SUMS per seat)
+
+    methods:
+        begin(), end(): go around every update
+        add_hand(deltas, big_blind): chip delta of every seat for one hand
+        add_showdown(seat, category, won): a seat that went to showdown
+        add_equity(seat, equity): one equity result of a seat
+        snapshot(): consistent copy of the counters and sums
+        load(counters, sums): puts a snapshot back, for a worker that resumes
+        close(), unlink(): closes the block, unlink() removes it (the process that made it)
+    """
+    def __init__(self, name: str = None, seats: int = SEATS):
+        """
+        :param name: block to open, None to make a new one
+        :param seats: number of seats
+        """
+        self.seats = seats
+        counter_bytes = 8 * (_HEADER + seats * SEAT_COUNTERS)
+        size = counter_bytes + 8 * seats * SEAT_SUMS
+        if name is None:
+            self._memory = shared_memory.SharedMemory(create=True, size=size)
+            self._memory.buf[:size] = bytes(size)
+        else:
+            self._memory = _attach(name)
+        self.name = self._memory.name
+        self.counters = self._memory.buf[:counter_bytes].cast("q")
+        self.sums = self._memory.buf[counter_bytes:size].cast("d")
+
+    def begin(self) -> None:
+        self.counters[_SEQUENCE] += 1
+
+    def end(self) -> None:
+        self.counters[_UPDATES] += 1
+        self.counters[_SEQUENCE] += 1
+
+    def add_hand(self, deltas: list[int], big_blind: int) -> None:
+        """
+        :param deltas: chips won (or lost, negative) by every seat
+        :param big_blind: big blind, the histogram bins are one big blind wide
+        :return: None
+        """
+        counters = self.counters
+        for seat, delta in enumerate(deltas):
+            base = _HEADER + seat * SEAT_COUNTERS
+            counters[base + _HANDS] += 1
+            counters[base + _DELTA] += delta
+            bin_number = min(max(round(delta / big_blind) + DELTA_BINS // 2, 0), DELTA_BINS - 1)
+            counters[base + _DELTA_HISTOGRAM + bin_number] += 1
+            self.sums[seat * SEAT_SUMS + _DELTA_SQUARES] += delta * delta
+
+    def add_showdown(self, seat: int, hand_category: int, won: bool) -> None:
+        """
+        :param seat: the seat
+        :param hand_category: category of the seat's hand (evaluator.category)
+        :param won: True if the seat came out ahead
+        :return: None
+        """
+        base = _HEADER + seat * SEAT_COUNTERS
+        self.counters[base + _SHOWDOWNS + hand_category] += 1
+        if won:
+            self.counters[base + _SHOWDOWN_WINS + hand_category] += 1
+
+    def add_equity(self, seat: int, equity: float) -> None:
+        """
+        :param seat: the seat
+        :param equity: share of the pot won (0 to 1)
+        :return: None
+        """
+        base = _HEADER + seat * SEAT_COUNTERS
+        self.counters[base + _EQUITY_COUNT] += 1
+        self.counters[base + _EQUITY_HISTOGRAM + min(int(equity * EQUITY_BINS), EQUITY_BINS - 1)] += 1
+        self.sums[seat * SEAT_SUMS + _EQUITY_SUM] += equity
+
+    def snapshot(self) -> tuple[list[int], list[float]]:
+        """
+        copies the slab while the worker may be writing to it, without stopping the worker
+        :return: counters and sums
+        """
+        while True:
+            sequence = self.counters[_SEQUENCE]
+            if sequence % 2:
+                continue
+            counters = self.counters.tolist()
+            sums = self.sums.tolist()
+            if self.counters[_SEQUENCE] == sequence:
+                return counters, sums
+
+    def load(self, counters: list[int], sums: list[float]) -> None:
+        """
+        :param counters: counters of a snapshot()
+        :param sums: sums of a snapshot()
+        :return: None
+        """
+        self.counters[_SEQUENCE] += 1
+        # the sequence number keeps counting from where it is, everything else is the snapshot's
+        self.counters[_UPDATES:] = array("q", counters[_UPDATES:])
+        self.sums[:] = array("d", sums)
+        self.counters[_SEQUENCE] += 1
+
+    def close(self) -> None:
+        self.counters.release()
+        self.sums.release()
+        self._memory.close()
+
+    def unlink(self) -> None:
+        self._memory.unlink()
+
+
+def summarize(snapshots, seats: int) -> dict:
+    """
+    adds up slab snapshots
+    :param snapshots: iterable of ResultSlab.snapshot() results
+    :param seats: number of seats
+    :return: {"updates": int, "seats": [a dictionary per seat]}, plain numbers so it can be saved as JSON
+    """
+    counters = [0] * (_HEADER + seats * SEAT_COUNTERS)
+    sums = [0.0] * (seats * SEAT_SUMS)
+    for slab_counters, slab_sums in snapshots:
+        counters = [a + b for a, b in zip(counters, slab_counters)]
+        sums = [a + b for a, b in zip(sums, slab_sums)]
+
+    result = {"updates": counters[_UPDATES], "seats": []}
+    for seat in range(seats):
+        block = counters[_HEADER + seat * SEAT_COUNTERS:_HEADER + (seat + 1) * SEAT_COUNTERS]
+        hands = block[_HANDS]
+        equity_count = block[_EQUITY_COUNT]
+        result["seats"].append({
+            "hands": hands,
+            "chip_delta": block[_DELTA],
+            "chip_delta_squares": sums[seat * SEAT_SUMS + _DELTA_SQUARES],
+            "mean_chip_delta": block[_DELTA] / hands if hands else 0.0,
+            "delta_histogram": block[_DELTA_HISTOGRAM:_DELTA_HISTOGRAM + DELTA_BINS],
+            "showdowns": dict(zip(CATEGORY_NAMES, block[_SHOWDOWNS:_SHOWDOWNS + CATEGORIES])),
+            "showdown_wins": dict(zip(CATEGORY_NAMES, block[_SHOWDOWN_WINS:_SHOWDOWN_WINS + CATEGORIES])),
+            "equity_count": equity_count,
+            "equity": sums[seat * SEAT_SUMS + _EQUITY_SUM] / equity_count if equity_count else 0.0,
+            "equity_histogram": block[_EQUITY_HISTOGRAM:_EQUITY_HISTOGRAM + EQUITY_BINS],
+        })
+    return result
+
+
+class SharedResults:
+    """
+    a class holding the parent's side: a slab for every worker
+
+    attributes:
+        seats (int): number of seats
+        slabs (list[ResultSlab]): one per worker, pass slab.name to the worker
+
+    methods:
+        merge(): summary of every slab so far (see summarize), can be called while the workers run
+        close(): closes and removes the slabs
+    """
+    def __init__(self, workers: int, seats: int = SEATS):
+        self.seats = seats
+        self.slabs = [ResultSlab(seats=seats) for _ in range(workers)]
+
+    def merge(self) -> dict:
+        return summarize((slab.snapshot() for slab in self.slabs), self.seats)
+
+    def close(self) -> None:
+        for slab in self.slabs:
+            slab.close()
+            slab.unlink()
+        self.slabs = []
+
+
+def mcts_bot(seat: int, seed: int) -> MCTSBot:
+    """
+    the default bot factory of simulate_games(), a fast MCTSBot
+    :param seat: seat number
+    :param seed: seed for the bot
+    :return: MCTSBot object
+    """
+    # no time budget, only the search's minimum number of playouts, so the same seed plays the same hands
+    return MCTSBot(budget_ms=0, seed=seed)
+
+
+def _game_worker(slab_name: str, names: list[str], chips: int, hands: int, seed: int, bot_factory,
+                 small_blind: int, big_blind: int, checkpoint_path: str = None, checkpoint_hands: int = None) -> int:
+    """
+    plays hands at one table, every hand starts with full stacks and the dealer moves one seat after it
+    with a checkpoint_path it starts from the checkpoint there (if any) and saves one every checkpoint_hands hands
+    :return: number of hands played
+    """
+    slab = ResultSlab(slab_name, len(names))
+    players = [Player(name, chips) for name in names]
+    game = Game(players)
+    game.rng = random.Random(seed)
+    game.headless = True
+    game.small_blind = small_blind
+    game.big_blind = big_blind
+    game.bots = {name: bot_factory(seat, seed * SEATS + seat) for seat, name in enumerate(names)}
+
+    done = 0
+    state = load_checkpoint(checkpoint_path) if checkpoint_path is not None else None
+    if state is not None:
+        restore_game(game, state)
+        slab.load(*state["slab"])
+        done = state["hands"]
+
+    for played in range(done + 1, hands + 1):
+        for player in players:
+            player.chips = chips
+        game.play_hand()
+
+        slab.begin()
+        slab.add_hand([player.chips - chips for player in players], big_blind)
+        if sum(not player.folded for player in players) > 1:
+            for seat, player in enumerate(players):
+                if not player.folded:
+                    hand_category = category(evaluate_cards(player.hand + game.community_cards))
+                    slab.add_showdown(seat, hand_category, player.chips > chips)
+        slab.end()
+        game.dealer_index = (game.dealer_index + 1) % len(players)
+        if checkpoint_path is not None and (played % checkpoint_hands == 0 or played == hands):
+            save_checkpoint(checkpoint_path, game_state(game, hands=played, slab=slab.snapshot()))
+    slab.close()
+    return hands - done
+
+
+def _equity_worker(slab_name: str, hands: list, board: list, trials: int, seed: int) -> int:
+    """
+    deals random boards and records every seat's share of the pot
+    :return: number of trials
+    """
+    slab = ResultSlab(slab_name, len(hands))
+    rng = random.Random(seed)
+    dead = set(board).union(*hands)
+    unseen = [card for card in range(52) if card not in dead]
+    missing = 5 - len(board)
+    for _ in range(trials):
+        final_board = board + rng.sample(unseen, missing)
+        keys = [evaluate(hand + final_board) for hand in hands]
+        best = max(keys)
+        share = 1 / keys.count(best)
+        slab.begin()
+        for seat, key in enumerate(keys):
+            slab.add_equity(seat, share if key == best else 0.0)
+        slab.end()
+    slab.close()
+    return trials
+
+
+def _run(tasks: list, seats: int, workers: int, threads: bool, checkpoint_seconds: float, on_checkpoint) -> dict:
+    """
+    runs one task per worker, each with its own slab (the slab name is filled in as the first argument)
+    :return: the merged results
+    """
+    results = SharedResults(len(tasks), seats)
+    try:
+        with make_executor(workers, threads) as pool:
+            pending = {pool.submit(function, slab.name, *arguments)
+                       for slab, (function, *arguments) in zip(results.slabs, tasks)}
+            while pending:
+                done, pending = wait(pending, timeout=checkpoint_seconds, return_when=FIRST_EXCEPTION)
+                for future in done:
+                    future.result()
+                if pending and on_checkpoint is not None:
+                    on_checkpoint(results.merge())
+        return results.merge()
+    finally:
+        results.close()
+
+
+def simulate_games(hands: int, names: list[str], chips: int = 1000, workers: int = None, seed: int = 0,
+                   bot_factory=mcts_bot, small_blind: int = 10, big_blind: int = 20, threads: bool = None,
+                   checkpoint_seconds: float = None, on_checkpoint=None, checkpoint_dir: str = None,
+                   checkpoint_hands: int = CHECKPOINT_HANDS) -> dict:
+    """
+    plays headless hands at one table per worker, every seat is a bot
+    :param hands: total number of hands, split between the workers
+    :param names: player names, one per seat (at most SEATS)
+    :param chips: stack every hand starts with
+    :param workers: number of processes or threads, None for one per cpu
+    :param seed: seed for the decks and bots
+    :param bot_factory: picklable function (seat, seed) -> bot, see mcts_bot (its bots should only use their rng
+                        for a resumed run to match one that never stopped)
+    :param small_blind: small blind
+    :param big_blind: big blind
+    :param threads: run on threads instead of processes, None to do so only on a free-threaded build
+    :param checkpoint_seconds: how often on_checkpoint is called, None only at the end
+    :param on_checkpoint: function called with the merged results so far
+    :param checkpoint_dir: directory for the workers' checkpoints, None for none, a run started again with the same
+                           arguments and directory goes on from the checkpoints (a finished run just returns)
+    :param checkpoint_hands: hands a worker plays between checkpoints
+    :return: merged results, see summarize()
+    """
+    workers = workers or os.cpu_count()
+    paths = [None] * workers
+    if checkpoint_dir is not None:
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        run = {"hands": hands, "names": list(names), "chips": chips, "workers": workers, "seed": seed,
+               "bot_factory": f"{bot_factory.__module__}.{bot_factory.__qualname__}",
+               "small_blind": small_blind, "big_blind": big_blind}
+        run_path = os.path.join(checkpoint_dir, "run.json")
+        saved = load_checkpoint(run_path)
+        if saved is None:
+            save_checkpoint(run_path, run)
+        elif saved != run:
+            raise ValueError(f"{checkpoint_dir} has the checkpoints of a different run")
+        paths = [os.path.join(checkpoint_dir, f"worker-{i}.json") for i in range(workers)]
+
+    shares = [hands // workers + (i < hands % workers) for i in range(workers)]
+    tasks = [(_game_worker, names, chips, share, seed * 1_000_003 + i, bot_factory, small_blind, big_blind,
+              paths[i], checkpoint_hands)
+             for i, share in enumerate(shares) if share]
+    return _run(tasks, len(names), workers, threads, checkpoint_seconds, on_checkpoint)
+
+
+def run_equity(hands: list, board: list = (), trials: int = 100_000, workers: int = None, seed: int = 0,
+               threads: bool = None, checkpoint_seconds: float = None, on_checkpoint=None) -> dict:
+    """
+    monte carlo all in equity of every hand
+    :param hands: hole card ids of every seat
+    :param board: board card ids dealt so far
+    :param trials: total number of boards, split between the workers
+    :param workers: number of processes or threads, None for one per cpu
+    :param seed: seed for the boards
+    :param threads: run on threads instead of processes, None to do so only on a free-threaded build
+    :param checkpoint_seconds: how often on_checkpoint is called, None only at the end
+    :param on_checkpoint: function called with the merged results so far
+    :return: merged results, see summarize(), "equity" of every seat is its share of the pots
+    """
+    workers = workers or os.cpu_count()
+    shares = [trials // workers + (i < trials % workers) for i in range(workers)]
+    tasks = [(_equity_worker, [list(hand) for hand in hands], list(board), share, seed * 1_000_003 + i)
+             for i, share in enumerate(shares) if share]
+    return _run(tasks, len(hands), workers, threads, checkpoint_seconds, on_checkpoint)
@@ -0,0 +1,242 @@
+"""
+streaming player statistics
+
+StatsAggregator reads game events one at a time (from Game.event_listeners or a saved hand history)
+and only keeps fixed size counters for each player, so memory doesn't grow with the number of hands
+summaries are plain dictionaries of numbers, so stats from different worker processes can be merged
+
+stats:
+    VPIP        how often the player put money in preflop without being forced to (calls and bets, not blinds)
+    PFR         how often the player bet or raised preflop
+    AF          aggression factor, bets / calls after the flop
+    WTSD        how often the player went to showdown after seeing the flop
+    W$SD        how often the player won when they went to showdown
+    chip EV     average chips won or lost per hand, for each position relative to the dealer
+"""
+
+# position 0 is the dealer, 1 the small blind, 2 the big blind and so on (the table has at most 8 players)
+MAX_POSITIONS = 8
+
+COUNTERS = ("hands", "vpip", "pfr", "bets", "calls", "saw_flop", "showdowns", "showdown_wins")
+
+
+class PlayerStats:
+    """
+    a class holding the running counters of a single player
+
+    attributes:
+        counters (dict): every name in COUNTERS mapped to a count
+        position_hands (list[int]): number of hands played in each position
+        position_chips (list[int]): total chips won (or lost, negative) in each position
+
+    methods:
+        vpip(), pfr(), aggression_factor(), went_to_showdown(), won_at_showdown(): the stats as numbers
+        chip_ev(position): average chips won per hand in a position
+        merge(other): adds another PlayerStats' counters into this one
+    """
+    __slots__ = ("counters", "position_hands", "position_chips")
+
+    def __init__(self):
+        """
+        initializes all counters to 0
+        """
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.position_hands = [0] * MAX_POSITIONS
+        self.position_chips = [0] * MAX_POSITIONS
+
+    def _ratio(self, numerator: str, denominator: str) -> float:
+        """
+        :param numerator: counter name
+        :param denominator: counter name
+        :return: numerator / denominator, or 0 if the denominator is 0
+        """
+        if self.counters[denominator] == 0:
+            return 0.0
+        return self.counters[numerator] / self.counters[denominator]
+
+    def vpip(self) -> float:
+        return self._ratio("vpip", "hands")
+
+    def pfr(self) -> float:
+        return self._ratio("pfr", "hands")
+
+    def aggression_factor(self) -> float:
+        return self._ratio("bets", "calls")
+
+    def went_to_showdown(self) -> float:
+        return self._ratio("showdowns", "saw_flop")
+
+    def won_at_showdown(self) -> float:
+        return self._ratio("showdown_wins", "showdowns")
+
+    def chip_ev(self, position: int) -> float:
+        """
+        :param position: seat relative to the dealer (0 = dealer, 1 = small blind, ...)
+        :return: average chips won per hand in that position
+        """
+        if self.position_hands[position] == 0:
+            return 0.0
+        return self.position_chips[position] / self.position_hands[position]
+
+    def merge(self, other: "PlayerStats") -> None:
+        """
+        adds the counters of another PlayerStats into this one
+        :param other: PlayerStats object
+        :return: None
+        """
+        for name in COUNTERS:
+            self.counters[name] += other.counters[name]
+        for position in range(MAX_POSITIONS):
+            self.position_hands[position] += other.position_hands[position]
+            self.position_chips[position] += other.position_chips[position]
+
+    def to_dict(self) -> dict:
+        """
+        :return: the counters as a plain dictionary (safe to pickle or write as JSON)
+        """
+        return {**self.counters, "position_hands": list(self.position_hands),
+                "position_chips": list(self.position_chips)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlayerStats":
+        """
+        :param data: dictionary made by to_dict()
+        :return: PlayerStats object
+        """
+        stats = cls()
+        for name in COUNTERS:
+            stats.counters[name] = data[name]
+        stats.position_hands = list(data["position_hands"])
+        stats.position_chips = list(data["position_chips"])
+        return stats
+
+
+class StatsAggregator:
+    """
+    a class that turns a stream of game events into per player statistics
+
+    only the current hand is remembered between events, everything else is added into the
+    PlayerStats counters as soon as the hand ends
+
+    attributes:
+        players (dict[str, PlayerStats]): stats for every player seen so far
+
+    methods:
+        consume(event): reads a single event (can be added to Game.event_listeners)
+        consume_all(events): reads an iterable of events, ex. a hand history file
+        summary(): returns all stats as a plain dictionary
+        merge(summary): adds a summary made by another aggregator
+    """
+    def __init__(self):
+        """
+        initializes an empty aggregator
+        """
+        self.players: dict[str, PlayerStats] = {}
+        self._positions = {}
+        self._start_chips = {}
+        self._flags = {}
+
+    def _stats(self, name: str) -> PlayerStats:
+        """
+        :param name: player name
+        :return: the player's PlayerStats, created if this is the first time the player is seen
+        """
+        stats = self.players.get(name)
+        if stats is None:
+            stats = self.players[name] = PlayerStats()
+        return stats
+
+    def consume(self, event: dict) -> None:
+        """
+        reads a single event and updates the stats
+        :param event: dictionary with a "type" key (see Game.emit)
+        :return: None
+        """
+        event_type = event["type"]
+
+        if event_type == "hand_start":
+            players = event["players"]
+            dealer = event["dealer_index"]
+            self._positions = {name: (seat - dealer) % len(players) for seat, name in enumerate(players)}
+            self._start_chips = dict(zip(players, event["chips"]))
+            # vpip, pfr, saw flop, went to showdown, each player counts once per hand
+            self._flags = {name: set() for name in players}
+            for name in players:
+                self._stats(name).counters["hands"] += 1
+
+        elif event_type == "action":
+            name = event["player"]
+            stage = event["stage"]
+            action = event["action"]
+            stats = self._stats(name)
+            flags = self._flags.setdefault(name, set())
+            if stage == "preflop":
+                if action in ("call", "bet"):
+                    flags.add("vpip")
+                if action == "bet":
+                    flags.add("pfr")
+            else:
+                flags.add("saw_flop")
+                if action == "bet":
+                    stats.counters["bets"] += 1
+                elif action == "call":
+                    stats.counters["calls"] += 1
+
+        elif event_type == "showdown":
+            winners = set(event["winners"])
+            for name in event["players"]:
+                flags = self._flags.setdefault(name, set())
+                flags.add("saw_flop")
+                flags.add("showdowns")
+                if name in winners:
+                    flags.add("showdown_wins")
+
+        elif event_type == "hand_end":
+            chips = dict(zip(event["players"], event["chips"]))
+            for name, flags in self._flags.items():
+                stats = self._stats(name)
+                for flag in flags:
+                    stats.counters[flag] += 1
+                position = self._positions.get(name)
+                if position is not None and position < MAX_POSITIONS:
+                    stats.position_hands[position] += 1
+                    stats.position_chips[position] += chips.get(name, 0) - self._start_chips.get(name, 0)
+            self._flags = {}
+            self._positions = {}
+            self._start_chips = {}
+
+    def consume_all(self, events) -> None:
+        """
+        reads every event from an iterable (can be a generator, nothing is kept)
+        :param events: iterable of event dictionaries
+        :return: None
+        """
+        for event in events:
+            self.consume(event)
+
+    def summary(self) -> dict:
+        """
+        :return: {player name: PlayerStats.to_dict()} for every player
+        """
+        return {name: stats.to_dict() for name, stats in self.players.items()}
+
+    def merge(self, summary: dict) -> None:
+        """
+        adds a summary made by another aggregator (ex. from a worker process) into this one
+        :param summary: dictionary made by summary()
+        :return: None
+        """
+        for name, data in summary.items():
+            self._stats(name).merge(PlayerStats.from_dict(data))
+
+
+def merge_summaries(summaries) -> dict:
+    """
+    combines the summaries of several aggregators into one
+    :param summaries: iterable of dictionaries made by StatsAggregator.summary()
+    :return: a single merged summary
+    """
+    aggregator = StatsAggregator()
+    for summary in summaries:
+        aggregator.merge(summary)
+    return aggregator.summary()
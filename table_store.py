@@ -0,0 +1,504 @@
+"""
+compact storage for a lot of tables in one process
+
+a normal Game keeps a Player object per seat, a Deck of 52 Card objects and a list of community cards,
+which is a few kilobytes per table, TableStore keeps every table in flat arrays instead
+(one array per field, "struct of arrays"), with cards stored as their integer ids (see card.card_to_index),
+so a table costs a few hundred bytes (about 0.45 KB with eight seats, dealt to the flop),
+plus about 60 bytes for every player name the store hasn't seen before (its entry in names and in the lookup),
+which matters when every table has different players: then it's about 0.9 KB, against about 5.5 KB for a Game
+
+GameView, PlayerView and DeckView are thin objects that read and write those arrays but look like
+Game, Player and Deck, so the rest of the code doesn't need to know where a table lives
+views are cheap to create, make one when a table is touched and drop it afterwards
+"""
+import random
+from array import array
+
+from card import index_to_card, card_to_index
+from deck import thread_rng
+from game import Game
+from outs import OutsAnalyzer
+from player import Player
+
+MAX_SEATS = 8
+STAGES = ("preflop", "flop", "turn", "river")
+
+# the 52 cards are shared by every view instead of making a new Card every time one is read
+CARDS = tuple(index_to_card(i) for i in range(52))
+
+NO_CARD = -1
+NO_INDEX = -1
+
+
+class TableStore:
+    """
+    a class holding the state of many tables in flat arrays
+
+    attributes (one entry per table):
+        pot, minimum_bet, small_blind, big_blind, dealer_index, last_raiser_index, stage, seat_count
+        deck_size (array): number of cards left in the table's deck
+    attributes (one entry per seat, table * MAX_SEATS + seat):
+        chips, current_bet, total_bet, folded, name_id
+        hole_cards (array): two card ids per seat, -1 if not dealt
+    other attributes:
+        decks (bytearray): 52 card ids per table, the top of the deck is at deck_size - 1
+        community (array): 5 card ids per table, -1 if not dealt
+        names (list[str]): player names, seats only store the position in this list
+
+    methods:
+        add_table(names, chips): creates a table and returns its id
+        remove_table(table): frees a table so its slot can be reused
+        remove_seat(table, seat): removes a player from a table (ex. eliminated)
+        game(table): returns a GameView of the table
+    """
+    def __init__(self, capacity: int = 0):
+        """
+        initializes an empty store
+        :param capacity: number of tables to make room for up front
+        """
+        self.capacity = 0
+        self.pot = array("q")
+        self.minimum_bet = array("q")
+        self.small_blind = array("q")
+        self.big_blind = array("q")
+        self.dealer_index = array("b")
+        self.last_raiser_index = array("b")
+        self.stage = array("b")
+        self.seat_count = array("b")
+        self.deck_size = array("b")
+        self.decks = bytearray()
+        self.community = array("b")
+
+        self.chips = array("q")
+        self.current_bet = array("q")
+        self.total_bet = array("q")
+        self.folded = array("b")
+        self.name_id = array("i")
+        self.hole_cards = array("b")
+
+        self.names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self._free: list[int] = []
+        self._grow(capacity)
+
+    def _grow(self, count: int) -> None:
+        """
+        makes room for more tables, the new slots are added to the free list
+        :param count: number of tables to add
+        :return: None
+        """
+        if count <= 0:
+            return
+        for column in (self.pot, self.minimum_bet, self.small_blind, self.big_blind):
+            column.extend(array(column.typecode, [0]) * count)
+        for column in (self.dealer_index, self.stage, self.seat_count, self.deck_size):
+            column.extend(array(column.typecode, [0]) * count)
+        self.last_raiser_index.extend(array("b", [NO_INDEX]) * count)
+        self.decks.extend(bytes(52 * count))
+        self.community.extend(array("b", [NO_CARD]) * (5 * count))
+
+        seats = MAX_SEATS * count
+        self.chips.extend(array("q", [0]) * seats)
+        self.current_bet.extend(array("q", [0]) * seats)
+        self.total_bet.extend(array("q", [0]) * seats)
+        self.folded.extend(array("b", [0]) * seats)
+        self.name_id.extend(array("i", [NO_INDEX]) * seats)
+        self.hole_cards.extend(array("b", [NO_CARD]) * (2 * seats))
+
+        # reversed so tables are handed out in order
+        self._free.extend(range(self.capacity + count - 1, self.capacity - 1, -1))
+        self.capacity += count
+
+    def _intern(self, name: str) -> int:
+        """
+        :param name: player name
+        :return: the position of the name in self.names (added if it's new)
+        """
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self.names)
+            self.names.append(name)
+        return name_id
+
+    def add_table(self, names: list[str], chips: list[int], small_blind: int = 10, big_blind: int = 20) -> int:
+        """
+        creates a new table with the same starting state as Game.__init__
+        :param names: player names, one per seat
+        :param chips: starting chips, one per seat
+        :param small_blind: small blind amount
+        :param big_blind: big blind amount
+        :return: the table id
+        """
+        if len(names) > MAX_SEATS:
+            raise ValueError(f"a table has at most {MAX_SEATS} seats")
+        if not self._free:
+            self._grow(max(1, self.capacity))
+        table = self._free.pop()
+
+        self.pot[table] = 0
+        self.minimum_bet[table] = big_blind
+        self.small_blind[table] = small_blind
+        self.big_blind[table] = big_blind
+        self.dealer_index[table] = 0
+        self.last_raiser_index[table] = NO_INDEX
+        self.stage[table] = 0
+        self.seat_count[table] = len(names)
+        self.reset_deck(table)
+        self.community[table * 5:table * 5 + 5] = array("b", [NO_CARD]) * 5
+
+        for seat in range(MAX_SEATS):
+            slot = table * MAX_SEATS + seat
+            if seat < len(names):
+                self.name_id[slot] = self._intern(names[seat])
+                self.chips[slot] = chips[seat]
+            else:
+                self.name_id[slot] = NO_INDEX
+                self.chips[slot] = 0
+            self.current_bet[slot] = 0
+            self.total_bet[slot] = 0
+            self.folded[slot] = 0
+            self.hole_cards[slot * 2] = NO_CARD
+            self.hole_cards[slot * 2 + 1] = NO_CARD
+        return table
+
+    def remove_table(self, table: int) -> None:
+        """
+        frees a table, its slot is reused by the next add_table()
+        :param table: table id
+        :return: None
+        """
+        self.seat_count[table] = 0
+        self._free.append(table)
+
+    def remove_seat(self, table: int, seat: int) -> None:
+        """
+        removes a player from a table and moves the players after them one seat down
+        (the same as Game.players.remove(player))
+        :param table: table id
+        :param seat: seat of the player to remove
+        :return: None
+        """
+        base = table * MAX_SEATS
+        last = self.seat_count[table] - 1
+        for column in (self.chips, self.current_bet, self.total_bet, self.folded, self.name_id):
+            column[base + seat:base + last] = column[base + seat + 1:base + last + 1]
+        self.hole_cards[(base + seat) * 2:(base + last) * 2] = self.hole_cards[(base + seat + 1) * 2:(base + last + 1) * 2]
+        self.name_id[base + last] = NO_INDEX
+        self.seat_count[table] = last
+
+    def reset_deck(self, table: int, rng: random.Random = None) -> None:
+        """
+        puts all 52 cards back in a table's deck and shuffles it
+        :param table: table id
+        :param rng: generator to shuffle with, None for the thread's own (same as Deck)
+        :return: None
+        """
+        self.decks[table * 52:table * 52 + 52] = bytes(range(52))
+        self.deck_size[table] = 52
+        self.shuffle(table, rng)
+
+    def shuffle(self, table: int, rng: random.Random = None) -> None:
+        """
+        shuffles the cards left in a table's deck
+        :param table: table id
+        :param rng: generator to shuffle with, None for the thread's own (same as Deck)
+        :return: None
+        """
+        start = table * 52
+        cards = bytearray(self.decks[start:start + self.deck_size[table]])
+        (rng or thread_rng()).shuffle(cards)
+        self.decks[start:start + len(cards)] = cards
+
+    def deal(self, table: int) -> int:
+        """
+        deals the top card of a table's deck
+        :param table: table id
+        :return: the card id, or -1 if the deck is empty
+        """
+        size = self.deck_size[table]
+        if size == 0:
+            return NO_CARD
+        self.deck_size[table] = size - 1
+        return self.decks[table * 52 + size - 1]
+
+    def nbytes(self) -> int:
+        """
+        :return: approximate memory used by the arrays, in bytes
+        """
+        columns = (self.pot, self.minimum_bet, self.small_blind, self.big_blind, self.dealer_index,
+                   self.last_raiser_index, self.stage, self.seat_count, self.deck_size, self.community,
+                   self.chips, self.current_bet, self.total_bet, self.folded, self.name_id, self.hole_cards)
+        return len(self.decks) + sum(column.itemsize * len(column) for column in columns)
+
+    def game(self, table: int) -> "GameView":
+        """
+        :param table: table id
+        :return: a GameView of the table
+        """
+        return GameView(self, table)
+
+
+class _HandView:
+    """
+    a list-like view of a seat's two hole cards, so player.hand.append(card) writes into the store
+    """
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store: TableStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    def _cards(self) -> list:
+        first = self.slot * 2
+        return [CARDS[card] for card in self.store.hole_cards[first:first + 2] if card != NO_CARD]
+
+    def append(self, card) -> None:
+        first = self.slot * 2
+        position = first if self.store.hole_cards[first] == NO_CARD else first + 1
+        self.store.hole_cards[position] = card_to_index(card)
+
+    def __iter__(self):
+        return iter(self._cards())
+
+    def __len__(self) -> int:
+        return len(self._cards())
+
+    def __getitem__(self, index):
+        return self._cards()[index]
+
+    def __add__(self, other: list) -> list:
+        return self._cards() + list(other)
+
+    def __repr__(self) -> str:
+        return repr(self._cards())
+
+
+class PlayerView:
+    """
+    a class that looks like a Player but reads and writes a seat of a TableStore
+
+    attributes:
+        same as Player (name, chips, folded, hand, current_bet, total_bet)
+
+    methods:
+        same as Player
+    """
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store: TableStore, table: int, seat: int):
+        """
+        :param store: TableStore holding the table
+        :param table: table id
+        :param seat: seat number at the table
+        """
+        self.store = store
+        self.slot = table * MAX_SEATS + seat
+
+    @property
+    def name(self) -> str:
+        return self.store.names[self.store.name_id[self.slot]]
+
+    @property
+    def chips(self) -> int:
+        return self.store.chips[self.slot]
+
+    @chips.setter
+    def chips(self, value: int) -> None:
+        self.store.chips[self.slot] = value
+
+    @property
+    def current_bet(self) -> int:
+        return self.store.current_bet[self.slot]
+
+    @current_bet.setter
+    def current_bet(self, value: int) -> None:
+        self.store.current_bet[self.slot] = value
+
+    @property
+    def total_bet(self) -> int:
+        return self.store.total_bet[self.slot]
+
+    @total_bet.setter
+    def total_bet(self, value: int) -> None:
+        self.store.total_bet[self.slot] = value
+
+    @property
+    def folded(self) -> bool:
+        return bool(self.store.folded[self.slot])
+
+    @folded.setter
+    def folded(self, value: bool) -> None:
+        self.store.folded[self.slot] = 1 if value else 0
+
+    @property
+    def hand(self) -> _HandView:
+        return _HandView(self.store, self.slot)
+
+    @hand.setter
+    def hand(self, cards: list) -> None:
+        first = self.slot * 2
+        ids = [card_to_index(card) for card in cards] + [NO_CARD, NO_CARD]
+        self.store.hole_cards[first] = ids[0]
+        self.store.hole_cards[first + 1] = ids[1]
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, PlayerView):
+            return self.store is other.store and self.slot == other.slot
+        return False
+
+    def __hash__(self) -> int:
+        return hash(self.slot)
+
+    # the Player methods only use the attributes above, so they work on the view as is
+    reset_round = Player.reset_round
+    __str__ = Player.__str__
+    show_hand = Player.show_hand
+    bet = Player.bet
+    fold = Player.fold
+    is_all_in = Player.is_all_in
+
+
+class DeckView:
+    """
+    a class that looks like a Deck but deals from a table's deck in a TableStore
+
+    attributes:
+        rng (random.Random): generator used to shuffle, None for the thread's own (same as Deck)
+
+    methods:
+        same as Deck
+    """
+    __slots__ = ("store", "table", "rng")
+
+    def __init__(self, store: TableStore, table: int, rng: random.Random = None):
+        self.store = store
+        self.table = table
+        self.rng = rng
+
+    @property
+    def cards(self) -> list:
+        start = self.table * 52
+        return [CARDS[card] for card in self.store.decks[start:start + self.store.deck_size[self.table]]]
+
+    def shuffle(self) -> None:
+        self.store.shuffle(self.table, self.rng)
+
+    def deal(self):
+        card = self.store.deal(self.table)
+        if card == NO_CARD:
+            print("empty deck")
+            return None
+        return CARDS[card]
+
+    def reset_deck(self) -> None:
+        self.store.reset_deck(self.table, self.rng)
+
+
+class _CommunityView:
+    """
+    a list-like view of a table's community cards, so community_cards.append(card) writes into the store
+    """
+    __slots__ = ("store", "table")
+
+    def __init__(self, store: TableStore, table: int):
+        self.store = store
+        self.table = table
+
+    def _cards(self) -> list:
+        start = self.table * 5
+        return [CARDS[card] for card in self.store.community[start:start + 5] if card != NO_CARD]
+
+    def append(self, card) -> None:
+        start = self.table * 5
+        self.store.community[start + len(self._cards())] = card_to_index(card)
+
+    def __iter__(self):
+        return iter(self._cards())
+
+    def __len__(self) -> int:
+        return len(self._cards())
+
+    def __getitem__(self, index):
+        return self._cards()[index]
+
+    def __radd__(self, other) -> list:
+        return list(other) + self._cards()
+
+    def __repr__(self) -> str:
+        return repr(self._cards())
+
+
+def _table_property(column: str, encode=None, decode=None) -> property:
+    """
+    makes a property that reads and writes a per table column of the store
+    :param column: name of the TableStore array
+    :param encode: optional function to turn the value into the stored number
+    :param decode: optional function to turn the stored number back into the value
+    :return: property object
+    """
+    def getter(self):
+        value = getattr(self.store, column)[self.table]
+        return decode(value) if decode else value
+
+    def setter(self, value):
+        getattr(self.store, column)[self.table] = encode(value) if encode else value
+
+    return property(getter, setter)
+
+
+class GameView(Game):
+    """
+    a class that looks like a Game but keeps its state in a TableStore
+
+    every Game method works on it, the attributes below are read from and written to the store
+    self.players is a list of PlayerView made when the view is created, to remove a player
+    for good use TableStore.remove_seat()
+    the store doesn't keep a generator per table, for a seeded table keep the same rng (or the view) between hands
+
+    attributes:
+        same as Game
+    """
+    pot = _table_property("pot")
+    minimum_bet = _table_property("minimum_bet")
+    small_blind = _table_property("small_blind")
+    big_blind = _table_property("big_blind")
+    dealer_index = _table_property("dealer_index")
+    last_raiser_index = _table_property("last_raiser_index",
+                                        lambda index: NO_INDEX if index is None else index,
+                                        lambda index: None if index == NO_INDEX else index)
+    stage = _table_property("stage", STAGES.index, STAGES.__getitem__)
+
+    def __init__(self, store: TableStore, table: int):
+        """
+        :param store: TableStore holding the table
+        :param table: table id
+        """
+        self.store = store
+        self.table = table
+        self.players = [PlayerView(store, table, seat) for seat in range(store.seat_count[table])]
+        self.event_listeners = []
+        self.bots = {}
+        self.eliminated = []
+        self.outs = OutsAnalyzer(self)
+        self.rng = None
+        self.headless = False
+
+    @property
+    def deck(self) -> DeckView:
+        return DeckView(self.store, self.table, self.rng)
+
+    @deck.setter
+    def deck(self, deck) -> None:
+        # Game.reset_round sets a fresh Deck(self.rng), for a view that means refilling the stored deck with that rng
+        self.store.reset_deck(self.table, self.rng)
+
+    @property
+    def community_cards(self) -> _CommunityView:
+        return _CommunityView(self.store, self.table)
+
+    @community_cards.setter
+    def community_cards(self, cards: list) -> None:
+        start = self.table * 5
+        ids = [card_to_index(card) for card in cards] + [NO_CARD] * 5
+        self.store.community[start:start + 5] = array("b", ids[:5])
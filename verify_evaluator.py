@@ -0,0 +1,410 @@
+"""
+differential verifier for the fast evaluator
+
+checks that evaluator.evaluate orders hands exactly like game.rank_hand (the get_best_hand + is_* cascade that
+Game.evaluate_hand uses) in three passes, each one split into tasks for a process pool:
+    1. all 2,598,960 five card hands, every one of them through the real cascade
+    2. random seven card hands (hundreds of millions by default)
+    3. random showdowns with 2 to 9 players, both sides have to pick the same winners
+
+"orders exactly like" means a hand beats, ties or loses to another hand under one evaluator exactly when it does
+under the other, only rank values are compared: the cascade sorts equal hands by suit (Card.__lt__), here
+equal ranks count as a split pot like in evaluator.py
+
+every pass collects the (reference key, fast key) pairs it sees with one example hand for each, then the pairs are
+checked for a different hand category, for two keys on one side that are a single key on the other, and for
+neighbours that are in a different order, every problem is reported with the smallest example found
+(one hand, two hands, or a showdown with the players that don't matter taken out)
+
+the cascade tries up to 210 five card combinations for a seven card hand (about 1ms), too slow for pass 2, so:
+    - compared by rank, the cascade gives a seven card hand the best of its 21 five card hands (the first hand type
+      it finds is the best type of any five cards, and get_best_hand keeps the highest sorted cards of that type)
+    - a five card result only depends on the ranks and on whether the five cards are a flush
+pass 1 fills a table with the cascade result of every rank pattern and pass 2 takes the best entry of the 21
+the first --direct seven card hands still go through the real cascade, get_best_hand compares the sorted hands as
+lists of Card objects so a suit can decide before a lower rank does (it keeps K K Q 10 10 over K K Q Q 10 when the
+second queen has a lower suit), these hands are reported as "suits" problems
+
+usage:
+    python verify_evaluator.py [--seven N] [--showdowns N] [--direct N] [--workers N] [--seed N]
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from card import Card, index_to_card
+from evaluator import evaluate
+from game import Game, hand_strength, rank_hand
+from player import Player
+
+SEVEN_CARD_HANDS = 200_000_000
+SHOWDOWNS = 2_000_000
+DIRECT_HANDS = 20_000
+TASK_SIZE = 500_000
+
+CARDS = tuple(index_to_card(index) for index in range(52))
+
+# (rank pattern, flush) -> reference key, filled in by pass 1 (sent to the workers of pass 2 and 3 by _init_worker)
+_five_card_table = {}
+_rank_cache = {}
+_flush_cache = {}
+
+
+def reference_key(name: str, best_hand: list[Card]) -> int:
+    """
+    turns what rank_hand returns into an integer, same layout as an evaluator key (category in bits 20+)
+    but with the ranks of all five cards in the order the cascade compares them
+    :param name: hand type name (a key of hand_strength)
+    :param best_hand: the five cards, highest rank first
+    :return: integer key, bigger is better, suits are ignored
+    """
+    key = hand_strength[name]
+    for card in best_hand:
+        key = (key << 4) | (Card.rank_values[card.rank] - 2)
+    return key
+
+
+def reference(cards) -> int:
+    """
+    runs the real cascade on card ids
+    :param cards: 5 to 7 card ids
+    :return: reference key
+    """
+    return reference_key(*rank_hand([CARDS[card] for card in cards]))
+
+
+def _pattern(cards) -> int:
+    """
+    :param cards: card ids
+    :return: how many cards of each rank there are, 3 bits per rank
+    """
+    pattern = 0
+    for card in cards:
+        pattern += 1 << 3 * (card >> 2)
+    return pattern
+
+
+def _is_flush(cards) -> bool:
+    suit = cards[0] & 3
+    return all(card & 3 == suit for card in cards)
+
+
+def _five_card_task(first: int) -> tuple[dict, dict]:
+    """
+    checks every five card hand whose lowest card is first
+    :param first: card id
+    :return: {(reference key, fast key): example hand} and {(rank pattern, flush, reference key): example hand}
+    """
+    pairs = {}
+    table = {}
+    for rest in combinations(range(first + 1, 52), 4):
+        hand = (first,) + rest
+        ref = reference(hand)
+        pairs.setdefault((ref, evaluate(hand)), hand)
+        # if the cascade ever looked at suits for anything but the flush this keeps both results
+        table.setdefault((_pattern(hand), _is_flush(hand), ref), hand)
+    return pairs, table
+
+
+def _init_worker(table: dict) -> None:
+    global _five_card_table
+    _five_card_table = table
+
+
+def _flush_suit(suit_pattern: int) -> int:
+    """
+    :param suit_pattern: how many cards of each suit there are, 3 bits per suit
+    :return: the suit with 5 or more cards, or -1
+    """
+    for suit in range(4):
+        if suit_pattern >> 3 * suit & 7 >= 5:
+            return suit
+    return -1
+
+
+FLUSH_SUIT = tuple(_flush_suit(suit_pattern) for suit_pattern in range(1 << 12))
+
+
+def table_reference(cards) -> int:
+    """
+    reference key of 5 to 7 card ids from the table of pass 1, without running the cascade
+    this is the cascade with the cards compared by rank only, see the top of the file
+    :param cards: card ids
+    :return: reference key
+    """
+    pattern = 0
+    suit_pattern = 0
+    for card in cards:
+        pattern += 1 << 3 * (card >> 2)
+        suit_pattern += 1 << 3 * (card & 3)
+
+    best = _rank_cache.get(pattern)
+    if best is None:
+        # every five cards as if they weren't a flush, a real flush only makes a five card hand better
+        ranks = [card >> 2 for card in cards]
+        best = max(_five_card_table[_pattern(rank << 2 for rank in five), False]
+                   for five in combinations(ranks, 5))
+        _rank_cache[pattern] = best
+
+    suit = FLUSH_SUIT[suit_pattern]
+    if suit >= 0:
+        suited = tuple(card for card in cards if card & 3 == suit)
+        mask = _pattern(suited)
+        flush = _flush_cache.get(mask)
+        if flush is None:
+            flush = max(_five_card_table[_pattern(five), True] for five in combinations(suited, 5))
+            _flush_cache[mask] = flush
+        if flush > best:
+            return flush
+    return best
+
+
+def _seven_card_task(seed: int, count: int, direct: int) -> tuple[dict, list]:
+    """
+    checks random seven card hands
+    :param seed: seed for the random number generator
+    :param count: number of hands
+    :param direct: how many of the hands also go through the real cascade
+    :return: {(reference key, fast key): example hand} and the hands where the cascade doesn't match the table
+    """
+    rng = random.Random(seed)
+    deck = range(52)
+    pairs = {}
+    shortcut_errors = []
+    for i in range(count):
+        hand = tuple(rng.sample(deck, 7))
+        ref = table_reference(hand)
+        if i < direct and reference(hand) != ref:
+            shortcut_errors.append(hand)
+        pairs.setdefault((ref, evaluate(hand)), hand)
+    return pairs, shortcut_errors
+
+
+def _winners(hands: list, board: list, key) -> set[int]:
+    """
+    :param hands: hole cards of every player
+    :param board: five community card ids
+    :param key: function turning card ids into a key
+    :return: indexes of the players who win (more than one for a split pot)
+    """
+    keys = [key(hand + board) for hand in hands]
+    best = max(keys)
+    return {i for i, k in enumerate(keys) if k == best}
+
+
+def _game_winners(hands: list, board: list) -> set[int]:
+    """
+    winners as Game.evaluate_hand sees them, ignoring suits like the rest of the verifier
+    """
+    game = Game([Player(str(i), 0) for i in range(len(hands))])
+    for player, hand in zip(game.players, hands):
+        player.hand = [CARDS[card] for card in hand]
+    game.community_cards = [CARDS[card] for card in board]
+    rankings = [(int(player.name), reference_key(name, best_hand)) for player, name, best_hand in game.evaluate_hand()]
+    best = max(key for _, key in rankings)
+    return {i for i, key in rankings if key == best}
+
+
+def _shrink(hands: list, board: list) -> list:
+    """
+    takes players out of a showdown the evaluators disagree on while they still disagree
+    :return: the smallest list of hands found
+    """
+    changed = True
+    while changed and len(hands) > 2:
+        changed = False
+        for i in range(len(hands)):
+            fewer = hands[:i] + hands[i + 1:]
+            if _winners(fewer, board, table_reference) != _winners(fewer, board, evaluate):
+                hands = fewer
+                changed = True
+                break
+    return hands
+
+
+def _showdown_task(seed: int, count: int, direct: int) -> list[tuple]:
+    """
+    plays random showdowns
+    :param seed: seed for the random number generator
+    :param count: number of showdowns
+    :param direct: how many of them also go through Game.evaluate_hand
+    :return: (kind, hands, board) for every showdown with different winners
+    """
+    rng = random.Random(seed)
+    deck = range(52)
+    problems = []
+    for i in range(count):
+        players = rng.randint(2, 9)
+        sample = rng.sample(deck, 2 * players + 5)
+        hands = [sample[2 * p:2 * p + 2] for p in range(players)]
+        board = sample[2 * players:]
+        expected = _winners(hands, board, table_reference)
+        if i < direct and _game_winners(hands, board) != expected:
+            problems.append(("game", hands, board))
+        if _winners(hands, board, evaluate) != expected:
+            problems.append(("winners", _shrink(hands, board), board))
+    return problems
+
+
+def _show(cards) -> str:
+    return " ".join(str(CARDS[card]) for card in cards)
+
+
+def _better(example, other) -> bool:
+    return len(example) < len(other) or (len(example) == len(other) and example < other)
+
+
+def check_pairs(pairs: dict, limit: int = 10) -> list[str]:
+    """
+    looks for hands the two evaluators order differently
+    :param pairs: {(reference key, fast key): example hand}
+    :param limit: most problems reported of each kind
+    :return: one line for every problem
+    """
+    problems = []
+
+    categories = [(ref, fast) for ref, fast in pairs if ref >> 20 != fast >> 20]
+    for ref, fast in sorted(categories, key=lambda pair: len(pairs[pair]))[:limit]:
+        hand = pairs[ref, fast]
+        problems.append(f"category: {_show(hand)} is a {_category(ref)} for the cascade "
+                        f"and a {_category(fast)} for the evaluator")
+
+    # one key on one side that is more than one key on the other (a split on one side only)
+    for side, name in ((0, "cascade"), (1, "evaluator")):
+        groups = {}
+        for pair, hand in pairs.items():
+            groups.setdefault(pair[side], []).append(hand)
+        splits = [sorted(hands, key=lambda h: (len(h), h))[:2] for hands in groups.values() if len(hands) > 1]
+        splits.sort(key=lambda hands: len(hands[0]) + len(hands[1]))
+        for first, second in splits[:limit]:
+            problems.append(f"tie: {_show(first)} and {_show(second)} only tie for the {name}")
+
+    # sorted by reference key every fast key has to go up (or stay the same inside a group reported above)
+    inversions = []
+    ordered = sorted(pairs)
+    for low, high in zip(ordered, ordered[1:]):
+        if low[0] < high[0] and low[1] > high[1]:
+            inversions.append((pairs[low], pairs[high]))
+    inversions.sort(key=lambda hands: len(hands[0]) + len(hands[1]))
+    for weaker, stronger in inversions[:limit]:
+        problems.append(f"order: the cascade ranks {_show(stronger)} above {_show(weaker)}, the evaluator below")
+    if len(inversions) > limit:
+        problems.append(f"order: {len(inversions) - limit} more")
+    return problems
+
+
+def _category(key: int) -> str:
+    return next(name for name, value in hand_strength.items() if value == key >> 20)
+
+
+def _merge(into: dict, pairs: dict) -> None:
+    for pair, hand in pairs.items():
+        if pair not in into or _better(hand, into[pair]):
+            into[pair] = hand
+
+
+def verify(seven: int = SEVEN_CARD_HANDS, showdowns: int = SHOWDOWNS, direct: int = DIRECT_HANDS,
+           workers: int = None, seed: int = 0, limit: int = 10, log=print) -> list[str]:
+    """
+    runs the three passes
+    :param seven: number of random seven card hands
+    :param showdowns: number of random showdowns
+    :param direct: number of seven card hands and showdowns that also go through the real cascade / Game
+    :param workers: number of processes, None for one per cpu
+    :param seed: seed for the random hands, the same seed checks the same hands
+    :param limit: most problems reported of each kind
+    :param log: function called with progress messages
+    :return: a description of every problem found, empty if the evaluators agree
+    """
+    workers = workers or os.cpu_count()
+    pairs = {}
+    problems = []
+
+    start = time.perf_counter()
+    table = {}
+    with ProcessPoolExecutor(workers) as pool:
+        # biggest tasks first so the pool isn't waiting on one at the end
+        for task_pairs, task_table in pool.map(_five_card_task, range(48)):
+            _merge(pairs, task_pairs)
+            for key, hand in task_table.items():
+                table.setdefault(key, hand)
+    five_card = {}
+    for pattern, flush, ref in table:
+        if five_card.setdefault((pattern, flush), ref) != ref:
+            problems.append(f"suits: the cascade gives two results for the ranks of {_show(table[pattern, flush, ref])}")
+    log(f"five card hands: 2598960 checked, {len(pairs)} different results, {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(five_card,)) as pool:
+        tasks = _split(seven, direct)
+        futures = [pool.submit(_seven_card_task, rng.getrandbits(64), count, task_direct)
+                   for count, task_direct in tasks]
+        shortcut_errors = []
+        for future in futures:
+            task_pairs, task_errors = future.result()
+            _merge(pairs, task_pairs)
+            shortcut_errors.extend(task_errors)
+        for hand in shortcut_errors[:limit]:
+            kept = rank_hand([CARDS[card] for card in hand])[1]
+            best = max(combinations(hand, 5), key=reference)
+            problems.append(f"suits: get_best_hand keeps {', '.join(map(str, kept))} from {_show(hand)} "
+                            f"over {_show(sorted(best, reverse=True))}")
+        if len(shortcut_errors) > limit:
+            problems.append(f"suits: {len(shortcut_errors) - limit} more")
+        log(f"seven card hands: {seven} checked, {min(direct, seven)} through the cascade, "
+            f"{time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        futures = [pool.submit(_showdown_task, rng.getrandbits(64), count, task_direct)
+                   for count, task_direct in _split(showdowns, direct)]
+        showdown_problems = [problem for future in futures for problem in future.result()]
+        showdown_problems.sort(key=lambda problem: len(problem[1]))
+        for kind, hands, board in showdown_problems[:limit]:
+            players = ", ".join(_show(hand) for hand in hands)
+            if kind == "game":
+                problems.append(f"game: Game.evaluate_hand picks other winners than the cascade, {players} on {_show(board)}")
+            else:
+                problems.append(f"showdown: {players} on {_show(board)} has other winners for the evaluator")
+        if len(showdown_problems) > limit:
+            problems.append(f"showdown: {len(showdown_problems) - limit} more")
+        log(f"showdowns: {showdowns} checked, {time.perf_counter() - start:.1f}s")
+
+    return problems + check_pairs(pairs, limit)
+
+
+def _split(total: int, direct: int) -> list[tuple]:
+    """
+    splits a pass into tasks of TASK_SIZE, the direct checks are spread over the tasks
+    :return: list of (count, direct) for every task
+    """
+    tasks = []
+    while total > 0:
+        tasks.append(min(total, TASK_SIZE))
+        total -= tasks[-1]
+    per_task = -(-direct // len(tasks)) if tasks else 0
+    return [(count, min(count, per_task)) for count in tasks]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="check that evaluator.py ranks hands like the cascade in game.py")
+    parser.add_argument("--seven", type=int, default=SEVEN_CARD_HANDS, help="random seven card hands")
+    parser.add_argument("--showdowns", type=int, default=SHOWDOWNS, help="random multi-way showdowns")
+    parser.add_argument("--direct", type=int, default=DIRECT_HANDS, help="hands also run through the real cascade")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per cpu)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--limit", type=int, default=10, help="most problems shown of each kind")
+    args = parser.parse_args()
+
+    problems = verify(args.seven, args.showdowns, args.direct, args.workers, args.seed, args.limit)
+    for problem in problems:
+        print(problem)
+    print("no differences found" if not problems else f"{len(problems)} problems")
+    raise SystemExit(1 if problems else 0)
+
+
+if __name__ == '__main__':
+    main()